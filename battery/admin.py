@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import BatterySystem, BatteryLog
+from django.utils.html import format_html, format_html_join
+from .models import BatterySystem, BatteryTrace
 
 
 @admin.register(BatterySystem)
@@ -55,7 +56,29 @@ class BatterySystemAdmin(admin.ModelAdmin):
     )
 
 
-@admin.register(BatteryLog)
-class BatteryLogAdmin(admin.ModelAdmin):
-    list_display = ['battery', 'hour', 'soc_pct', 'charge_kwh', 'discharge_kwh']
-    list_filter = ['battery']
\ No newline at end of file
+@admin.register(BatteryTrace)
+class BatteryTraceAdmin(admin.ModelAdmin):
+    list_display = ['battery', 'nb_heures', 'taille_ko', 'updated_at']
+    readonly_fields = ['battery', 'nb_heures', 'taille_ko', 'apercu', 'created_at', 'updated_at']
+    exclude = ['donnees']
+    
+    # Heures affichées dans l'aperçu (première journée)
+    APERCU_HEURES = 24
+    
+    @admin.display(description='Taille (Ko)')
+    def taille_ko(self, obj):
+        return round(len(obj.donnees) / 1024, 1)
+    
+    @admin.display(description='Aperçu')
+    def apercu(self, obj):
+        page = obj.page(0, self.APERCU_HEURES)
+        lignes = format_html_join(
+            '',
+            '<tr><td>{}</td><td>{}</td><td>{}</td><td>{}</td><td>{}</td></tr>',
+            zip(page['hour'], page['soc_kwh'], page['soc_pct'], page['charge_kwh'], page['discharge_kwh'])
+        )
+        return format_html(
+            '<table><tr><th>Heure</th><th>SOC (kWh)</th><th>SOC (%)</th>'
+            '<th>Charge (kWh)</th><th>Décharge (kWh)</th></tr>{}</table>',
+            lignes
+        )
@@ -0,0 +1,119 @@
+# Generated by Django 4.2.18 on 2026-10-16 19:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+import zlib
+
+import numpy as np
+
+
+# Copies figées de encode_trace / decode_trace à la date de la migration :
+# une évolution ultérieure du format de trace ne doit pas changer ce
+# qu'elle écrit ni ce qu'elle relit.
+
+def _encoder_trace(soc_kwh, charge_kwh, discharge_kwh):
+    """Tableau (n_heures, 3) float32 little-endian entrelacé, compressé zlib."""
+    table = np.column_stack((soc_kwh, charge_kwh, discharge_kwh)).astype("<f4")
+    return zlib.compress(table.tobytes(), 6)
+
+
+def _decoder_trace(blob):
+    """Blob de _encoder_trace → tableau (n_heures, 3) float32."""
+    return np.frombuffer(zlib.decompress(bytes(blob)), dtype="<f4").reshape(-1, 3)
+
+
+def logs_vers_traces(apps, schema_editor):
+    """Convertit les lignes BatteryLog existantes en un blob BatteryTrace par batterie."""
+    BatteryLog = apps.get_model("battery", "BatteryLog")
+    BatteryTrace = apps.get_model("battery", "BatteryTrace")
+
+    battery_ids = BatteryLog.objects.values_list("battery_id", flat=True).distinct()
+    for battery_id in battery_ids:
+        lignes = np.array(
+            BatteryLog.objects.filter(battery_id=battery_id)
+            .order_by("hour")
+            .values_list("hour", "soc_kwh", "charge_kwh", "discharge_kwh"),
+            dtype=np.float64,
+        )
+        nb_heures = int(lignes[:, 0].max()) + 1
+        series = np.zeros((3, nb_heures))
+        series[:, lignes[:, 0].astype(int)] = lignes[:, 1:].T
+        BatteryTrace.objects.create(
+            battery_id=battery_id,
+            nb_heures=nb_heures,
+            donnees=_encoder_trace(*series),
+        )
+
+
+def traces_vers_logs(apps, schema_editor):
+    """Retour arrière : redéploie chaque trace en lignes BatteryLog."""
+    BatteryLog = apps.get_model("battery", "BatteryLog")
+    BatteryTrace = apps.get_model("battery", "BatteryTrace")
+
+    for trace in BatteryTrace.objects.select_related("battery"):
+        table = _decoder_trace(trace.donnees).astype(np.float64)
+        capacite = float(trace.battery.capacite_utilisable_kwh)
+        BatteryLog.objects.bulk_create(
+            [
+                BatteryLog(
+                    battery_id=trace.battery_id,
+                    hour=heure,
+                    soc_kwh=round(soc, 3),
+                    soc_pct=round(soc / capacite * 100, 2),
+                    charge_kwh=round(charge, 3),
+                    discharge_kwh=round(discharge, 3),
+                )
+                for heure, (soc, charge, discharge) in enumerate(table.tolist())
+            ],
+            batch_size=2000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("battery", "0002_remove_batterysystem_simulation_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BatteryTrace",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("nb_heures", models.IntegerField(help_text="Nombre d'heures (8760)")),
+                (
+                    "donnees",
+                    models.BinaryField(
+                        help_text="SOC, charge, décharge horaires (float32 entrelacés, zlib)"
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "battery",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="trace",
+                        to="battery.batterysystem",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Trace batterie",
+                "verbose_name_plural": "Traces batterie",
+                "db_table": "battery_traces",
+            },
+        ),
+        migrations.RunPython(logs_vers_traces, traces_vers_logs),
+        migrations.DeleteModel(
+            name="BatteryLog",
+        ),
+    ]
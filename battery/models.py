@@ -3,6 +3,9 @@ from frontend.models import Simulation  # ← Votre modèle existant
 
 from .pricing import get_battery_price
 from .services.sizing import recommend_battery_size
+from .services.trace import (
+    TRACE_COLONNES, TRACE_PAGE_HEURES, decode_trace, encode_trace, iter_trace_pages
+)
 
 class BatterySystem(models.Model):
     """
@@ -162,25 +165,93 @@ class BatterySystem(models.Model):
             return self.duree_vie_annees
         return None
 
-class BatteryLog(models.Model):
+class BatteryTrace(models.Model):
     """
-    Log horaire (optionnel, pour analyse détaillée).
+    Trace horaire (SOC, charge, décharge) stockée en un seul blob compressé.
+    
+    Remplace les 8760 lignes BatteryLog : une écriture par simulation,
+    lecture complète (series) ou paginée (page / iter_pages).
     """
     
-    battery = models.ForeignKey(
+    battery = models.OneToOneField(
         BatterySystem,
         on_delete=models.CASCADE,
-        related_name='logs'
+        related_name='trace'
+    )
+    
+    nb_heures = models.IntegerField(help_text="Nombre d'heures (8760)")
+    donnees = models.BinaryField(
+        help_text="SOC, charge, décharge horaires (float32 entrelacés, zlib)"
     )
     
-    hour = models.IntegerField(help_text="Heure (0-8759)")
-    soc_kwh = models.DecimalField(max_digits=6, decimal_places=3)
-    soc_pct = models.DecimalField(max_digits=5, decimal_places=2)
-    charge_kwh = models.DecimalField(max_digits=6, decimal_places=3)
-    discharge_kwh = models.DecimalField(max_digits=6, decimal_places=3)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
-        db_table = 'battery_logs'
-        indexes = [
-            models.Index(fields=['battery', 'hour']),
-        ]
\ No newline at end of file
+        db_table = 'battery_traces'
+        verbose_name = 'Trace batterie'
+        verbose_name_plural = 'Traces batterie'
+    
+    def __str__(self):
+        return f"Trace {self.battery} ({self.nb_heures} h)"
+    
+    @classmethod
+    def enregistrer(cls, battery, soc_kwh, charge_kwh, discharge_kwh) -> 'BatteryTrace':
+        """
+        Enregistre (ou remplace) la trace d'une batterie en une écriture.
+        
+        Args:
+            battery: BatterySystem
+            soc_kwh, charge_kwh, discharge_kwh: Séries horaires (kWh)
+        
+        Returns:
+            BatteryTrace: Trace enregistrée
+        """
+        trace, _ = cls.objects.update_or_create(
+            battery=battery,
+            defaults={
+                'nb_heures': len(soc_kwh),
+                'donnees': encode_trace(soc_kwh, charge_kwh, discharge_kwh),
+            }
+        )
+        return trace
+    
+    def series(self) -> dict:
+        """
+        Décode la trace complète.
+        
+        Returns:
+            dict: {'soc_kwh', 'charge_kwh', 'discharge_kwh'} → np.ndarray float32 (lecture seule)
+        """
+        table = decode_trace(self.donnees)
+        return {colonne: table[:, i] for i, colonne in enumerate(TRACE_COLONNES)}
+    
+    def iter_pages(self, taille_page: int = TRACE_PAGE_HEURES, debut: int = 0):
+        """
+        Parcourt la trace page par page sans décoder l'année complète.
+        
+        Yields:
+            dict: {'hour', 'soc_kwh', 'soc_pct', 'charge_kwh', 'discharge_kwh'} → listes
+        """
+        capacite = float(self.battery.capacite_utilisable_kwh)
+        for heure, table in iter_trace_pages(self.donnees, taille_page, debut):
+            table = table.astype(float)
+            yield {
+                'hour': list(range(heure, heure + len(table))),
+                'soc_kwh': table[:, 0].round(3).tolist(),
+                'soc_pct': (table[:, 0] / capacite * 100).round(2).tolist(),
+                'charge_kwh': table[:, 1].round(3).tolist(),
+                'discharge_kwh': table[:, 2].round(3).tolist(),
+            }
+    
+    def page(self, numero: int = 0, taille_page: int = TRACE_PAGE_HEURES) -> dict:
+        """
+        Page `numero` de la trace (format colonnes, prêt pour Plotly).
+        
+        Example:
+            >>> battery.trace.page(0, 24)['soc_pct']  # Première journée
+        """
+        return next(
+            self.iter_pages(taille_page, debut=numero * taille_page),
+            {'hour': [], 'soc_kwh': [], 'soc_pct': [], 'charge_kwh': [], 'discharge_kwh': []}
+        )
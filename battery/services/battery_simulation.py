@@ -8,7 +8,8 @@ VERSION CORRIGÉE : Calcul correct de l'autoconsommation
 import logging
 import pandas as pd
 from typing import Dict
-from ..models import BatterySystem
+from ..models import BatterySystem, BatteryTrace
+from .dispatch import BatteryParams, simulate_dispatch
 
 logger = logging.getLogger(__name__)
 
@@ -41,7 +42,7 @@ class BatterySimulationService:
                 - autoconso_kw (autoconso sans batterie)
                 - injection_kw (surplus sans batterie)
                 - achat_kw (import sans batterie)
-            save_logs: Sauver logs horaires dans DB
+            save_logs: Sauver la trace horaire (SOC, charge, décharge) dans DB
         
         Returns:
             {
@@ -51,101 +52,41 @@ class BatterySimulationService:
                 'import_total_kwh': float,
                 'cycles_annuels': int,
                 'duree_vie_ans': int,
-                'gain_autoconso_pct': float
+                'gain_autoconso_pct': float,
+                'trace': BatteryTrace | None
             }
         """
         
-        # Paramètres batterie
-        soc = float(battery.capacite_utilisable_kwh) * 0.5  # État initial 50%
-        soc_min = float(battery.capacite_utilisable_kwh) * (1 - float(battery.dod_max))
-        soc_max = float(battery.capacite_utilisable_kwh)
-        efficiency = float(battery.efficacite)
-        power_max = float(battery.puissance_max_kw)
-        
-        # Métriques
-        autoconso_total = 0
-        surplus_total = 0
-        import_total = 0
-        energy_cycled = 0
-        
-        logs = []
-        
-        # Boucle sur 8760 heures
-        for idx, row in donnees_horaires.iterrows():
-            prod = row['puissance_ac_kw']
-            conso = row['consommation_kw']
-            
-            # Net = production - consommation
-            net = prod - conso
-            
-            charge_h = 0
-            discharge_h = 0
-            
-            if net > 0:
-                # ===== CAS 1 : SURPLUS (Production > Consommation) =====
-                # Autoconsommation directe
-                autoconso_direct = min(prod, conso)
-                surplus = net
-                
-                # Charger batterie avec le surplus
-                charge_possible = min(
-                    surplus,
-                    soc_max - soc,
-                    power_max
-                )
-                
-                if charge_possible > 0:
-                    charge_h = charge_possible * efficiency
-                    soc += charge_h
-                    energy_cycled += charge_h
-                    surplus -= charge_possible
-                
-                # Ce qui reste = surplus vendu au réseau
-                surplus_total += surplus
-                
-                # ✅ CORRECTION : Seule l'autoconso directe compte
-                # L'énergie chargée dans la batterie n'est PAS encore autoconsommée
-                autoconso_total += autoconso_direct
-                
-            else:
-                # ===== CAS 2 : DÉFICIT (Production < Consommation) =====
-                # Autoconsommation directe
-                autoconso_direct = min(prod, conso)
-                deficit = abs(net)
-                
-                # Décharger batterie pour combler le déficit
-                discharge_possible = min(
-                    deficit,
-                    soc - soc_min,
-                    power_max
-                )
-                
-                if discharge_possible > 0:
-                    discharge_h = discharge_possible
-                    soc -= discharge_h / efficiency
-                    deficit -= discharge_h
-                
-                # Ce qui reste = acheté au réseau
-                import_total += deficit
-                
-                # ✅ Autoconsommation = directe + énergie de la batterie consommée
-                autoconso_total += autoconso_direct + discharge_h
-            
-            # Logs (optionnel)
-            if save_logs:
-                logs.append({
-                    'hour': idx,
-                    'soc_kwh': round(soc, 3),
-                    'soc_pct': round((soc / float(battery.capacite_utilisable_kwh)) * 100, 2),
-                    'charge_kwh': round(charge_h, 3),
-                    'discharge_kwh': round(discharge_h, 3),
-                })
+        # Paramètres batterie (extraits une seule fois en float)
+        params = BatteryParams.from_battery(battery)
+        
+        # Noyau sur tableaux contigus
+        dispatch = simulate_dispatch(
+            donnees_horaires['puissance_ac_kw'].to_numpy(),
+            donnees_horaires['consommation_kw'].to_numpy(),
+            params
+        )
+        
+        autoconso_total = dispatch['autoconso_total_kwh']
+        surplus_total = dispatch['surplus_total_kwh']
+        import_total = dispatch['import_total_kwh']
+        energy_cycled = dispatch['energy_cycled_kwh']
+        
+        # Trace horaire (optionnelle) : un seul blob compressé, une écriture
+        trace = None
+        if save_logs:
+            trace = BatteryTrace.enregistrer(
+                battery,
+                dispatch['soc_kwh'],
+                dispatch['charge_kwh'],
+                dispatch['discharge_kwh']
+            )
         
         # Calculs finaux
         production_total = donnees_horaires['puissance_ac_kw'].sum()
         consommation_total = donnees_horaires['consommation_kw'].sum()
         
-        cycles_annuels = energy_cycled / float(battery.capacite_utilisable_kwh)
+        cycles_annuels = energy_cycled / params.capacite_utilisable_kwh
         duree_vie = battery.cycles_garantis / cycles_annuels if cycles_annuels > 0 else 99
         
         taux_autoconso = (autoconso_total / production_total * 100) if production_total > 0 else 0
@@ -169,7 +110,7 @@ class BatterySimulationService:
             'cycles_annuels': round(cycles_annuels, 0),
             'duree_vie_ans': round(duree_vie, 0),
             'gain_autoconso_pct': round(gain_autoconso, 1),
-            'logs': logs if save_logs else []
+            'trace': trace
         }
         
         return result
@@ -0,0 +1,396 @@
+"""
+Noyau de pilotage batterie sur tableaux contigus.
+battery/services/dispatch.py
+
+Le chemin chaud ne manipule que des floats Python : les paramètres du
+BatterySystem (Decimal) sont extraits une seule fois dans BatteryParams,
+les séries horaires sont converties en tableaux float64, et seule la
+récurrence sur l'état de charge (SOC) reste séquentielle. Les totaux
+annuels sont ensuite calculés en NumPy.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class BatteryParams:
+    """Paramètres batterie pré-extraits (floats) pour le noyau de simulation."""
+
+    capacite_utilisable_kwh: float
+    puissance_max_kw: float
+    efficacite: float = 0.95
+    dod_max: float = 0.90
+    cycles_garantis: int = 6000
+    soc_initial_ratio: float = 0.5  # État initial 50%
+
+    @classmethod
+    def from_battery(cls, battery) -> 'BatteryParams':
+        """
+        Construit les paramètres depuis un BatterySystem (champs Decimal).
+
+        Args:
+            battery: Instance de BatterySystem
+
+        Returns:
+            BatteryParams: Paramètres convertis en float
+        """
+        return cls(
+            capacite_utilisable_kwh=float(battery.capacite_utilisable_kwh),
+            puissance_max_kw=float(battery.puissance_max_kw),
+            efficacite=float(battery.efficacite),
+            dod_max=float(battery.dod_max),
+            cycles_garantis=int(battery.cycles_garantis),
+        )
+
+    @property
+    def soc_min(self) -> float:
+        return self.capacite_utilisable_kwh * (1 - self.dod_max)
+
+    @property
+    def soc_max(self) -> float:
+        return self.capacite_utilisable_kwh
+
+    @property
+    def soc_initial(self) -> float:
+        return self.capacite_utilisable_kwh * self.soc_initial_ratio
+
+
+def _recurrence_soc(
+    net: list,
+    soc: float,
+    soc_min: float,
+    soc_max: float,
+    efficiency: float,
+    power_max: float
+) -> Tuple[list, list, list]:
+    """
+    Récurrence SOC : seule partie séquentielle, sur des floats Python natifs.
+
+    Returns:
+        tuple: Listes (SOC, charge stockée, décharge) par heure
+    """
+    nb_heures = len(net)
+    soc_serie = [0.0] * nb_heures
+    charge_serie = [0.0] * nb_heures
+    discharge_serie = [0.0] * nb_heures
+
+    for h, surplus in enumerate(net):
+        if surplus > 0:
+            charge = soc_max - soc
+            if surplus < charge:
+                charge = surplus
+            if power_max < charge:
+                charge = power_max
+            if charge > 0:
+                charge *= efficiency
+                soc += charge
+                charge_serie[h] = charge
+        else:
+            discharge = soc - soc_min
+            if -surplus < discharge:
+                discharge = -surplus
+            if power_max < discharge:
+                discharge = power_max
+            if discharge > 0:
+                soc -= discharge / efficiency
+                discharge_serie[h] = discharge
+        soc_serie[h] = soc
+
+    return soc_serie, charge_serie, discharge_serie
+
+
+def simulate_dispatch(
+    production_kw: np.ndarray,
+    consommation_kw: np.ndarray,
+    params: BatteryParams
+) -> Dict:
+    """
+    Simule la charge/décharge heure par heure (stratégie autoconsommation).
+
+    Logique identique à BatterySimulationService.simulate :
+    - Surplus : charge min(surplus, place libre, puissance max), stockée × rendement
+    - Déficit : décharge min(déficit, SOC - SOC min, puissance max), SOC -= décharge / rendement
+
+    Args:
+        production_kw: Production horaire (kW)
+        consommation_kw: Consommation horaire (kW)
+        params: Paramètres batterie
+
+    Returns:
+        dict: Séries 'soc_kwh', 'charge_kwh', 'discharge_kwh' (np.ndarray) et
+              totaux 'autoconso_total_kwh', 'surplus_total_kwh', 'import_total_kwh',
+              'autoconso_direct_kwh', 'energy_cycled_kwh'
+    """
+    production = np.ascontiguousarray(production_kw, dtype=np.float64)
+    consommation = np.ascontiguousarray(consommation_kw, dtype=np.float64)
+    net = production - consommation
+
+    efficiency = params.efficacite
+
+    soc_serie, charge_serie, discharge_serie = _recurrence_soc(
+        net.tolist(),
+        params.soc_initial,
+        params.soc_min,
+        params.soc_max,
+        efficiency,
+        params.puissance_max_kw
+    )
+
+    soc_kwh = np.array(soc_serie)
+    charge_kwh = np.array(charge_serie)
+    discharge_kwh = np.array(discharge_serie)
+
+    # Totaux vectorisés
+    autoconso_direct = float(np.minimum(production, consommation).sum())
+    discharge_total = float(discharge_kwh.sum())
+    energy_cycled = float(charge_kwh.sum())
+    surplus_brut = float(np.maximum(net, 0).sum())
+    deficit_brut = float(np.maximum(-net, 0).sum())
+
+    return {
+        'soc_kwh': soc_kwh,
+        'charge_kwh': charge_kwh,
+        'discharge_kwh': discharge_kwh,
+        'autoconso_direct_kwh': autoconso_direct,
+        'autoconso_total_kwh': autoconso_direct + discharge_total,
+        'surplus_total_kwh': surplus_brut - energy_cycled / efficiency,
+        'import_total_kwh': deficit_brut - discharge_total,
+        'energy_cycled_kwh': energy_cycled,
+    }
+
+
+# ==============================================================================
+# SIMULATION MULTI-CAPACITÉS
+# ==============================================================================
+
+# En dessous de ce nombre de voies, la récurrence scalaire voie par voie
+# coûte moins cher que les appels NumPy par heure de la version vectorielle
+SEUIL_VOIES_VECTORIELLES = 10
+
+
+@dataclass
+class BatchDispatchResults:
+    """
+    Résultats de N batteries simulées en parallèle (une voie par batterie).
+
+    Chaque attribut est un tableau de forme (N,) ; les séries horaires
+    (N, 8760) ne sont conservées que sur demande.
+    """
+
+    capacites_utilisables_kwh: np.ndarray
+    puissances_max_kw: np.ndarray
+    efficacites: np.ndarray
+
+    production_kwh: np.ndarray
+    autoconso_direct_kwh: np.ndarray
+    autoconso_total_kwh: np.ndarray
+    surplus_total_kwh: np.ndarray
+    import_total_kwh: np.ndarray
+    energy_cycled_kwh: np.ndarray
+
+    soc_kwh: np.ndarray = None
+    charge_kwh: np.ndarray = None
+    discharge_kwh: np.ndarray = None
+
+    def __len__(self) -> int:
+        return len(self.capacites_utilisables_kwh)
+
+    @property
+    def taux_autoconso_pct(self) -> np.ndarray:
+        production = np.where(self.production_kwh > 0, self.production_kwh, 1.0)
+        return np.where(self.production_kwh > 0, self.autoconso_total_kwh / production * 100, 0.0)
+
+    @property
+    def cycles_annuels(self) -> np.ndarray:
+        return self.energy_cycled_kwh / self.capacites_utilisables_kwh
+
+    def to_table(self) -> Dict[float, Dict]:
+        """
+        Tableau des résultats indexé par capacité utilisable.
+
+        Returns:
+            dict: {capacité: {'autoconso_total_kwh', 'taux_autoconso_pct',
+                   'surplus_total_kwh', 'import_total_kwh', 'cycles_annuels', ...}}
+
+        Example:
+            >>> table = simulate_dispatch_batch(prod, conso, [5, 10]).to_table()
+            >>> table[10.0]['taux_autoconso_pct']
+            78.4
+        """
+        taux = self.taux_autoconso_pct
+        cycles = self.cycles_annuels
+        table = {}
+        for i, capacite in enumerate(self.capacites_utilisables_kwh.tolist()):
+            table[capacite] = {
+                'capacite_utilisable_kwh': capacite,
+                'puissance_max_kw': float(self.puissances_max_kw[i]),
+                'efficacite': float(self.efficacites[i]),
+                'autoconso_total_kwh': round(float(self.autoconso_total_kwh[i]), 0),
+                'taux_autoconso_pct': round(float(taux[i]), 1),
+                'surplus_total_kwh': round(float(self.surplus_total_kwh[i]), 0),
+                'import_total_kwh': round(float(self.import_total_kwh[i]), 0),
+                'cycles_annuels': round(float(cycles[i]), 0),
+            }
+        return table
+
+
+def _recurrence_soc_vectorielle(
+    net: np.ndarray,
+    soc: np.ndarray,
+    soc_min: np.ndarray,
+    soc_max: np.ndarray,
+    efficiency: np.ndarray,
+    power_max: np.ndarray,
+    keep_series: bool
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Récurrence SOC vectorielle : une voie par batterie, min/max NumPy par heure.
+
+    Args:
+        net: Production - consommation (8760, N)
+        soc: État de charge initial (N,)
+
+    Returns:
+        tuple: SOC (ou None), charge stockée, décharge — tableaux (8760, N)
+    """
+    nb_heures, nb_voies = net.shape
+    inv_efficiency = 1 / efficiency
+    soc = np.array(soc, dtype=np.float64)
+
+    # Flux contigus par heure : surplus et déficit bornés par la puissance max
+    charge_max = np.ascontiguousarray(np.minimum(np.maximum(net, 0), power_max))
+    discharge_max = np.ascontiguousarray(np.minimum(np.maximum(-net, 0), power_max))
+
+    # Heures où au moins une voie peut charger / décharger (les autres sont sautées)
+    heures_charge = (charge_max > 0).any(axis=1).tolist()
+    heures_decharge = (discharge_max > 0).any(axis=1).tolist()
+
+    charge = np.zeros((nb_heures, nb_voies))
+    discharge = np.zeros((nb_heures, nb_voies))
+    soc_serie = np.empty((nb_heures, nb_voies)) if keep_series else None
+    tampon = np.empty(nb_voies)
+
+    for h in range(nb_heures):
+        if heures_charge[h]:
+            # Charge : min(surplus, place libre, puissance max), stockée × rendement
+            charge_h = charge[h]
+            np.subtract(soc_max, soc, out=charge_h)
+            np.minimum(charge_max[h], charge_h, out=charge_h)
+            charge_h *= efficiency
+            soc += charge_h
+
+        if heures_decharge[h]:
+            # Décharge : min(déficit, SOC - SOC min, puissance max), positive
+            discharge_h = discharge[h]
+            np.subtract(soc, soc_min, out=discharge_h)
+            np.minimum(discharge_max[h], discharge_h, out=discharge_h)
+            np.maximum(discharge_h, 0, out=discharge_h)
+            np.multiply(discharge_h, inv_efficiency, out=tampon)
+            soc -= tampon
+
+        if keep_series:
+            soc_serie[h] = soc
+
+    return soc_serie, charge, discharge
+
+
+def simulate_dispatch_batch(
+    production_kw: np.ndarray,
+    consommation_kw: np.ndarray,
+    capacites_utilisables_kwh,
+    puissances_max_kw=None,
+    efficacites=0.95,
+    dod_max=0.90,
+    soc_initial_ratio: float = 0.5,
+    keep_series: bool = False
+) -> BatchDispatchResults:
+    """
+    Simule N batteries en une seule boucle sur les 8760 heures.
+
+    L'état de charge est un vecteur (une voie par batterie) avancé heure par
+    heure avec des min/max vectoriels : le coût Python ne dépend plus du
+    nombre de capacités comparées. Chaque voie reproduit exactement
+    simulate_dispatch.
+
+    Args:
+        production_kw: Production horaire (8760,) commune ou (N, 8760) par voie
+        consommation_kw: Consommation horaire (8760,) commune ou (N, 8760) par voie
+        capacites_utilisables_kwh: Capacités utilisables (N,)
+        puissances_max_kw: Puissances max (scalaire ou (N,)). Défaut : capacité / 2
+        efficacites: Rendements (scalaire ou (N,))
+        dod_max: Profondeurs de décharge (scalaire ou (N,))
+        soc_initial_ratio: État de charge initial (fraction de la capacité)
+        keep_series: Conserver les séries SOC/charge/décharge (N, 8760)
+
+    Returns:
+        BatchDispatchResults: Totaux par voie
+
+    Example:
+        >>> res = simulate_dispatch_batch(prod, conso, STANDARD_CAPACITIES)
+        >>> res.taux_autoconso_pct
+        array([62.1, 70.4, 75.2, 79.8, 82.3, 83.1])
+    """
+    capacites = np.atleast_1d(np.asarray(capacites_utilisables_kwh, dtype=np.float64))
+    nb_voies = len(capacites)
+    if puissances_max_kw is None:
+        puissances_max_kw = capacites / 2
+    power_max = np.broadcast_to(np.asarray(puissances_max_kw, dtype=np.float64), (nb_voies,)).copy()
+    efficiency = np.broadcast_to(np.asarray(efficacites, dtype=np.float64), (nb_voies,)).copy()
+    dod = np.broadcast_to(np.asarray(dod_max, dtype=np.float64), (nb_voies,))
+
+    soc_max = capacites
+    soc_min = capacites * (1 - dod)
+    inv_efficiency = 1 / efficiency
+
+    production = np.asarray(production_kw, dtype=np.float64)
+    consommation = np.asarray(consommation_kw, dtype=np.float64)
+    nb_heures = np.broadcast_shapes(production.shape, consommation.shape)[-1]
+
+    net = np.broadcast_to(production - consommation, (nb_voies, nb_heures)).T
+
+    if nb_voies < SEUIL_VOIES_VECTORIELLES:
+        # Peu de voies : la récurrence scalaire par voie est plus rapide
+        series = [
+            _recurrence_soc(
+                net[:, i].tolist(),
+                float(soc_max[i] * soc_initial_ratio),
+                float(soc_min[i]),
+                float(soc_max[i]),
+                float(efficiency[i]),
+                float(power_max[i])
+            )
+            for i in range(nb_voies)
+        ]
+        soc_serie = np.array([serie[0] for serie in series]).T if keep_series else None
+        charge = np.array([serie[1] for serie in series]).T
+        discharge = np.array([serie[2] for serie in series]).T
+    else:
+        soc_serie, charge, discharge = _recurrence_soc_vectorielle(
+            net, soc_max * soc_initial_ratio, soc_min, soc_max, efficiency, power_max, keep_series
+        )
+
+    # Totaux vectorisés
+    production_totale = np.broadcast_to(production.sum(axis=-1), (nb_voies,))
+    autoconso_direct = np.broadcast_to(np.minimum(production, consommation).sum(axis=-1), (nb_voies,))
+    surplus_brut = np.maximum(net, 0).sum(axis=0)
+    deficit_brut = np.maximum(-net, 0).sum(axis=0)
+    energy_cycled = charge.sum(axis=0)
+    discharge_total = discharge.sum(axis=0)
+
+    return BatchDispatchResults(
+        capacites_utilisables_kwh=capacites,
+        puissances_max_kw=power_max,
+        efficacites=efficiency,
+        production_kwh=np.array(production_totale),
+        autoconso_direct_kwh=np.array(autoconso_direct),
+        autoconso_total_kwh=autoconso_direct + discharge_total,
+        surplus_total_kwh=surplus_brut - energy_cycled * inv_efficiency,
+        import_total_kwh=deficit_brut - discharge_total,
+        energy_cycled_kwh=energy_cycled,
+        soc_kwh=soc_serie.T if keep_series else None,
+        charge_kwh=charge.T if keep_series else None,
+        discharge_kwh=discharge.T if keep_series else None,
+    )
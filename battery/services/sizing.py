@@ -5,9 +5,19 @@ battery/services/sizing.py
 Recommandation de capacité selon profil et comparaison de scénarios
 """
 
+import hashlib
+import logging
+import math
+from collections import OrderedDict
 from typing import Dict, List, Tuple
 from decimal import Decimal
 
+import numpy as np
+
+from .dispatch import simulate_dispatch_batch
+
+logger = logging.getLogger(__name__)
+
 
 # ==============================================================================
 # RÈGLES DE DIMENSIONNEMENT PAR PROFIL
@@ -44,6 +54,13 @@ SIZING_RULES = {
 # Capacités standards disponibles sur le marché
 STANDARD_CAPACITIES = [3, 5, 7, 10, 13.5, 15]
 
+# Conventions BatterySystem : 90% de capacité utilisable, puissance = 0.5C
+RATIO_CAPACITE_UTILISABLE = 0.9
+RATIO_PUISSANCE_CAPACITE = 0.5
+
+# Taille max du cache des simulations horaires (entrées par capacité)
+HOURLY_SIZING_CACHE_SIZE = 2048
+
 
 # ==============================================================================
 # FONCTIONS DE DIMENSIONNEMENT
@@ -93,16 +110,25 @@ def calculate_optimal_capacity(
     production_annuelle_kwh: float,
     consommation_annuelle_kwh: float,
     profil_type: str = 'actif_absent',
-    taux_autoconso_cible: float = 75.0
+    taux_autoconso_cible: float = 75.0,
+    production_horaire_kw: np.ndarray = None,
+    consommation_horaire_kw: np.ndarray = None
 ) -> Dict:
     """
     Calcule la capacité optimale pour atteindre un taux d'autoconsommation cible.
     
+    Si les flux horaires de la simulation sont fournis, chaque capacité
+    standard est simulée heure par heure (voir simulate_battery_capacities)
+    et la plus petite atteignant la cible est retenue. Sinon, estimation
+    empirique selon le profil.
+    
     Args:
         production_annuelle_kwh: Production solaire
         consommation_annuelle_kwh: Consommation
         profil_type: Type de profil
         taux_autoconso_cible: Taux d'autoconsommation visé (%)
+        production_horaire_kw: Production horaire réelle (8760, optionnel)
+        consommation_horaire_kw: Consommation horaire réelle (8760, optionnel)
     
     Returns:
         Dict avec capacité optimale et métriques associées
@@ -117,6 +143,13 @@ def calculate_optimal_capacity(
             'ratio_capacite_prod': 0.625
         }
     """
+    if production_horaire_kw is not None and consommation_horaire_kw is not None:
+        return _calculate_optimal_capacity_hourly(
+            production_horaire_kw,
+            consommation_horaire_kw,
+            taux_autoconso_cible
+        )
+    
     prod_jour_moy = production_annuelle_kwh / 365
     conso_jour_moy = consommation_annuelle_kwh / 365
     
@@ -165,11 +198,17 @@ def compare_battery_sizes(
     profil_type: str = 'actif_absent',
     capacites: List[float] = None,
     prix_achat_kwh: float = 0.2276,
-    prix_vente_kwh: float = 0.13
+    prix_vente_kwh: float = 0.13,
+    production_horaire_kw: np.ndarray = None,
+    consommation_horaire_kw: np.ndarray = None
 ) -> Dict[float, Dict]:
     """
     Compare différentes capacités de batterie.
     
+    Si les flux horaires de la simulation sont fournis, les gains sont
+    simulés heure par heure sur les courbes réelles (résultats mémoïsés).
+    Sinon, estimation empirique selon le profil (_estimate_autoconso_rate).
+    
     Args:
         production_annuelle_kwh: Production solaire
         consommation_annuelle_kwh: Consommation
@@ -177,6 +216,8 @@ def compare_battery_sizes(
         capacites: Liste de capacités à comparer (si None, utilise standards)
         prix_achat_kwh: Prix achat électricité (€/kWh)
         prix_vente_kwh: Prix vente surplus (€/kWh)
+        production_horaire_kw: Production horaire réelle (8760, optionnel)
+        consommation_horaire_kw: Consommation horaire réelle (8760, optionnel)
     
     Returns:
         Dict avec comparaison pour chaque capacité
@@ -189,6 +230,15 @@ def compare_battery_sizes(
     if capacites is None:
         capacites = [5, 7, 10, 13.5]
     
+    if production_horaire_kw is not None and consommation_horaire_kw is not None:
+        return _compare_battery_sizes_hourly(
+            production_horaire_kw,
+            consommation_horaire_kw,
+            capacites,
+            prix_achat_kwh,
+            prix_vente_kwh
+        )
+    
     # Import dynamique pour éviter circular imports
     from battery.pricing import get_battery_price
     
@@ -262,16 +312,25 @@ def get_sizing_recommendations(
     production_annuelle_kwh: float,
     consommation_annuelle_kwh: float,
     profil_type: str = 'actif_absent',
-    budget_max: float = None
+    budget_max: float = None,
+    capacites: List[float] = None,
+    production_horaire_kw: np.ndarray = None,
+    consommation_horaire_kw: np.ndarray = None
 ) -> Dict:
     """
     Fournit des recommandations complètes de dimensionnement.
     
+    Avec les flux horaires réels, la comparaison est simulée et complétée
+    par l'optimum continu (optimize_battery_capacity) sous le même budget.
+    
     Args:
         production_annuelle_kwh: Production solaire
         consommation_annuelle_kwh: Consommation
         profil_type: Type de profil
         budget_max: Budget maximum pour la batterie (optionnel)
+        capacites: Capacités comparées (si None, celles de compare_battery_sizes)
+        production_horaire_kw: Production horaire réelle (8760, optionnel)
+        consommation_horaire_kw: Consommation horaire réelle (8760, optionnel)
     
     Returns:
         Dict avec recommandations détaillées
@@ -287,7 +346,10 @@ def get_sizing_recommendations(
     comparison = compare_battery_sizes(
         production_annuelle_kwh,
         consommation_annuelle_kwh,
-        profil_type
+        profil_type,
+        capacites=capacites,
+        production_horaire_kw=production_horaire_kw,
+        consommation_horaire_kw=consommation_horaire_kw
     )
     
     # Filtrer par budget si spécifié
@@ -322,7 +384,7 @@ def get_sizing_recommendations(
         profil_type
     )
     
-    return {
+    recommandations = {
         'profil': profil_type,
         'production_annuelle': production_annuelle_kwh,
         'consommation_annuelle': consommation_annuelle_kwh,
@@ -356,6 +418,385 @@ def get_sizing_recommendations(
         
         'comparaison_complete': comparison
     }
+    
+    # Optimum continu sur flux horaires réels
+    if production_horaire_kw is not None and consommation_horaire_kw is not None:
+        recommandations['capacite_optimale_continue'] = optimize_battery_capacity(
+            production_horaire_kw,
+            consommation_horaire_kw,
+            budget_max=budget_max
+        )
+    
+    return recommandations
+
+
+# ==============================================================================
+# DIMENSIONNEMENT SUR FLUX HORAIRES RÉELS
+# ==============================================================================
+
+# Cache mémoire : (empreinte prod, empreinte conso, capacité, puissance,
+# rendement, DoD) → totaux annuels de la voie simulée
+_HOURLY_SIZING_CACHE: "OrderedDict[Tuple, Dict]" = OrderedDict()
+
+
+def _flux_digest(valeurs: np.ndarray) -> str:
+    """Empreinte (blake2b) d'une série horaire float64."""
+    return hashlib.blake2b(np.ascontiguousarray(valeurs, dtype=np.float64).tobytes(), digest_size=16).hexdigest()
+
+
+def clear_sizing_cache() -> None:
+    """Vide le cache des simulations horaires de dimensionnement."""
+    _HOURLY_SIZING_CACHE.clear()
+
+
+def simulate_battery_capacities(
+    production_horaire_kw: np.ndarray,
+    consommation_horaire_kw: np.ndarray,
+    capacites: List[float] = None,
+    marque: str = 'standard'
+) -> Dict[float, Dict]:
+    """
+    Simule heure par heure plusieurs capacités sur les flux réels.
+    
+    Chaque capacité nominale suit les conventions de BatterySystem
+    (90% utilisable, puissance 0.5C) avec le rendement et la DoD de la
+    gamme. Les capacités absentes du cache sont simulées ensemble dans
+    une seule boucle (simulate_dispatch_batch) ; les appels suivants pour
+    les mêmes courbes ne coûtent qu'un calcul d'empreinte.
+    
+    Args:
+        production_horaire_kw: Production horaire (8760)
+        consommation_horaire_kw: Consommation horaire (8760)
+        capacites: Capacités nominales (kWh), défaut STANDARD_CAPACITIES
+        marque: Gamme ('economique', 'standard', 'premium')
+    
+    Returns:
+        Dict {capacité: {'autoconso_total_kwh', 'surplus_total_kwh',
+              'import_total_kwh', 'energy_cycled_kwh', 'capacite_utilisable_kwh'}}
+    
+    Example:
+        >>> sims = simulate_battery_capacities(prod, conso, [5, 10])
+        >>> sims[10]['autoconso_total_kwh']
+        4812.3
+    """
+    from battery.pricing import BATTERY_PRICING_2025
+    
+    if capacites is None:
+        capacites = STANDARD_CAPACITIES
+    
+    caracteristiques = BATTERY_PRICING_2025['caracteristiques'][marque]
+    efficacite = caracteristiques['efficacite']
+    dod_max = caracteristiques['dod_max']
+    
+    production = np.ascontiguousarray(production_horaire_kw, dtype=np.float64)
+    consommation = np.ascontiguousarray(consommation_horaire_kw, dtype=np.float64)
+    empreinte = (_flux_digest(production), _flux_digest(consommation))
+    
+    def cle(capacite):
+        return empreinte + (
+            float(capacite),
+            capacite * RATIO_PUISSANCE_CAPACITE,
+            efficacite,
+            dod_max
+        )
+    
+    # Simuler en une passe toutes les capacités manquantes
+    manquantes = [c for c in dict.fromkeys(capacites) if cle(c) not in _HOURLY_SIZING_CACHE]
+    if manquantes:
+        capacites_nominales = np.asarray(manquantes, dtype=np.float64)
+        batch = simulate_dispatch_batch(
+            production,
+            consommation,
+            capacites_nominales * RATIO_CAPACITE_UTILISABLE,
+            puissances_max_kw=capacites_nominales * RATIO_PUISSANCE_CAPACITE,
+            efficacites=efficacite,
+            dod_max=dod_max
+        )
+        for i, capacite in enumerate(manquantes):
+            _HOURLY_SIZING_CACHE[cle(capacite)] = {
+                'capacite_utilisable_kwh': float(batch.capacites_utilisables_kwh[i]),
+                'autoconso_total_kwh': float(batch.autoconso_total_kwh[i]),
+                'surplus_total_kwh': float(batch.surplus_total_kwh[i]),
+                'import_total_kwh': float(batch.import_total_kwh[i]),
+                'energy_cycled_kwh': float(batch.energy_cycled_kwh[i]),
+            }
+    
+    resultats = {}
+    for capacite in capacites:
+        cle_capacite = cle(capacite)
+        _HOURLY_SIZING_CACHE.move_to_end(cle_capacite)
+        resultats[capacite] = _HOURLY_SIZING_CACHE[cle_capacite]
+    
+    while len(_HOURLY_SIZING_CACHE) > HOURLY_SIZING_CACHE_SIZE:
+        _HOURLY_SIZING_CACHE.popitem(last=False)
+    
+    return resultats
+
+
+def _compare_battery_sizes_hourly(
+    production_horaire_kw: np.ndarray,
+    consommation_horaire_kw: np.ndarray,
+    capacites: List[float],
+    prix_achat_kwh: float,
+    prix_vente_kwh: float,
+    marque: str = 'standard'
+) -> Dict[float, Dict]:
+    """Comparaison des capacités sur flux horaires réels (même format que compare_battery_sizes)."""
+    from battery.pricing import get_battery_price
+    
+    production = np.asarray(production_horaire_kw, dtype=np.float64)
+    consommation = np.asarray(consommation_horaire_kw, dtype=np.float64)
+    
+    production_annuelle_kwh = float(production.sum())
+    consommation_annuelle_kwh = float(consommation.sum())
+    if production_annuelle_kwh <= 0:
+        raise ValueError("Production horaire nulle : dimensionnement impossible")
+    
+    # Sans batterie : autoconsommation directe réelle
+    autoconso_sans = float(np.minimum(production, consommation).sum())
+    taux_sans_batterie = autoconso_sans / production_annuelle_kwh * 100
+    injection_sans = production_annuelle_kwh - autoconso_sans
+    achat_sans = consommation_annuelle_kwh - autoconso_sans
+    cout_sans = achat_sans * prix_achat_kwh - injection_sans * prix_vente_kwh
+    
+    prod_jour_moy = production_annuelle_kwh / 365
+    simulations = simulate_battery_capacities(production, consommation, capacites, marque)
+    
+    comparison = {}
+    
+    for capacite in capacites:
+        simulation = simulations[capacite]
+        
+        autoconso_avec = simulation['autoconso_total_kwh']
+        taux_avec = autoconso_avec / production_annuelle_kwh * 100
+        gain_autoconso = autoconso_avec - autoconso_sans
+        injection_avec = simulation['surplus_total_kwh']
+        achat_avec = simulation['import_total_kwh']
+        
+        cout_avec = achat_avec * prix_achat_kwh - injection_avec * prix_vente_kwh
+        economie_annuelle = cout_sans - cout_avec
+        
+        prix_data = get_battery_price(capacite, marque=marque)
+        cout_batterie = prix_data['prix_total_ttc']
+        roi_ans = cout_batterie / economie_annuelle if economie_annuelle > 0 else float('inf')
+        
+        cycles_annuels = simulation['energy_cycled_kwh'] / simulation['capacite_utilisable_kwh']
+        
+        comparison[capacite] = {
+            'capacite_kwh': capacite,
+            'taux_autoconso_pct': round(taux_avec, 1),
+            'gain_autoconso_pct': round(taux_avec - taux_sans_batterie, 1),
+            'autoconso_kwh': round(autoconso_avec, 0),
+            'gain_autoconso_kwh': round(gain_autoconso, 0),
+            'injection_kwh': round(injection_avec, 0),
+            'achat_kwh': round(achat_avec, 0),
+            'economie_annuelle_euros': round(economie_annuelle, 2),
+            'cout_batterie_euros': cout_batterie,
+            'roi_ans': round(roi_ans, 1),
+            'cycles_annuels': round(cycles_annuels, 0),
+            'ratio_capacite_prod': round(capacite / prod_jour_moy, 3),
+            'prix_par_kwh': prix_data['prix_par_kwh']
+        }
+    
+    return comparison
+
+
+def _calculate_optimal_capacity_hourly(
+    production_horaire_kw: np.ndarray,
+    consommation_horaire_kw: np.ndarray,
+    taux_autoconso_cible: float
+) -> Dict:
+    """Plus petite capacité standard atteignant le taux cible sur flux horaires réels."""
+    production = np.asarray(production_horaire_kw, dtype=np.float64)
+    consommation = np.asarray(consommation_horaire_kw, dtype=np.float64)
+    
+    production_annuelle_kwh = float(production.sum())
+    if production_annuelle_kwh <= 0:
+        raise ValueError("Production horaire nulle : dimensionnement impossible")
+    
+    prod_jour_moy = production_annuelle_kwh / 365
+    conso_jour_moy = float(consommation.sum()) / 365
+    taux_sans_batterie = float(np.minimum(production, consommation).sum()) / production_annuelle_kwh * 100
+    
+    if taux_sans_batterie >= taux_autoconso_cible:
+        capacite_standard = 0
+        taux_estime = taux_sans_batterie
+    else:
+        simulations = simulate_battery_capacities(production, consommation, STANDARD_CAPACITIES)
+        taux = {
+            capacite: simulation['autoconso_total_kwh'] / production_annuelle_kwh * 100
+            for capacite, simulation in simulations.items()
+        }
+        # Cible inatteignable : capacité au meilleur taux
+        capacite_standard = next(
+            (capacite for capacite in STANDARD_CAPACITIES if taux[capacite] >= taux_autoconso_cible),
+            max(taux, key=taux.get)
+        )
+        taux_estime = taux[capacite_standard]
+    
+    return {
+        'capacite_kwh': capacite_standard,
+        'taux_autoconso_estime': round(taux_estime, 1),
+        'taux_sans_batterie': round(taux_sans_batterie, 1),
+        'gain_estime': round(taux_estime - taux_sans_batterie, 1),
+        'production_jour_moy': round(prod_jour_moy, 1),
+        'consommation_jour_moy': round(conso_jour_moy, 1),
+        'ratio_capacite_prod': round(capacite_standard / prod_jour_moy, 3)
+    }
+
+
+# ==============================================================================
+# OPTIMISATION CONTINUE DE LA CAPACITÉ
+# ==============================================================================
+
+# Nombre d'or pour la recherche par section dorée
+_RATIO_OR = (math.sqrt(5) - 1) / 2
+
+
+def _capacite_max_budget(
+    budget_max: float,
+    marque: str,
+    capacite_min: float,
+    capacite_max: float
+) -> float:
+    """Plus grande capacité dont le prix (interpolé) tient dans le budget (dichotomie)."""
+    from battery.pricing import get_battery_price
+    
+    if get_battery_price(capacite_max, marque)['prix_total_ttc'] <= budget_max:
+        return capacite_max
+    
+    bas, haut = capacite_min, capacite_max
+    for _ in range(40):
+        milieu = (bas + haut) / 2
+        if get_battery_price(milieu, marque)['prix_total_ttc'] <= budget_max:
+            bas = milieu
+        else:
+            haut = milieu
+    return bas
+
+
+def optimize_battery_capacity(
+    production_horaire_kw: np.ndarray,
+    consommation_horaire_kw: np.ndarray,
+    capacite_min: float = 1.0,
+    capacite_max: float = 20.0,
+    budget_max: float = None,
+    marque: str = 'standard',
+    prix_achat_kwh: float = 0.2276,
+    prix_vente_kwh: float = 0.13,
+    pas_commercial: float = 0.5,
+    max_evaluations: int = 15
+) -> Dict:
+    """
+    Cherche la capacité au meilleur ROI sur l'économie simulée heure par heure.
+    
+    Le ROI (coût / économie annuelle) est unimodal par morceaux : le prix
+    est interpolé linéairement entre les capacités de BATTERY_PRICING_2025.
+    1. Les points de prix du marché compris dans les bornes sont simulés en
+       une passe pour encadrer le minimum
+    2. Une section dorée affine le minimum dans cet encadrement
+    3. Le résultat est arrondi au pas commercial le plus favorable
+    
+    Args:
+        production_horaire_kw: Production horaire réelle (8760)
+        consommation_horaire_kw: Consommation horaire réelle (8760)
+        capacite_min: Capacité nominale minimale (kWh)
+        capacite_max: Capacité nominale maximale (kWh)
+        budget_max: Budget maximum (€), borne la capacité via le prix interpolé
+        marque: Gamme de prix ('economique', 'standard', 'premium')
+        prix_achat_kwh: Prix achat électricité (€/kWh)
+        prix_vente_kwh: Prix vente surplus (€/kWh)
+        pas_commercial: Pas de la grille commerciale (kWh)
+        max_evaluations: Nombre maximal de simulations
+    
+    Returns:
+        Dict: ligne de comparaison de la capacité retenue (format
+        compare_battery_sizes) + 'capacite_continue_kwh', 'capacite_max_kwh',
+        'evaluations'
+    
+    Example:
+        >>> optimum = optimize_battery_capacity(prod, conso, budget_max=6000)
+        >>> optimum['capacite_kwh'], optimum['roi_ans']
+        (8.5, 36.1)
+    """
+    from battery.pricing import BATTERY_PRICING_2025, get_battery_price
+    
+    if budget_max:
+        if get_battery_price(capacite_min, marque)['prix_total_ttc'] > budget_max:
+            return {
+                'erreur': f"Aucune batterie disponible pour budget {budget_max}€",
+                'budget_minimum': get_battery_price(capacite_min, marque)['prix_total_ttc']
+            }
+        capacite_max = _capacite_max_budget(budget_max, marque, capacite_min, capacite_max)
+    
+    evaluations = {}
+    
+    def evaluer(capacites):
+        """Simule les capacités non encore évaluées (en une passe)."""
+        nouvelles = [c for c in dict.fromkeys(round(float(c), 3) for c in capacites) if c not in evaluations]
+        if nouvelles:
+            evaluations.update(_compare_battery_sizes_hourly(
+                production_horaire_kw,
+                consommation_horaire_kw,
+                nouvelles,
+                prix_achat_kwh,
+                prix_vente_kwh,
+                marque
+            ))
+    
+    def roi(capacite):
+        data = evaluations[round(capacite, 3)]
+        if data['economie_annuelle_euros'] <= 0:
+            return float('inf')
+        return data['cout_batterie_euros'] / data['economie_annuelle_euros']
+    
+    # 1. Encadrement sur les points de prix du marché
+    points = sorted({capacite_min, capacite_max} | {
+        float(c) for c in BATTERY_PRICING_2025['capacites'] if capacite_min < c < capacite_max
+    })
+    evaluer(points)
+    meilleur = min(range(len(points)), key=lambda i: roi(points[i]))
+    bas = points[max(meilleur - 1, 0)]
+    haut = points[min(meilleur + 1, len(points) - 1)]
+    
+    # 2. Section dorée dans l'encadrement
+    x1 = haut - _RATIO_OR * (haut - bas)
+    x2 = bas + _RATIO_OR * (haut - bas)
+    evaluer([x1, x2])
+    while haut - bas > pas_commercial and len(evaluations) < max_evaluations - 2:
+        if roi(x1) <= roi(x2):
+            haut, x2 = x2, x1
+            x1 = haut - _RATIO_OR * (haut - bas)
+            evaluer([x1])
+        else:
+            bas, x1 = x1, x2
+            x2 = bas + _RATIO_OR * (haut - bas)
+            evaluer([x2])
+    
+    capacite_continue = min(evaluations, key=roi)
+    
+    # 3. Arrondi à la grille commerciale (dans les bornes)
+    candidats = [
+        c for c in (
+            math.floor(capacite_continue / pas_commercial) * pas_commercial,
+            math.ceil(capacite_continue / pas_commercial) * pas_commercial
+        )
+        if capacite_min <= c <= capacite_max
+    ] or [capacite_continue]
+    evaluer(candidats)
+    capacite_retenue = min((round(float(c), 3) for c in candidats), key=roi)
+    
+    logger.info(
+        f"🔋 Optimisation capacité : {capacite_retenue} kWh "
+        f"(ROI {evaluations[capacite_retenue]['roi_ans']} ans, {len(evaluations)} simulations)"
+    )
+    
+    return {
+        **evaluations[capacite_retenue],
+        'capacite_continue_kwh': round(capacite_continue, 2),
+        'capacite_max_kwh': round(capacite_max, 2),
+        'evaluations': len(evaluations)
+    }
 
 
 # ==============================================================================
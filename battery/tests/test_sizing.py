@@ -0,0 +1,158 @@
+"""
+Tests unitaires pour le dimensionnement batterie sur flux horaires.
+"""
+
+import numpy as np
+import pytest
+
+from battery.services import sizing
+from battery.services.dispatch import BatteryParams, simulate_dispatch
+
+
+@pytest.fixture
+def flux_annuels():
+    """Production solaire en cloche et consommation bruitée sur 8760 h."""
+    rng = np.random.default_rng(7)
+    heures = np.arange(8760) % 24
+    production = np.clip(np.sin((heures - 6) / 12 * np.pi), 0, None) * 4.0
+    production *= rng.uniform(0.3, 1.0, 8760)
+    consommation = rng.uniform(0.2, 2.0, 8760)
+    return production, consommation
+
+
+@pytest.fixture(autouse=True)
+def cache_vide():
+    sizing.clear_sizing_cache()
+    yield
+    sizing.clear_sizing_cache()
+
+
+class TestHourlySizing:
+    """Tests du mode de dimensionnement sur flux horaires réels."""
+
+    def test_simulation_conforme_au_noyau(self, flux_annuels):
+        """Une capacité nominale suit les conventions BatterySystem (0.9 utilisable, 0.5C)."""
+        production, consommation = flux_annuels
+
+        simulations = sizing.simulate_battery_capacities(production, consommation, [10])
+        params = BatteryParams(capacite_utilisable_kwh=9.0, puissance_max_kw=5.0)
+        attendu = simulate_dispatch(production, consommation, params)
+
+        assert simulations[10]['autoconso_total_kwh'] == pytest.approx(attendu['autoconso_total_kwh'])
+        assert simulations[10]['import_total_kwh'] == pytest.approx(attendu['import_total_kwh'])
+
+    def test_memoisation(self, flux_annuels, monkeypatch):
+        """Un second appel sur les mêmes courbes ne relance aucune simulation."""
+        production, consommation = flux_annuels
+        sizing.simulate_battery_capacities(production, consommation, [5, 10])
+
+        def interdit(*args, **kwargs):
+            raise AssertionError("simulation relancée")
+
+        monkeypatch.setattr(sizing, 'simulate_dispatch_batch', interdit)
+        resultat = sizing.simulate_battery_capacities(production.copy(), consommation.copy(), [10, 5])
+
+        assert list(resultat) == [10, 5]
+
+    def test_comparaison_sur_flux_reels(self, flux_annuels):
+        """compare_battery_sizes utilise les flux horaires quand ils sont fournis."""
+        production, consommation = flux_annuels
+
+        comparaison = sizing.compare_battery_sizes(
+            0, 0,
+            capacites=[5, 10],
+            production_horaire_kw=production,
+            consommation_horaire_kw=consommation
+        )
+
+        taux_sans = np.minimum(production, consommation).sum() / production.sum() * 100
+        for capacite, data in comparaison.items():
+            assert data['gain_autoconso_pct'] == pytest.approx(data['taux_autoconso_pct'] - taux_sans, abs=0.1)
+            assert data['economie_annuelle_euros'] > 0
+        assert comparaison[10]['taux_autoconso_pct'] >= comparaison[5]['taux_autoconso_pct']
+
+    def test_recommandations_sur_flux_reels(self, flux_annuels):
+        """Avec les flux horaires, les recommandations incluent l'optimum continu."""
+        production, consommation = flux_annuels
+
+        reco = sizing.get_sizing_recommendations(
+            0, 0,
+            capacites=sizing.STANDARD_CAPACITIES,
+            production_horaire_kw=production,
+            consommation_horaire_kw=consommation
+        )
+
+        assert list(reco['comparaison_complete']) == sizing.STANDARD_CAPACITIES
+        assert reco['capacite_optimale_continue'] == sizing.optimize_battery_capacity(production, consommation)
+
+    def test_capacite_optimale_atteint_la_cible(self, flux_annuels):
+        """La capacité retenue est la plus petite qui atteint le taux cible."""
+        production, consommation = flux_annuels
+        taux_sans = np.minimum(production, consommation).sum() / production.sum() * 100
+
+        resultat = sizing.calculate_optimal_capacity(
+            0, 0,
+            taux_autoconso_cible=taux_sans + 5,
+            production_horaire_kw=production,
+            consommation_horaire_kw=consommation
+        )
+
+        assert resultat['taux_autoconso_estime'] >= round(taux_sans + 5, 1)
+        plus_petites = [c for c in sizing.STANDARD_CAPACITIES if c < resultat['capacite_kwh']]
+        taux = sizing.compare_battery_sizes(
+            0, 0, capacites=plus_petites,
+            production_horaire_kw=production, consommation_horaire_kw=consommation
+        )
+        assert all(data['taux_autoconso_pct'] < taux_sans + 5 for data in taux.values())
+
+
+@pytest.fixture
+def flux_residentiels():
+    """Production saisonnière et consommation à pics matin/soir."""
+    rng = np.random.default_rng(0)
+    heures = np.arange(8760) % 24
+    jours = np.arange(8760) // 24
+    saison = 1 + 0.4 * np.sin((jours - 80) * 2 * np.pi / 365)
+    production = np.clip(np.sin((heures - 6) / 12 * np.pi), 0, None) * 3.5 * saison
+    production *= rng.uniform(0.2, 1.0, 8760)
+    consommation = 0.3 + 0.9 * ((heures >= 18) & (heures <= 22)) + 0.5 * ((heures >= 7) & (heures <= 8))
+    consommation = consommation + rng.uniform(0, 0.3, 8760)
+    return production, consommation
+
+
+class TestOptimizeCapacity:
+    """Tests de l'optimiseur continu de capacité."""
+
+    def test_meme_optimum_que_balayage_dense(self, flux_residentiels):
+        """L'optimum égale celui d'une grille dense au pas commercial, en ≤ 15 simulations."""
+        production, consommation = flux_residentiels
+
+        optimum = sizing.optimize_battery_capacity(production, consommation)
+
+        grille = [round(c, 1) for c in np.arange(1.0, 20.01, 0.5)]
+        dense = sizing.compare_battery_sizes(
+            0, 0, capacites=grille,
+            production_horaire_kw=production, consommation_horaire_kw=consommation
+        )
+        meilleur = min(dense.values(), key=lambda d: d['cout_batterie_euros'] / d['economie_annuelle_euros'])
+
+        assert optimum['evaluations'] <= 15
+        assert optimum['capacite_kwh'] == meilleur['capacite_kwh']
+        assert optimum['roi_ans'] == meilleur['roi_ans']
+
+    def test_budget_respecte(self, flux_residentiels):
+        """La capacité retenue tient dans le budget (prix interpolé)."""
+        production, consommation = flux_residentiels
+
+        optimum = sizing.optimize_battery_capacity(production, consommation, budget_max=5000)
+
+        assert optimum['cout_batterie_euros'] <= 5000
+        assert optimum['capacite_max_kwh'] < 20
+
+    def test_budget_insuffisant(self, flux_residentiels):
+        """Un budget sous le prix minimal renvoie une erreur explicite."""
+        production, consommation = flux_residentiels
+
+        resultat = sizing.optimize_battery_capacity(production, consommation, budget_max=100)
+
+        assert 'erreur' in resultat
@@ -0,0 +1,50 @@
+"""
+Tests unitaires pour le stockage compact de la trace batterie.
+"""
+
+import numpy as np
+import pytest
+
+from battery.services.trace import decode_trace, encode_trace, iter_trace_pages
+
+
+@pytest.fixture
+def trace_annuelle():
+    """Séries SOC / charge / décharge sur 8760 h."""
+    rng = np.random.default_rng(3)
+    return rng.uniform(0, 9, 8760), rng.uniform(0, 2, 8760), rng.uniform(0, 2, 8760)
+
+
+class TestTraceBlob:
+    """Tests de l'encodage float32 compressé et de la lecture paginée."""
+
+    def test_aller_retour(self, trace_annuelle):
+        """Le décodage restitue les séries à la précision float32."""
+        blob = encode_trace(*trace_annuelle)
+        table = decode_trace(blob)
+
+        assert table.shape == (8760, 3)
+        for i, serie in enumerate(trace_annuelle):
+            np.testing.assert_allclose(table[:, i], serie, atol=1e-5)
+        assert len(blob) < 8760 * 3 * 4
+
+    def test_pages_reconstituent_la_trace(self, trace_annuelle):
+        """La concaténation des pages redonne la trace complète."""
+        blob = encode_trace(*trace_annuelle)
+
+        pages = list(iter_trace_pages(blob, taille_page=168))
+
+        assert [heure for heure, _ in pages] == list(range(0, 8760, 168))
+        assert len(pages[-1][1]) == 8760 % 168
+        np.testing.assert_array_equal(np.concatenate([page for _, page in pages]), decode_trace(blob))
+
+    def test_page_depuis_une_heure(self, trace_annuelle):
+        """Le paramètre `debut` saute les pages précédentes et tronque la première."""
+        blob = encode_trace(*trace_annuelle)
+        table = decode_trace(blob)
+
+        heure, page = next(iter_trace_pages(blob, taille_page=24, debut=30))
+
+        assert heure == 30
+        np.testing.assert_array_equal(page, table[30:48])
+        assert list(iter_trace_pages(blob, taille_page=24, debut=8760)) == []
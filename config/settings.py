@@ -165,6 +165,54 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'Europe/Paris'
 
+# CACHE - Résultats d'optimisation (clé = empreinte des entrées)
+# Redis en production ; une erreur Redis est traitée comme un cache manquant
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'optimisations': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': 'redis://localhost:6379/1',
+        'TIMEOUT': 60 * 60 * 24 * 30,  # 30 jours
+        'OPTIONS': {
+            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            'IGNORE_EXCEPTIONS': True,
+        },
+    },
+    'verrous': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': 'redis://localhost:6379/2',
+        'OPTIONS': {
+            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            'IGNORE_EXCEPTIONS': True,
+        },
+    },
+}
+# Volume borné par Redis : l'alias 'optimisations' doit pointer vers une
+# instance réglée avec maxmemory (ex. 256mb) et maxmemory-policy allkeys-lru.
+# La politique vaut pour toute l'instance : en production, ne pas la partager
+# avec le broker Celery (base 0), dont les files ne doivent pas être évincées
+OPTIMISATION_CACHE_ALIAS = 'optimisations'
+
+# PVGIS - Le cache stocke les colonnes horaires normalisées (blob float32) ;
+# la réponse JSON brute (~250 Ko compressée) n'est gardée que pour le débogage
+PVGIS_CONSERVER_JSON_BRUT = False
+# Cache mémoire par processus au-dessus de PVGISData (~0,4 Mo par lieu)
+PVGIS_CACHE_MEMOIRE_ENTREES = 32
+PVGIS_CACHE_MEMOIRE_TTL = 60 * 60  # Secondes (borne la péremption entre processus)
+# Réutilisation du cache d'un lieu voisin (irradiance TMY identique à cette échelle ;
+# à réduire en montagne, où l'horizon calculé varie vite)
+PVGIS_RAYON_REUTILISATION_KM = 2.0
+# Single-flight : verrou par lieu dans un cache partagé entre workers (Redis) ;
+# un LocMemCache fait office de verrou local en test / développement.
+# Jamais sur l'instance allkeys-lru de 'optimisations' : un verrou évincé pendant
+# l'appel du meneur relancerait des appels en double. L'alias 'verrous' doit
+# pointer vers une instance sans éviction (noeviction, comme celle du broker)
+PVGIS_VERROU_CACHE_ALIAS = 'verrous'
+PVGIS_VERROU_TIMEOUT = 90  # Secondes, au-delà du timeout du client PVGIS (60 s)
+PVGIS_VERROU_ATTENTE_MAX = 90  # Secondes avant qu'une tâche en attente appelle l'API elle-même
+
 # CRISPY FORMS - 🆕 Pour styliser les formulaires
 CRISPY_ALLOWED_TEMPLATE_PACKS = "tailwind"
 CRISPY_TEMPLATE_PACK = "tailwind"
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.18 on 2026-10-16 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("frontend", "0022_installation_puissance_personnalisee"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="resultat",
+            name="optimisations",
+            field=models.JSONField(
+                blank=True,
+                help_text="Table des puissances et optimum de chaque objectif (serialiser_optimisations)",
+                null=True,
+                verbose_name="Optimisations par objectif",
+            ),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.18 on 2026-10-16 14:05
+
+from django.db import migrations, models
+import secrets
+
+import frontend.models
+
+
+def attribuer_graines(apps, schema_editor):
+    """Une graine distincte pour chaque simulation existante."""
+    Simulation = apps.get_model("frontend", "Simulation")
+
+    simulations = list(Simulation.objects.only("id"))
+    for simulation in simulations:
+        simulation.graine_aleatoire = secrets.randbits(63)
+    Simulation.objects.bulk_update(simulations, ["graine_aleatoire"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("frontend", "0023_resultat_optimisations"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="simulation",
+            name="graine_aleatoire",
+            field=models.BigIntegerField(editable=False, null=True),
+        ),
+        migrations.RunPython(attribuer_graines, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="simulation",
+            name="graine_aleatoire",
+            field=models.BigIntegerField(
+                default=frontend.models.generer_graine_simulation,
+                editable=False,
+                help_text="Graine du générateur aléatoire propre à la simulation",
+                verbose_name="Graine aléatoire",
+            ),
+        ),
+    ]
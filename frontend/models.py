@@ -2,6 +2,8 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
+import numpy as np
+import secrets
 import uuid
 
 class Installation(models.Model):
@@ -93,6 +95,11 @@ class Installation(models.Model):
     class Meta:
         ordering = ['-created_at']
 
+def generer_graine_simulation():
+    """Graine aléatoire d'une nouvelle simulation (63 bits, tient dans un BigIntegerField)."""
+    return secrets.randbits(63)
+
+
 class Simulation(models.Model):
     """Représente une simulation de production solaire"""
     
@@ -119,9 +126,30 @@ class Simulation(models.Model):
     started_at = models.DateTimeField(null=True, blank=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     
+    # Graine des tirages aléatoires (profils) : simulation reproductible
+    graine_aleatoire = models.BigIntegerField(
+        default=generer_graine_simulation,
+        editable=False,
+        verbose_name="Graine aléatoire",
+        help_text="Graine du générateur aléatoire propre à la simulation"
+    )
+    
     def __str__(self):
         return f"Sim #{self.id} - {self.status}"
     
+    def get_rng(self):
+        """
+        Générateur aléatoire propre à la simulation.
+        
+        Chaque appel repart de la graine : deux exécutions de la même
+        simulation tirent les mêmes valeurs, sans toucher à l'état global
+        de np.random partagé par le worker.
+        
+        Returns:
+            np.random.Generator
+        """
+        return np.random.default_rng(self.graine_aleatoire)
+    
     @property
     def duration(self):
         """Durée d'exécution en secondes"""
@@ -233,6 +261,23 @@ class Resultat(models.Model):
         verbose_name="Gain économique sur 25 ans (€)"
     )
 
+    # ========== OPTIMISATION TOUS OBJECTIFS ==========
+    optimisations = models.JSONField(
+        null=True, blank=True,
+        verbose_name="Optimisations par objectif",
+        help_text="Table des puissances et optimum de chaque objectif (serialiser_optimisations)"
+    )
+
+    def get_optimisation(self, objectif):
+        """
+        Résultat d'optimisation d'un objectif, sans relancer de simulation.
+
+        Returns:
+            dict (puissance_optimale, all_configs, best_config) ou None
+        """
+        from solar_calc.services.power_optimizer import restaurer_optimisation
+        return restaurer_optimisation(self.optimisations, objectif)
+
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 import json
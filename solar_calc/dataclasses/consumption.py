@@ -326,7 +326,7 @@ class ConsumptionProfile:
         
         return repartition
     
-    def generer_profil_horaire(self) -> pd.DataFrame:
+    def generer_profil_horaire(self, rng: Optional[np.random.Generator] = None) -> pd.DataFrame:
         """
         Génère un profil de consommation horaire sur une année (8760h).
         
@@ -335,6 +335,9 @@ class ConsumptionProfile:
         - Distinction weekends vs semaine
         - Variation aléatoire réaliste
         
+        Args:
+            rng: Générateur aléatoire de la simulation (reproductibilité)
+        
         Returns:
             pd.DataFrame: DataFrame avec colonnes [timestamp, consommation_kw]
             - timestamp: Horodatage heure par heure
@@ -354,7 +357,8 @@ class ConsumptionProfile:
         # ✅ NOUVEAU : Générer pattern avec profil utilisateur
         pattern_annuel = ConsumptionProfiles.generate_yearly_pattern(
             profile_type=self.profile_type,
-            add_randomness=True  # Variation ±10%
+            add_randomness=True,  # Variation ±10%
+            rng=rng
         )
         
         # Normaliser pour correspondre à la consommation totale
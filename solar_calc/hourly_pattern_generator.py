@@ -8,11 +8,113 @@ le profil d'occupation, et les optimisations souhaitées.
 import numpy as np
 import json
 import logging
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+from solar_calc.tmy_calendar import HEURES_PAR_AN, WEEKEND_PAR_JOUR, masque_heures, masque_mois
 
 logger = logging.getLogger(__name__)
 
 
-def generate_personalized_hourly_profile(profil, decomposition, optimized=False):
+# Appareils dont l'heure de démarrage dépend du scénario, avec l'heure
+# utilisée si appareils_json ne la précise pas
+HEURES_DEFAUT = {
+    'lave_linge': 20,
+    'lave_vaisselle': 21,
+    'seche_linge': 20,
+    'vehicule_electrique': 19,
+    'piscine': 10,
+}
+
+# Cycles par semaine par défaut des appareils à cycles
+CYCLES_DEFAUT = {
+    'lave_linge': 3,
+    'lave_vaisselle': 4,
+    'seche_linge': 2,
+}
+
+# Ordre des lignes de la matrice par poste (ordre de génération)
+POSTES = (
+    'chauffage', 'ecs', *HEURES_DEFAUT,
+    'cuisson', 'electromenager', 'eclairage', 'multimedia',
+)
+
+
+# ========== CONSOMMATION PAR POSTE ==========
+
+@dataclass
+class ComposantesConsommation:
+    """
+    Consommation horaire décomposée par poste (une ligne de 8760 h par poste).
+    
+    Le profil total est la somme des lignes : décaler un appareil ne
+    met à jour que sa ligne. Stockage float32 (≈ 35 ko par poste), les
+    totaux sont accumulés en float64.
+    """
+    
+    postes: Tuple[str, ...]
+    matrice: np.ndarray  # (n_postes, 8760) float32, kWh
+    
+    def __post_init__(self):
+        self.postes = tuple(self.postes)
+        self.matrice = np.asarray(self.matrice, dtype=np.float32).reshape(len(self.postes), HEURES_PAR_AN)
+    
+    def __len__(self) -> int:
+        return len(self.postes)
+    
+    def index(self, poste: str) -> int:
+        """Ligne d'un poste (ValueError si le poste n'est pas dans la matrice)."""
+        try:
+            return self.postes.index(poste)
+        except ValueError:
+            raise ValueError(f"Poste '{poste}' absent des composantes {self.postes}") from None
+    
+    def ligne(self, poste: str) -> np.ndarray:
+        """Pattern horaire (vue) d'un poste."""
+        return self.matrice[self.index(poste)]
+    
+    def remplacer(self, poste: str, pattern) -> None:
+        """Remplace la ligne d'un poste (O(8760), les autres postes sont inchangés)."""
+        self.matrice[self.index(poste)] = pattern
+    
+    def total(self) -> np.ndarray:
+        """Profil horaire total (8760 valeurs en kWh, float64)."""
+        return self.matrice.sum(axis=0, dtype=np.float64)
+    
+    def energie_par_poste(self) -> Dict[str, float]:
+        """Consommation annuelle de chaque poste (kWh)."""
+        energies = self.matrice.sum(axis=1, dtype=np.float64)
+        return dict(zip(self.postes, energies.tolist()))
+    
+    def autoconsommation_par_poste(self, production) -> Dict[str, float]:
+        """
+        Autoconsommation annuelle attribuée à chaque poste (kWh).
+        
+        À chaque heure, l'énergie autoconsommée min(production, conso)
+        est répartie entre les postes au prorata de leur consommation :
+        un seul produit matrice-vecteur.
+        
+        Args:
+            production: Production horaire (8760 valeurs en kWh)
+        
+        Returns:
+            dict: {poste: kWh autoconsommés}, de somme l'autoconsommation totale
+        
+        Example:
+            >>> composantes = generate_personalized_hourly_profile(profil, decomposition, composantes=True)
+            >>> composantes.autoconsommation_par_poste(production_horaire)['vehicule_electrique']
+        """
+        production = np.asarray(production, dtype=np.float64)
+        consommation = self.total()
+        autoconso = np.minimum(production, consommation)
+        
+        part_autoconsommee = np.divide(
+            autoconso, consommation, out=np.zeros(HEURES_PAR_AN), where=consommation > 0
+        )
+        return dict(zip(self.postes, (self.matrice @ part_autoconsommee).tolist()))
+
+
+def generate_personalized_hourly_profile(profil, decomposition, optimized=False, composantes=False):
     """
     Génère un profil horaire personnalisé (8760 heures).
     
@@ -20,31 +122,160 @@ def generate_personalized_hourly_profile(profil, decomposition, optimized=False)
         profil: ConsumptionProfileModel
         decomposition (dict): Décomposition par poste (de decompose_consumption)
         optimized (bool): Si True, optimise les appareils programmables pour heures solaires
+        composantes (bool): Si True, renvoie la consommation par poste
+            (ComposantesConsommation) au lieu du profil sommé
         
     Returns:
-        np.array: Profile horaire (8760 valeurs en kWh)
+        np.array: Profile horaire (8760 valeurs en kWh),
+        ou ComposantesConsommation si composantes=True
     """
-    from solar_calc.services.consumption_profiles import ConsumptionProfiles
-    
     mode = "OPTIMISÉ" if optimized else "ACTUEL"
     logger.info(f"🔧 Génération profil {mode} pour {profil.nom}")
     
-    # Pattern de base selon profil d'occupation
+    appareils_data = _charger_appareils(profil)
+    horaires = _horaires_scenario(profil, appareils_data, optimized)
+    
+    if composantes:
+        return _composantes_par_horaires(profil, decomposition, appareils_data, horaires)
+    
+    return _profils_par_horaires(profil, decomposition, appareils_data, [horaires])[0]
+
+
+def decaler_poste(composantes, profil, decomposition, poste, heure):
+    """
+    Redémarre un poste décalable à une autre heure, sans régénérer le profil.
+    
+    Args:
+        composantes (ComposantesConsommation): Matrice à mettre à jour en place
+        profil: ConsumptionProfileModel
+        decomposition (dict): Décomposition par poste
+        poste (str): Appareil de HEURES_DEFAUT, ou 'ecs'
+        heure: Heure de démarrage (pour 'ecs' : préchauffage solaire, None = présence)
+    
+    Example:
+        >>> decaler_poste(composantes, profil, decomposition, 'lave_linge', 12)
+    """
+    from solar_calc.services.consumption_profiles import ConsumptionProfiles
+    
     base_pattern = ConsumptionProfiles.generate_yearly_pattern(
         profile_type=profil.profile_type,
         add_randomness=False
     )
+    composantes.remplacer(poste, _pattern_decalable(
+        poste, heure, _charger_appareils(profil), decomposition, base_pattern, profil.profile_type
+    ))
+
+
+def generate_dual_hourly_profiles(profil, decomposition):
+    """
+    Profils ACTUEL et OPTIMISÉ en un seul passage.
     
-    # Profil horaire final
-    profile_horaire = np.zeros(8760)
+    Équivaut à deux appels à generate_personalized_hourly_profile
+    (optimized=False puis True), mais le pattern de base, appareils_json
+    et les postes communs aux deux scénarios ne sont calculés qu'une fois.
     
-    # Charger appareils_json
+    Args:
+        profil: ConsumptionProfileModel
+        decomposition (dict): Décomposition par poste (de decompose_consumption)
+    
+    Returns:
+        tuple: (profil_actuel, profil_optimise), 8760 valeurs en kWh chacun
+    
+    Example:
+        >>> actuel, optimise = generate_dual_hourly_profiles(profil, decomposition)
+    """
+    logger.info(f"🔧 Génération profils ACTUEL + OPTIMISÉ pour {profil.nom}")
+    
+    appareils_data = _charger_appareils(profil)
+    scenarios = _profils_par_horaires(profil, decomposition, appareils_data, [
+        _horaires_scenario(profil, appareils_data, optimized=False),
+        _horaires_scenario(profil, appareils_data, optimized=True),
+    ])
+    
+    return scenarios[0], scenarios[1]
+
+
+def generate_hourly_profile_variants(profil, decomposition, variantes):
+    """
+    Profils horaires de N variantes d'horaires des postes décalables.
+    
+    Chaque variante ne précise que les heures qui changent par rapport
+    au scénario ACTUEL : les appareils non cités gardent leur heure
+    habituelle, les appareils absents du profil sont ignorés. La clé
+    'ecs' donne l'heure de préchauffage solaire du chauffe-eau (sans
+    elle, l'ECS suit la présence).
+    
+    Args:
+        profil: ConsumptionProfileModel
+        decomposition (dict): Décomposition par poste (de decompose_consumption)
+        variantes (list): Dicts {poste: heure de démarrage}
+    
+    Returns:
+        np.ndarray: (len(variantes), 8760) en kWh
+    
+    Example:
+        >>> profils = generate_hourly_profile_variants(profil, decomposition, [
+        ...     {}, {'lave_linge': 12}, {'lave_linge': 12, 'vehicule_electrique': 11},
+        ... ])
+    """
+    appareils_data = _charger_appareils(profil)
+    habituels = _horaires_scenario(profil, appareils_data, optimized=False)
+    
+    horaires = [
+        {
+            **habituels,
+            **{poste: heure for poste, heure in variante.items() if poste in habituels or poste == 'ecs'},
+        }
+        for variante in variantes
+    ]
+    
+    return _profils_par_horaires(profil, decomposition, appareils_data, horaires)
+
+
+# ========== CONSTRUCTION PAR SCÉNARIOS ==========
+
+def _charger_appareils(profil):
+    """Charge appareils_json (dict vide si absent ou invalide)."""
     appareils_data = {}
     if profil.appareils_json:
         try:
             appareils_data = json.loads(profil.appareils_json)
         except Exception as e:
             logger.warning(f"Erreur lecture appareils_json: {e}")
+    return appareils_data
+
+
+def _horaires_scenario(profil, appareils_data, optimized):
+    """
+    Heures de démarrage des postes décalables pour un scénario.
+    
+    Returns:
+        dict: {appareil présent: heure}, plus 'ecs' si le chauffe-eau
+        thermodynamique est décalé aux heures solaires
+    """
+    horaires = {}
+    
+    if optimized and profil.type_ecs == 'thermodynamique':
+        horaires['ecs'] = appareils_data.get('ecs', {}).get('heure_optimale', 13)
+    
+    appareils_config = appareils_data.get('appareils', {})
+    for appareil, heure_defaut in HEURES_DEFAUT.items():
+        config = appareils_config.get(appareil, {})
+        if config.get('present'):
+            horaires[appareil] = config.get('heure_optimale' if optimized else 'heure_habituelle', heure_defaut)
+    
+    return horaires
+
+
+def _postes_communs(profil, decomposition, base_pattern):
+    """
+    Postes indépendants des horaires (chauffage, cuisson, électroménager,
+    éclairage, multimédia).
+    
+    Returns:
+        dict: {poste: pattern 8760 h en kWh}, postes non nuls uniquement
+    """
+    patterns = {}
     
     # ========== CHAUFFAGE ==========
     if decomposition['chauffage'] > 0:
@@ -53,178 +284,205 @@ def generate_personalized_hourly_profile(profil, decomposition, optimized=False)
             profil.profile_type,
             profil.get_effective_dpe()
         )
-        pattern_chauffage = pattern_chauffage / pattern_chauffage.sum() * decomposition['chauffage']
-        profile_horaire += pattern_chauffage
+        patterns['chauffage'] = pattern_chauffage / pattern_chauffage.sum() * decomposition['chauffage']
         logger.info(f"  ├─ Chauffage : {decomposition['chauffage']:.0f} kWh/an")
     
-    # ========== ECS ==========
-    if decomposition['ecs'] > 0:
-        ecs_config = appareils_data.get('ecs', {})
-        
-        if optimized and profil.type_ecs == 'thermodynamique':
-            # ECS optimisé → Heures solaires (12h-15h)
-            heure_optimale = ecs_config.get('heure_optimale', 13)
-            pattern_ecs = generate_ecs_optimized_pattern(heure_optimale)
-            logger.info(f"  ├─ ECS thermodynamique OPTIMISÉ à {heure_optimale}h : {decomposition['ecs']:.0f} kWh/an")
-        else:
-            # ECS standard → Suit la présence (douches matin/soir)
-            pattern_ecs = modulate_ecs_by_occupation(base_pattern, profil.profile_type)
-            logger.info(f"  ├─ ECS standard (présence) : {decomposition['ecs']:.0f} kWh/an")
-        
-        pattern_ecs = pattern_ecs / pattern_ecs.sum() * decomposition['ecs']
-        profile_horaire += pattern_ecs
-    
-    # ========== APPAREILS PROGRAMMABLES ==========
-    appareils_config = appareils_data.get('appareils', {})
-    
-    # Lave-linge
-    if 'lave_linge' in appareils_config and appareils_config['lave_linge'].get('present'):
-        config = appareils_config['lave_linge']
-        heure = config.get('heure_optimale' if optimized else 'heure_habituelle', 20)
-        cycles = config.get('cycles_par_semaine', 3)
-        pattern_ll = generate_appliance_pattern('lave_linge', heure, cycles)
-        profile_horaire += pattern_ll
-        logger.info(f"  ├─ Lave-linge à {heure}h ({cycles}×/sem) : {pattern_ll.sum():.0f} kWh/an")
-    
-    # Lave-vaisselle
-    if 'lave_vaisselle' in appareils_config and appareils_config['lave_vaisselle'].get('present'):
-        config = appareils_config['lave_vaisselle']
-        heure = config.get('heure_optimale' if optimized else 'heure_habituelle', 21)
-        cycles = config.get('cycles_par_semaine', 4)
-        pattern_lv = generate_appliance_pattern('lave_vaisselle', heure, cycles)
-        profile_horaire += pattern_lv
-        logger.info(f"  ├─ Lave-vaisselle à {heure}h ({cycles}×/sem) : {pattern_lv.sum():.0f} kWh/an")
-    
-    # Sèche-linge
-    if 'seche_linge' in appareils_config and appareils_config['seche_linge'].get('present'):
-        config = appareils_config['seche_linge']
-        heure = config.get('heure_optimale' if optimized else 'heure_habituelle', 20)
-        cycles = config.get('cycles_par_semaine', 2)
-        pattern_sl = generate_appliance_pattern('seche_linge', heure, cycles)
-        profile_horaire += pattern_sl
-        logger.info(f"  ├─ Sèche-linge à {heure}h ({cycles}×/sem) : {pattern_sl.sum():.0f} kWh/an")
-    
-    # Véhicule électrique
-    if 'vehicule_electrique' in appareils_config and appareils_config['vehicule_electrique'].get('present'):
-        config = appareils_config['vehicule_electrique']
-        heure = config.get('heure_optimale' if optimized else 'heure_habituelle', 19)
-        pattern_ve = generate_ev_charging_pattern(heure, decomposition['vehicule_electrique'])
-        profile_horaire += pattern_ve
-        logger.info(f"  ├─ Véhicule électrique à {heure}h : {pattern_ve.sum():.0f} kWh/an")
-    
-    # Piscine
-    if 'piscine' in appareils_config and appareils_config['piscine'].get('present'):
-        config = appareils_config['piscine']
-        heure = config.get('heure_optimale' if optimized else 'heure_habituelle', 10)
-        pattern_piscine = generate_pool_pattern(heure, decomposition['piscine'])
-        profile_horaire += pattern_piscine
-        logger.info(f"  ├─ Piscine à {heure}h : {pattern_piscine.sum():.0f} kWh/an")
-    
     # ========== AUTRES USAGES (suivent le profil de base) ==========
-    # Cuisson
-    if decomposition['cuisson'] > 0:
-        pattern_cuisson = base_pattern.copy()
-        pattern_cuisson = pattern_cuisson / pattern_cuisson.sum() * decomposition['cuisson']
-        profile_horaire += pattern_cuisson
-    
-    # Électroménager (hors programmables déjà comptés)
-    if decomposition['electromenager'] > 0:
-        pattern_electro = base_pattern.copy()
-        pattern_electro = pattern_electro / pattern_electro.sum() * decomposition['electromenager']
-        profile_horaire += pattern_electro
+    # Cuisson et électroménager (hors programmables déjà comptés)
+    for poste in ('cuisson', 'electromenager'):
+        if decomposition[poste] > 0:
+            patterns[poste] = base_pattern / base_pattern.sum() * decomposition[poste]
     
     # Éclairage
     if decomposition['eclairage'] > 0:
         pattern_eclairage = generate_lighting_pattern(base_pattern)
-        pattern_eclairage = pattern_eclairage / pattern_eclairage.sum() * decomposition['eclairage']
-        profile_horaire += pattern_eclairage
+        patterns['eclairage'] = pattern_eclairage / pattern_eclairage.sum() * decomposition['eclairage']
     
     # Multimédia
     if decomposition['multimedia'] > 0:
-        pattern_multimedia = base_pattern.copy()
-        pattern_multimedia = pattern_multimedia / pattern_multimedia.sum() * decomposition['multimedia']
-        profile_horaire += pattern_multimedia
+        patterns['multimedia'] = base_pattern / base_pattern.sum() * decomposition['multimedia']
+    
+    return patterns
+
+
+def _postes_decalables(profil, decomposition, appareils_data, horaires, base_pattern, memo):
+    """
+    Postes dépendant des horaires d'un scénario (ECS, appareils programmables).
+    
+    Les patterns sont mémorisés dans `memo` par (poste, heure), pour être
+    partagés entre scénarios.
+    
+    Returns:
+        dict: {poste: pattern 8760 h en kWh}
+    """
+    postes = [poste for poste in HEURES_DEFAUT if poste in horaires]
+    if decomposition['ecs'] > 0:
+        postes.insert(0, 'ecs')
+    
+    patterns = {}
+    for poste in postes:
+        heure = horaires.get(poste)
+        if (poste, heure) not in memo:
+            memo[(poste, heure)] = _pattern_decalable(
+                poste, heure, appareils_data, decomposition, base_pattern, profil.profile_type
+            )
+        patterns[poste] = memo[(poste, heure)]
+    
+    return patterns
+
+
+def _pattern_decalable(poste, heure, appareils_data, decomposition, base_pattern, profile_type):
+    """Pattern 8760 h d'un poste décalable démarrant à `heure` (None : ECS suivant la présence)."""
+    if poste == 'ecs':
+        if heure is None:
+            pattern_ecs = modulate_ecs_by_occupation(base_pattern, profile_type)
+        else:
+            pattern_ecs = generate_ecs_optimized_pattern(heure)
+        return pattern_ecs / pattern_ecs.sum() * decomposition['ecs']
+    
+    if poste == 'vehicule_electrique':
+        return generate_ev_charging_pattern(heure, decomposition['vehicule_electrique'])
     
-    total_genere = profile_horaire.sum()
-    logger.info(f"✅ Profil {mode} généré : {total_genere:.0f} kWh/an")
+    if poste == 'piscine':
+        return generate_pool_pattern(heure, decomposition['piscine'])
     
-    return profile_horaire
+    config = appareils_data.get('appareils', {}).get(poste, {})
+    cycles = config.get('cycles_par_semaine', CYCLES_DEFAUT[poste])
+    return generate_appliance_pattern(poste, heure, cycles)
+
+
+def _profils_par_horaires(profil, decomposition, appareils_data, horaires):
+    """
+    Profils horaires d'une liste de scénarios d'horaires.
+    
+    Le pattern de base et les postes communs sont calculés une fois ;
+    chaque pattern décalable est mémorisé par (poste, heure) et partagé
+    entre les scénarios qui le programment à la même heure.
+    
+    Returns:
+        np.ndarray: (len(horaires), 8760)
+    """
+    from solar_calc.services.consumption_profiles import ConsumptionProfiles
+    
+    # Pattern de base selon profil d'occupation
+    base_pattern = ConsumptionProfiles.generate_yearly_pattern(
+        profile_type=profil.profile_type,
+        add_randomness=False
+    )
+    
+    commun = np.zeros(HEURES_PAR_AN)
+    for pattern in _postes_communs(profil, decomposition, base_pattern).values():
+        commun += pattern
+    
+    memo = {}
+    profils = np.empty((len(horaires), HEURES_PAR_AN))
+    
+    for i, horaires_scenario in enumerate(horaires):
+        profils[i] = commun
+        
+        decalables = _postes_decalables(
+            profil, decomposition, appareils_data, horaires_scenario, base_pattern, memo
+        )
+        for pattern in decalables.values():
+            profils[i] += pattern
+        
+        logger.info(
+            f"✅ Profil {i + 1}/{len(horaires)} : {profils[i].sum():.0f} kWh/an "
+            f"(horaires {horaires_scenario})"
+        )
+    
+    return profils
+
+
+def _composantes_par_horaires(profil, decomposition, appareils_data, horaires):
+    """Matrice par poste (ComposantesConsommation) d'un scénario d'horaires."""
+    from solar_calc.services.consumption_profiles import ConsumptionProfiles
+    
+    base_pattern = ConsumptionProfiles.generate_yearly_pattern(
+        profile_type=profil.profile_type,
+        add_randomness=False
+    )
+    
+    patterns = _postes_communs(profil, decomposition, base_pattern)
+    patterns.update(_postes_decalables(
+        profil, decomposition, appareils_data, horaires, base_pattern, {}
+    ))
+    
+    postes = tuple(poste for poste in POSTES if poste in patterns)
+    matrice = np.empty((len(postes), HEURES_PAR_AN), dtype=np.float32)
+    for i, poste in enumerate(postes):
+        matrice[i] = patterns[poste]
+    
+    composantes = ComposantesConsommation(postes=postes, matrice=matrice)
+    logger.info(f"✅ Composantes : {len(postes)} postes, {composantes.total().sum():.0f} kWh/an")
+    
+    return composantes
 
 
 # ========== FONCTIONS DE GÉNÉRATION DE PATTERNS ==========
 
+def _placer_cycles(jours, heure, duree, valeur):
+    """
+    Pattern 8760 h avec `valeur` sur `duree` heures consécutives à partir
+    de `heure` pour chacun des jours donnés (cycles ne débordant pas de
+    l'année uniquement).
+    """
+    pattern = np.zeros(HEURES_PAR_AN)
+    debuts = np.asarray(jours, dtype=np.intp) * 24 + int(heure)
+    debuts = debuts[debuts < HEURES_PAR_AN - duree]
+    pattern[debuts[:, None] + np.arange(duree)] = valeur
+    return pattern
+
+
 def modulate_heating_by_occupation(base_pattern, profile_type, dpe):
     """Génère pattern chauffage selon occupation et DPE."""
-    pattern = base_pattern.copy()
-    
-    # Ajouter saisonnalité (plus en hiver)
-    seasonal = np.ones(8760)
-    for h in range(8760):
-        month = (h // 730) % 12 + 1  # Mois approximatif (1-12)
-        if month in [11, 12, 1, 2, 3]:  # Hiver
-            seasonal[h] = 2.0
-        elif month in [6, 7, 8]:  # Été
-            seasonal[h] = 0.3
-        else:  # Mi-saison
-            seasonal[h] = 1.2
-    
-    pattern = pattern * seasonal
-    
-    # Si actif absent : réduire chauffage en journée
+    # Ajouter saisonnalité (plus en hiver), sur les mois approximatifs de 730 h
+    seasonal = np.full(HEURES_PAR_AN, 1.2)  # Mi-saison
+    seasonal[masque_mois(11, 12, 1, 2, 3, approx=True)] = 2.0  # Hiver
+    seasonal[masque_mois(6, 7, 8, approx=True)] = 0.3  # Été
+    
+    pattern = base_pattern * seasonal
+    
+    # Si actif absent : réduire chauffage en journée (9h-17h) à 30%
     if profile_type == 'actif_absent':
-        for h in range(8760):
-            hour_of_day = h % 24
-            if 9 <= hour_of_day <= 17:  # Journée
-                pattern[h] *= 0.3  # Réduit à 30%
+        pattern[masque_heures(*range(9, 18))] *= 0.3
     
     return pattern
 
 
 def modulate_ecs_by_occupation(base_pattern, profile_type):
     """Génère pattern ECS selon occupation (douches matin/soir)."""
-    pattern = np.zeros(8760)
-    
-    for h in range(8760):
-        hour_of_day = h % 24
-        day_of_week = (h // 24) % 7
-        
-        if profile_type == 'actif_absent':
-            # Douche matin (7h-8h) et soir (19h-20h)
-            if hour_of_day in [7, 19]:
-                pattern[h] = 1.0
-        elif profile_type == 'teletravail':
-            # Douche matin + usage cuisine midi
-            if hour_of_day in [7, 12, 19]:
-                pattern[h] = 0.8
-        elif profile_type == 'retraite':
-            # Usage étalé dans la journée
-            if 7 <= hour_of_day <= 20:
-                pattern[h] = 0.5
-        elif profile_type == 'famille':
-            # Multiple pics (matin, midi week-end, soir)
-            if hour_of_day in [7, 8, 19, 20]:
-                pattern[h] = 1.0
-            if day_of_week in [5, 6] and hour_of_day == 12:  # Week-end midi
-                pattern[h] = 0.7
+    # Journée type : ligne 0 = semaine, ligne 1 = week-end
+    journee = np.zeros((2, 24))
     
-    return pattern
+    if profile_type == 'actif_absent':
+        # Douche matin (7h-8h) et soir (19h-20h)
+        journee[:, [7, 19]] = 1.0
+    elif profile_type == 'teletravail':
+        # Douche matin + usage cuisine midi
+        journee[:, [7, 12, 19]] = 0.8
+    elif profile_type == 'retraite':
+        # Usage étalé dans la journée
+        journee[:, 7:21] = 0.5
+    elif profile_type == 'famille':
+        # Multiple pics (matin, midi week-end, soir)
+        journee[:, [7, 8, 19, 20]] = 1.0
+        journee[1, 12] = 0.7  # Week-end midi
+    
+    return journee[WEEKEND_PAR_JOUR.astype(np.intp)].reshape(HEURES_PAR_AN)
 
 
 def generate_ecs_optimized_pattern(heure_optimale):
     """ECS optimisé : préchauffage aux heures solaires."""
-    pattern = np.zeros(8760)
+    heures = np.arange(24)
     
-    for h in range(8760):
-        hour_of_day = h % 24
-        
-        # Préchauffage autour de l'heure optimale (±2h)
-        if heure_optimale - 1 <= hour_of_day <= heure_optimale + 2:
-            pattern[h] = 1.0
-        # Maintien faible pour usage soir
-        elif hour_of_day in [19, 20]:
-            pattern[h] = 0.3
+    # Préchauffage autour de l'heure optimale (±2h)
+    prechauffage = (heure_optimale - 1 <= heures) & (heures <= heure_optimale + 2)
+    # Maintien faible pour usage soir
+    maintien = np.isin(heures, [19, 20])
     
-    return pattern
+    journee = np.where(prechauffage, 1.0, np.where(maintien, 0.3, 0.0))
+    return np.tile(journee, HEURES_PAR_AN // 24)
 
 
 def generate_appliance_pattern(appareil, heure, cycles_par_semaine):
@@ -239,78 +497,53 @@ def generate_appliance_pattern(appareil, heure, cycles_par_semaine):
     conso = conso_par_cycle.get(appareil, 1.0)
     duree_cycle = 2  # heures
     
-    pattern = np.zeros(8760)
     nb_cycles_an = int(cycles_par_semaine * 52)
+    if nb_cycles_an <= 0:
+        return np.zeros(HEURES_PAR_AN)
     
     # Répartir les cycles sur l'année
-    for i in range(nb_cycles_an):
-        jour = int(i * 365 / nb_cycles_an)
-        heure_debut = jour * 24 + int(heure)
-        
-        if heure_debut < 8760 - duree_cycle:
-            for offset in range(duree_cycle):
-                pattern[heure_debut + offset] = conso / duree_cycle
+    jours = (np.arange(nb_cycles_an) * 365 / nb_cycles_an).astype(np.intp)
     
-    return pattern
+    return _placer_cycles(jours, heure, duree_cycle, conso / duree_cycle)
 
 
 def generate_ev_charging_pattern(heure, conso_annuelle):
     """Génère pattern de charge véhicule électrique."""
-    pattern = np.zeros(8760)
     duree_charge = 4  # heures
     
     # Charge quotidienne (50% des jours en moyenne)
     nb_charges = 365 // 2
     conso_par_charge = conso_annuelle / nb_charges
     
-    for i in range(nb_charges):
-        jour = i * 2  # Un jour sur deux
-        heure_debut = jour * 24 + int(heure)
-        
-        if heure_debut < 8760 - duree_charge:
-            for offset in range(duree_charge):
-                pattern[heure_debut + offset] = conso_par_charge / duree_charge
+    jours = np.arange(nb_charges) * 2  # Un jour sur deux
     
-    return pattern
+    return _placer_cycles(jours, heure, duree_charge, conso_par_charge / duree_charge)
 
 
 def generate_pool_pattern(heure, conso_annuelle):
     """Génère pattern piscine (filtration quotidienne en saison)."""
-    pattern = np.zeros(8760)
     duree_filtration = 8  # heures
     
     # Piscine active mai-septembre (5 mois ≈ 150 jours)
     jours_actifs = 150
     conso_par_jour = conso_annuelle / jours_actifs
     
-    for jour in range(120, 270):  # Mai à septembre approximativement
-        heure_debut = jour * 24 + int(heure)
-        
-        if heure_debut < 8760 - duree_filtration:
-            for offset in range(duree_filtration):
-                pattern[heure_debut + offset] = conso_par_jour / duree_filtration
+    jours = np.arange(120, 270)  # Mai à septembre approximativement
     
-    return pattern
+    return _placer_cycles(jours, heure, duree_filtration, conso_par_jour / duree_filtration)
 
 
 def generate_lighting_pattern(base_pattern):
     """Génère pattern éclairage (actif surtout tôt matin et soir)."""
-    pattern = np.zeros(8760)
-    
-    for h in range(8760):
-        hour_of_day = h % 24
-        month = (h // 730) % 12 + 1
-        
-        # Plus d'éclairage en hiver (jours courts)
-        winter_factor = 1.5 if month in [11, 12, 1, 2] else 1.0
-        
-        # Éclairage le soir principalement
-        if 6 <= hour_of_day <= 8:  # Matin
-            pattern[h] = 0.5 * winter_factor
-        elif 18 <= hour_of_day <= 23:  # Soir
-            pattern[h] = 1.0 * winter_factor
-        elif 0 <= hour_of_day <= 1:  # Nuit
-            pattern[h] = 0.3
+    # Plus d'éclairage en hiver (jours courts)
+    winter_factors = np.where(masque_mois(11, 12, 1, 2, approx=True), 1.5, 1.0)
+    
+    # Éclairage le soir principalement, réduit le matin, veille la nuit
+    pattern = np.select(
+        [masque_heures(6, 7, 8), masque_heures(*range(18, 24)), masque_heures(0, 1)],
+        [0.5 * winter_factors, 1.0 * winter_factors, 0.3],
+        default=0.0,
+    )
     
     # Moduler par présence
     pattern = pattern * base_pattern
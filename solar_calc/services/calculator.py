@@ -19,6 +19,7 @@ from solar_calc.contracts import (
 )
 
 from solar_calc.services.hourly_calculator import HourlyAutoconsumptionCalculator
+from solar_calc.tmy_calendar import HEURES_PAR_AN, moyenne_horaire, somme_mensuelle
 from solar_calc.services.consumption_profiles import ConsumptionProfiles
 
 logger = logging.getLogger(__name__)
@@ -27,16 +28,19 @@ logger = logging.getLogger(__name__)
 class SimulationCalculator:
     """Classe pour calculer la production et consommation solaire"""
 
-    def __init__(self, installation):
+    def __init__(self, installation, rng=None, simulation=None):
         """
         Initialise la calculatrice avec les paramètres de l'installation.
         
         Args:
             installation: Objet Installation Django
+            rng: Générateur aléatoire de la simulation (np.random.Generator, optionnel)
+            simulation: Simulation Django ; son générateur (get_rng) est utilisé si rng est absent
         """
 
         # ===== INITIALISATION DES ATTRIBUTS (IMPORTANT !) =====
         self.installation = installation
+        self.rng = rng if rng is not None or simulation is None else simulation.get_rng()
         self.puissance_kw = installation.puissance_crete_kwc 
         self.orientation = installation.orientation_azimut  
         self.inclinaison = installation.inclinaison_degres  
@@ -143,8 +147,13 @@ class SimulationCalculator:
         # Production annuelle totale (kWh)
         production_annuelle = df_calc['production_kw'].sum()
         
-        # Agréger par mois (si timestamp existe)
-        if 'timestamp' in df_calc.columns:
+        # Agréger par mois : calendrier TMY partagé si année complète, sinon timestamp
+        annee_complete = len(df_calc) == HEURES_PAR_AN
+        if annee_complete:
+            production_monthly = [
+                round(float(v), 2) for v in somme_mensuelle(df_calc['production_kw'].to_numpy())
+            ]
+        elif 'timestamp' in df_calc.columns:
             df_calc['timestamp'] = pd.to_datetime(df_calc['timestamp'])
             df_calc['month'] = df_calc['timestamp'].dt.month
             production_monthly_series = df_calc.groupby('month')['production_kw'].sum()
@@ -163,7 +172,12 @@ class SimulationCalculator:
             production_monthly = [round(monthly_value, 2)] * 12
         
         # Profil horaire moyen (24h) - moyenne de chaque heure sur toute l'année
-        if 'timestamp' in df_calc.columns:
+        if annee_complete:
+            production_hourly = [
+                round(float(v), 3) for v in moyenne_horaire(df_calc['production_kw'].to_numpy())
+            ]
+        elif 'timestamp' in df_calc.columns:
+            df_calc['timestamp'] = pd.to_datetime(df_calc['timestamp'])
             df_calc['hour'] = df_calc['timestamp'].dt.hour
             production_hourly_series = df_calc.groupby('hour')['production_kw'].mean()
             
@@ -207,7 +221,8 @@ class SimulationCalculator:
                     # Fallback sur profil générique
                     pattern_brut = ConsumptionProfiles.generate_yearly_pattern(
                         profile_type=profile_type,
-                        add_randomness=True
+                        add_randomness=True,
+                        rng=self.rng
                     )
                     consommation_horaire_kw = pattern_brut / pattern_brut.sum() * consommation_annuelle
             else:
@@ -216,7 +231,8 @@ class SimulationCalculator:
                 
                 pattern_brut = ConsumptionProfiles.generate_yearly_pattern(
                     profile_type=profile_type,
-                    add_randomness=True
+                    add_randomness=True,
+                    rng=self.rng
                 )
                 
                 # Normaliser pour correspondre à la consommation annuelle
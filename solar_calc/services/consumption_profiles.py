@@ -8,8 +8,18 @@ App Django: solar_calc
 """
 
 import numpy as np
+from functools import lru_cache
 from typing import Tuple, Dict
 
+from solar_calc.tmy_calendar import (
+    HEURES_PAR_AN,
+    HEURES_PAR_JOUR,
+    JOURS_PAR_AN,
+    JOUR_SEMAINE,
+    WEEKEND_PAR_JOUR,
+    vue_journaliere,
+)
+
 
 class ConsumptionProfiles:
     """
@@ -105,64 +115,54 @@ class ConsumptionProfiles:
         if profile_type not in cls.PROFILES:
             profile_type = 'actif_absent'
         
-        profile = cls.PROFILES[profile_type]
-        day_type = 'weekend' if is_weekend else 'semaine'
-        day_config = profile[day_type]
-        
-        # Assembler 24h
-        pattern = (
-            day_config['nuit'] +      # 0h-5h (6 valeurs)
-            day_config['matin'] +     # 6h-8h (3 valeurs)
-            day_config['journee'] +   # 9h-17h (9 valeurs)
-            day_config['soir']        # 18h-23h (6 valeurs)
-        )
-        
-        pattern_array = np.array(pattern)
-        
-        # Vérification de sécurité
-        assert len(pattern_array) == 24, f"Pattern should have 24 values, got {len(pattern_array)}"
-        
-        return pattern_array
+        # Copie : le template précompilé est partagé
+        return _templates_journaliers(profile_type)[int(is_weekend)].copy()
     
     @classmethod
     def generate_yearly_pattern(
         cls,
         profile_type: str = 'actif_absent',
         add_randomness: bool = True,
-        random_seed: int = None
+        random_seed: int = None,
+        rng: np.random.Generator = None
     ) -> np.ndarray:
         """
         Génère un pattern annuel (8760h) avec weekends et variation.
         
+        Sans variation aléatoire, le pattern est calculé une seule fois par
+        profil et partagé : le tableau renvoyé est en lecture seule (faire
+        une copie avant toute modification en place).
+        
+        La variation est tirée d'un générateur explicite, jamais de l'état
+        global de np.random : à graine égale, même profil, quel que soit
+        le thread ou le worker.
+        
         Args:
             profile_type: Type de profil
             add_randomness: Ajouter variation aléatoire ±10%
-            random_seed: Graine pour reproductibilité (optionnel)
+            random_seed: Graine pour reproductibilité (optionnel, ignorée si rng est fourni)
+            rng: Générateur de la simulation (ex. Simulation.get_rng())
         
         Returns:
             np.ndarray: Pattern de 8760 valeurs
+        
+        Example:
+            >>> rng = np.random.default_rng(simulation.graine_aleatoire)
+            >>> pattern = ConsumptionProfiles.generate_yearly_pattern('famille', rng=rng)
         """
-        if random_seed is not None:
-            np.random.seed(random_seed)
+        if profile_type not in cls.PROFILES:
+            profile_type = 'actif_absent'
         
-        yearly = []
+        pattern = _pattern_annuel(profile_type)
         
-        for day in range(365):
-            # Déterminer si weekend
-            # Jour 0 = Lundi (arbitraire)
-            is_weekend = (day % 7) in [5, 6]  # Samedi, Dimanche
-            
-            # Pattern du jour
-            daily = cls.get_daily_pattern(profile_type, is_weekend)
-            
-            # Ajouter variation aléatoire
-            if add_randomness:
-                variation = np.random.uniform(0.90, 1.10, 24)
-                daily = daily * variation
-            
-            yearly.extend(daily.tolist())
+        if not add_randomness:
+            return pattern
         
-        return np.array(yearly)
+        if rng is None:
+            rng = np.random.default_rng(random_seed)
+        
+        # Variation aléatoire : un tirage pour les 365 × 24 heures
+        return pattern * rng.uniform(0.90, 1.10, HEURES_PAR_AN)
 
     @classmethod
     def optimize_for_solar(
@@ -188,7 +188,7 @@ class ConsumptionProfiles:
             >>> optimized, details = ConsumptionProfiles.optimize_for_solar(pattern)
             >>> print(f"Énergie déplacée : {details['energy_shifted_kwh']:.0f} kWh/an")
         """
-        optimized = base_pattern.copy()
+        optimized = np.array(base_pattern, dtype=float)
         
         # Pourcentage de consommation à déplacer selon le niveau
         shift_ratios = {
@@ -198,36 +198,32 @@ class ConsumptionProfiles:
         }
         shift_ratio = shift_ratios.get(optimization_level, 0.30)
         
-        # Compteurs pour le rapport
-        total_shifted = 0
+        # Heures à vider (nuit profonde + soirée tardive)
+        # On évite :
+        # - 6h-8h (matin, préparation)
+        # - 18h-20h (retour maison, préparation dîner)
+        source_hours = list(range(0, 6)) + list(range(21, 24))
         
-        for day in range(365):
-            day_start = day * 24
-            
-            # Heures à vider (nuit profonde + soirée tardive)
-            # On évite :
-            # - 6h-8h (matin, préparation)
-            # - 18h-20h (retour maison, préparation dîner)
-            source_hours = list(range(0, 6)) + list(range(21, 24))
-            
-            # Heures solaires optimales (pic de production)
-            target_hours = list(range(10, 16))  # 10h-16h
-            
-            # Calculer la consommation déplaçable
-            source_consumption = sum(optimized[day_start + h] for h in source_hours)
-            to_shift = source_consumption * shift_ratio
-            
-            # Réduire les heures sources proportionnellement
-            reduction_per_hour = to_shift / len(source_hours)
-            for h in source_hours:
-                optimized[day_start + h] = max(0, optimized[day_start + h] - reduction_per_hour)
-            
-            # Augmenter les heures cibles (pic solaire)
-            boost_per_hour = to_shift / len(target_hours)
-            for h in target_hours:
-                optimized[day_start + h] += boost_per_hour
-            
-            total_shifted += to_shift
+        # Heures solaires optimales (pic de production)
+        target_hours = list(range(10, 16))  # 10h-16h
+        
+        # Tous les jours à la fois, sur la vue (365, 24) du profil
+        days = vue_journaliere(optimized)
+        
+        # Consommation déplaçable de chaque jour
+        source_consumption = days[:, source_hours]
+        to_shift = source_consumption.sum(axis=1) * shift_ratio
+        
+        # Réduire les heures sources proportionnellement
+        reduction_per_hour = to_shift / len(source_hours)
+        days[:, source_hours] = np.maximum(0, source_consumption - reduction_per_hour[:, None])
+        
+        # Augmenter les heures cibles (pic solaire)
+        boost_per_hour = to_shift / len(target_hours)
+        days[:, target_hours] += boost_per_hour[:, None]
+        
+        # Compteur pour le rapport
+        total_shifted = float(to_shift.sum())
         
         # Rapport d'optimisation
         details = {
@@ -285,13 +281,16 @@ class ConsumptionProfiles:
         
         # 2. Créer un pattern pour les appareils spécifiques
         # Ce pattern contiendra les pics de consommation des appareils identifiés
-        specific_pattern = np.zeros(8760)
+        # (vue (365, 24) : une ligne par jour)
+        specific_days = np.zeros((JOURS_PAR_AN, HEURES_PAR_JOUR))
         
         # Estimer la part de consommation "de base" vs "appareils programmables"
         # Base = frigo, éclairage, box, veilles, etc. (environ 40% de la conso)
         # Appareils = tout ce qui est programmable (environ 60%)
         base_consumption_ratio = 0.40
         
+        tous_les_jours = np.ones(JOURS_PAR_AN, dtype=bool)
+        
         # 3. Ajouter les pics de chaque appareil
         
         # === CHAUFFE-EAU ÉLECTRIQUE ===
@@ -309,10 +308,7 @@ class ConsumptionProfiles:
                     heure = ecs.get('heure_habituelle', 2)
                 
                 # Ajouter le pic chaque jour
-                for day in range(365):
-                    for h in range(duree_h):
-                        hour_index = day * 24 + (heure + h) % 24
-                        specific_pattern[hour_index] += puissance_kw
+                _ajouter_cycles(specific_days, tous_les_jours, heure, duree_h, puissance_kw)
         
         # === CHAUFFE-EAU THERMODYNAMIQUE ===
         if 'ecs' in appareils_data:
@@ -326,10 +322,7 @@ class ConsumptionProfiles:
                 else:
                     heure = ecs.get('heure_habituelle', 2)
                 
-                for day in range(365):
-                    for h in range(duree_h):
-                        hour_index = day * 24 + (heure + h) % 24
-                        specific_pattern[hour_index] += puissance_kw
+                _ajouter_cycles(specific_days, tous_les_jours, heure, duree_h, puissance_kw)
         
         # === LAVE-LINGE ===
         if 'lave_linge' in appareils_data and appareils_data['lave_linge'].get('present'):
@@ -345,13 +338,7 @@ class ConsumptionProfiles:
             # Répartir les cycles sur la semaine
             jours_utilisation = [0, 2, 4, 6][:int(cycles_par_semaine)]  # Lundi, mercredi, vendredi, dimanche
             
-            for week in range(52):
-                for jour in jours_utilisation:
-                    day = week * 7 + jour
-                    if day < 365:
-                        for h in range(duree_h):
-                            hour_index = day * 24 + (heure + h) % 24
-                            specific_pattern[hour_index] += puissance_kw
+            _ajouter_cycles(specific_days, _masque_hebdomadaire(jours_utilisation), heure, duree_h, puissance_kw)
         
         # === LAVE-VAISSELLE ===
         if 'lave_vaisselle' in appareils_data and appareils_data['lave_vaisselle'].get('present'):
@@ -366,13 +353,7 @@ class ConsumptionProfiles:
             
             jours_utilisation = [0, 1, 2, 3, 4, 5, 6][:int(cycles_par_semaine)]
             
-            for week in range(52):
-                for jour in jours_utilisation:
-                    day = week * 7 + jour
-                    if day < 365:
-                        for h in range(int(duree_h)):
-                            hour_index = day * 24 + (heure + h) % 24
-                            specific_pattern[hour_index] += puissance_kw
+            _ajouter_cycles(specific_days, _masque_hebdomadaire(jours_utilisation), heure, int(duree_h), puissance_kw)
         
         # === SÈCHE-LINGE ===
         if 'seche_linge' in appareils_data and appareils_data['seche_linge'].get('present'):
@@ -387,13 +368,7 @@ class ConsumptionProfiles:
             
             jours_utilisation = [0, 2, 4][:int(cycles_par_semaine)]
             
-            for week in range(52):
-                for jour in jours_utilisation:
-                    day = week * 7 + jour
-                    if day < 365:
-                        for h in range(int(duree_h)):
-                            hour_index = day * 24 + (heure + h) % 24
-                            specific_pattern[hour_index] += puissance_kw
+            _ajouter_cycles(specific_days, _masque_hebdomadaire(jours_utilisation), heure, int(duree_h), puissance_kw)
         
         # === VÉHICULE ÉLECTRIQUE ===
         if 'vehicule_electrique' in appareils_data and appareils_data['vehicule_electrique'].get('present'):
@@ -409,13 +384,7 @@ class ConsumptionProfiles:
             # Uniquement les jours de semaine généralement
             jours_utilisation = [0, 1, 2, 3, 4][:jours_par_semaine]
             
-            for week in range(52):
-                for jour in jours_utilisation:
-                    day = week * 7 + jour
-                    if day < 365:
-                        for h in range(duree_h):
-                            hour_index = day * 24 + (heure + h) % 24
-                            specific_pattern[hour_index] += puissance_kw
+            _ajouter_cycles(specific_days, _masque_hebdomadaire(jours_utilisation), heure, duree_h, puissance_kw)
         
         # === PISCINE - FILTRATION ===
         if 'piscine' in appareils_data and appareils_data['piscine'].get('present'):
@@ -432,10 +401,12 @@ class ConsumptionProfiles:
             debut_saison = 120  # ~Mai
             fin_saison = debut_saison + (mois_utilisation * 30)
             
-            for day in range(debut_saison, min(fin_saison, 365)):
-                for h in range(duree_h):
-                    hour_index = day * 24 + (heure + h) % 24
-                    specific_pattern[hour_index] += puissance_kw
+            jours = np.arange(JOURS_PAR_AN)
+            saison = (jours >= debut_saison) & (jours < min(fin_saison, 365))
+            
+            _ajouter_cycles(specific_days, saison, heure, duree_h, puissance_kw)
+        
+        specific_pattern = specific_days.reshape(HEURES_PAR_AN)
         
         # 4. Combiner le profil de base avec les appareils spécifiques
         # Le profil de base représente la consommation "incompressible" (40%)
@@ -498,18 +469,94 @@ class ConsumptionProfiles:
         return validation
 
 
+# ==============================================================================
+# TEMPLATES PRÉCOMPILÉS
+# ==============================================================================
+
+@lru_cache(maxsize=None)
+def _templates_journaliers(profile_type: str) -> np.ndarray:
+    """
+    Templates journaliers d'un profil, assemblés une fois depuis PROFILES.
+    
+    Returns:
+        np.ndarray: (2, 24) en lecture seule, ligne 0 = semaine, ligne 1 = week-end
+    """
+    profile = ConsumptionProfiles.PROFILES[profile_type]
+    
+    templates = np.array([
+        (
+            profile[day_type]['nuit'] +      # 0h-5h (6 valeurs)
+            profile[day_type]['matin'] +     # 6h-8h (3 valeurs)
+            profile[day_type]['journee'] +   # 9h-17h (9 valeurs)
+            profile[day_type]['soir']        # 18h-23h (6 valeurs)
+        )
+        for day_type in ('semaine', 'weekend')
+    ], dtype=float)
+    
+    # Vérification de sécurité
+    assert templates.shape == (2, 24), f"Pattern should have 24 values, got {templates.shape[-1]}"
+    
+    templates.setflags(write=False)
+    return templates
+
+
+@lru_cache(maxsize=None)
+def _pattern_annuel(profile_type: str) -> np.ndarray:
+    """
+    Pattern annuel sans aléa : un seul fancy-index des templates par le
+    masque week-end du calendrier (jour 0 = lundi).
+    
+    Returns:
+        np.ndarray: 8760 valeurs en lecture seule
+    """
+    templates = _templates_journaliers(profile_type)
+    pattern = templates[WEEKEND_PAR_JOUR.astype(np.intp)].reshape(HEURES_PAR_AN)
+    pattern.setflags(write=False)
+    return pattern
+
+
+def _masque_hebdomadaire(jours_utilisation) -> np.ndarray:
+    """
+    Masque des jours (365 booléens) utilisés chaque semaine.
+    
+    Les 52 semaines complètes seulement : le 365e jour n'est jamais utilisé.
+    
+    Args:
+        jours_utilisation: Jours de la semaine (0 = lundi ... 6 = dimanche)
+    """
+    return np.isin(JOUR_SEMAINE, jours_utilisation) & (np.arange(JOURS_PAR_AN) < 52 * 7)
+
+
+def _ajouter_cycles(jours_heures: np.ndarray, jours, heure: int, duree_h: int, puissance_kw: float) -> None:
+    """
+    Ajoute en place `puissance_kw` sur `duree_h` heures à partir de `heure`
+    (bouclant sur minuit) pour chaque jour sélectionné.
+    
+    Args:
+        jours_heures: Vue (365, 24) du pattern
+        jours: Masque (365 booléens) des jours concernés
+    """
+    journee = np.zeros(HEURES_PAR_JOUR)
+    np.add.at(journee, (heure + np.arange(duree_h)) % HEURES_PAR_JOUR, puissance_kw)
+    jours_heures[jours] += journee
+
+
 # Fonction helper pour compatibilité
-def get_consumption_pattern(profile_type: str = 'actif_absent') -> np.ndarray:
+def get_consumption_pattern(
+    profile_type: str = 'actif_absent',
+    rng: np.random.Generator = None
+) -> np.ndarray:
     """
     Fonction helper pour génération rapide.
     
     Args:
         profile_type: Type de profil
+        rng: Générateur aléatoire (optionnel)
     
     Returns:
         np.ndarray: Pattern annuel (8760 valeurs)
     """
-    return ConsumptionProfiles.generate_yearly_pattern(profile_type)
+    return ConsumptionProfiles.generate_yearly_pattern(profile_type, rng=rng)
 
 
 # Auto-validation au chargement du module
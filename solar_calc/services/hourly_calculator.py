@@ -14,6 +14,13 @@ from typing import Dict, List, Tuple
 from dataclasses import dataclass
 import logging
 
+from solar_calc.tmy_calendar import (
+    HEURES_PAR_AN,
+    MOIS_PAR_HEURE,
+    index_temporel,
+    somme_mensuelle,
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -44,6 +51,53 @@ class HourlyResults:
     donnees_horaires: pd.DataFrame = None
 
 
+def compute_hourly_flows(
+    production_horaire_kw: np.ndarray,
+    consommation_horaire_kw: np.ndarray
+) -> Dict:
+    """
+    Moteur vectorisé : calcule les flux horaires et leurs agrégats en une passe NumPy.
+
+    Aucune DataFrame ni boucle Python : les flux sont des opérations élément par
+    élément et les totaux mensuels un seul np.add.reduceat sur les bornes de mois
+    du calendrier TMY partagé.
+
+    Args:
+        production_horaire_kw: Production horaire (8760 valeurs en kW)
+        consommation_horaire_kw: Consommation horaire (8760 valeurs en kW)
+
+    Returns:
+        dict: Séries horaires (production_kw, consommation_kw, autoconso_kw,
+              injection_kw, achat_kw), totaux annuels et tableaux mensuels (12)
+    """
+    production = np.asarray(production_horaire_kw, dtype=np.float64)
+    consommation = np.asarray(consommation_horaire_kw, dtype=np.float64)
+
+    # Autoconso[H] = min(P, C) ; Injection = P - autoconso ; Achat = C - autoconso
+    autoconso = np.minimum(production, consommation)
+    injection = production - autoconso
+    achat = consommation - autoconso
+
+    # Agrégation mensuelle des trois séries en un seul appel
+    mensuel = somme_mensuelle(np.stack((production, consommation, autoconso)))
+
+    return {
+        'production_kw': production,
+        'consommation_kw': consommation,
+        'autoconso_kw': autoconso,
+        'injection_kw': injection,
+        'achat_kw': achat,
+        'production_totale': float(production.sum()),
+        'consommation_totale': float(consommation.sum()),
+        'autoconso_totale': float(autoconso.sum()),
+        'injection_totale': float(injection.sum()),
+        'achat_total': float(achat.sum()),
+        'production_mensuelle': mensuel[0],
+        'consommation_mensuelle': mensuel[1],
+        'autoconsommation_mensuelle': mensuel[2],
+    }
+
+
 class HourlyAutoconsumptionCalculator:
     """
     Calculateur d'autoconsommation basé sur les profils horaires réels.
@@ -88,46 +142,26 @@ class HourlyAutoconsumptionCalculator:
         logger.info("🔄 Calcul autoconsommation horaire...")
         
         # Vérifications
-        if len(production_horaire_kw) != 8760:
+        if len(production_horaire_kw) != HEURES_PAR_AN:
             raise ValueError(
                 f"Production doit avoir 8760 valeurs (année complète), "
                 f"reçu {len(production_horaire_kw)}"
             )
         
-        if len(consommation_horaire_kw) != 8760:
+        if len(consommation_horaire_kw) != HEURES_PAR_AN:
             raise ValueError(
                 f"Consommation doit avoir 8760 valeurs (année complète), "
                 f"reçu {len(consommation_horaire_kw)}"
             )
         
-        # Créer le DataFrame horaire
-        df = pd.DataFrame({
-            'production_kw': production_horaire_kw,
-            'consommation_kw': consommation_horaire_kw
-        })
-        
-        # Calcul heure par heure
-        # Autoconsommation = ce qui est produit ET consommé simultanément
-        df['autoconso_kw'] = df[['production_kw', 'consommation_kw']].min(axis=1)
-        
-        # Injection = surplus de production (non consommé)
-        df['injection_kw'] = df.apply(
-            lambda row: max(0, row['production_kw'] - row['consommation_kw']),
-            axis=1
-        )
-        
-        # Achat réseau = déficit de consommation (non couvert par prod)
-        df['achat_kw'] = df.apply(
-            lambda row: max(0, row['consommation_kw'] - row['production_kw']),
-            axis=1
-        )
+        flux = compute_hourly_flows(production_horaire_kw, consommation_horaire_kw)
         
         # ===== TOTAUX ANNUELS =====
-        production_totale = df['production_kw'].sum()
-        consommation_totale = df['consommation_kw'].sum()
-        autoconso_totale = df['autoconso_kw'].sum()
-        injection_totale = df['injection_kw'].sum()
-        achat_total = df['achat_kw'].sum()
+        production_totale = flux['production_totale']
+        consommation_totale = flux['consommation_totale']
+        autoconso_totale = flux['autoconso_totale']
+        injection_totale = flux['injection_totale']
+        achat_total = flux['achat_total']
         
         # ===== TAUX =====
         # Taux d'autoconsommation = part de la production qui est consommée localement
@@ -148,34 +182,22 @@ class HourlyAutoconsumptionCalculator:
         production_specifique = production_totale / self.puissance_kwc
         
         # ===== DONNÉES MENSUELLES =====
-        # Créer un index temporel pour agréger par mois
-        df['timestamp'] = pd.date_range(
-            start='2023-01-01',  # Année fictive pour TMY
-            periods=8760,
-            freq='h'
-        )
-        df['month'] = df['timestamp'].dt.month
+        production_mensuelle = [round(float(v), 2) for v in flux['production_mensuelle']]
+        consommation_mensuelle = [round(float(v), 2) for v in flux['consommation_mensuelle']]
+        autoconsommation_mensuelle = [round(float(v), 2) for v in flux['autoconsommation_mensuelle']]
         
-        # Agréger par mois
-        monthly_prod = df.groupby('month')['production_kw'].sum()
-        monthly_conso = df.groupby('month')['consommation_kw'].sum()
-        monthly_autoconso = df.groupby('month')['autoconso_kw'].sum()
-        
-        # S'assurer d'avoir 12 mois
-        production_mensuelle = []
-        consommation_mensuelle = []
-        autoconsommation_mensuelle = []
-        
-        for month in range(1, 13):
-            production_mensuelle.append(
-                round(monthly_prod.get(month, 0), 2)
-            )
-            consommation_mensuelle.append(
-                round(monthly_conso.get(month, 0), 2)
-            )
-            autoconsommation_mensuelle.append(
-                round(monthly_autoconso.get(month, 0), 2)
-            )
+        # DataFrame horaire construit uniquement sur demande (coûteux)
+        donnees_horaires = None
+        if include_hourly_data:
+            donnees_horaires = pd.DataFrame({
+                'production_kw': flux['production_kw'],
+                'consommation_kw': flux['consommation_kw'],
+                'autoconso_kw': flux['autoconso_kw'],
+                'injection_kw': flux['injection_kw'],
+                'achat_kw': flux['achat_kw'],
+                'timestamp': index_temporel(2023),  # Année fictive pour TMY
+                'month': MOIS_PAR_HEURE,
+            })
         
         # ===== LOGS =====
         logger.info(f"📊 Production annuelle : {production_totale:.2f} kWh")
@@ -198,7 +220,7 @@ class HourlyAutoconsumptionCalculator:
             production_mensuelle_kwh=production_mensuelle,
             consommation_mensuelle_kwh=consommation_mensuelle,
             autoconsommation_mensuelle_kwh=autoconsommation_mensuelle,
-            donnees_horaires=df if include_hourly_data else None
+            donnees_horaires=donnees_horaires
         )
 
 
@@ -222,3 +244,295 @@ def calculate_autoconsumption_for_power(
     """
     calculator = HourlyAutoconsumptionCalculator(puissance_kwc)
     return calculator.calculate(production_horaire_kw, consommation_horaire_kw)
+
+
+# ==============================================================================
+# CALCUL PAR LOTS (N scénarios × 8760 heures)
+# ==============================================================================
+
+# Nombre max de valeurs float64 traitées par bloc (~32 Mo par tableau intermédiaire)
+BATCH_MAX_ELEMENTS = 4_000_000
+
+
+@dataclass
+class BatchHourlyResults:
+    """
+    Résultats vectorisés du calcul d'autoconsommation pour N scénarios.
+    
+    Chaque attribut annuel est un tableau de forme (N,), chaque attribut
+    mensuel un tableau de forme (N, 12).
+    """
+    
+    production_annuelle_kwh: np.ndarray
+    consommation_annuelle_kwh: np.ndarray
+    autoconsommation_kwh: np.ndarray
+    injection_reseau_kwh: np.ndarray
+    achat_reseau_kwh: np.ndarray
+    
+    taux_autoconsommation_pct: np.ndarray
+    taux_autoproduction_pct: np.ndarray
+    
+    production_mensuelle_kwh: np.ndarray
+    consommation_mensuelle_kwh: np.ndarray
+    autoconsommation_mensuelle_kwh: np.ndarray
+    
+    # Puissances des scénarios (optionnel, pour la production spécifique)
+    puissances_kwc: np.ndarray = None
+    
+    def __len__(self) -> int:
+        return len(self.autoconsommation_kwh)
+    
+    def to_hourly_results(self, index: int) -> HourlyResults:
+        """
+        Extrait un scénario au format HourlyResults (même arrondi que calculate()).
+        
+        Args:
+            index: Indice du scénario
+        
+        Returns:
+            HourlyResults: Résultats du scénario (sans données horaires)
+        """
+        production = float(self.production_annuelle_kwh[index])
+        if self.puissances_kwc is not None and self.puissances_kwc[index] > 0:
+            production_specifique = production / float(self.puissances_kwc[index])
+        else:
+            production_specifique = 0.0
+        
+        return HourlyResults(
+            production_annuelle_kwh=round(production, 2),
+            consommation_annuelle_kwh=round(float(self.consommation_annuelle_kwh[index]), 2),
+            autoconsommation_kwh=round(float(self.autoconsommation_kwh[index]), 2),
+            injection_reseau_kwh=round(float(self.injection_reseau_kwh[index]), 2),
+            achat_reseau_kwh=round(float(self.achat_reseau_kwh[index]), 2),
+            taux_autoconsommation_pct=round(float(self.taux_autoconsommation_pct[index]), 2),
+            taux_autoproduction_pct=round(float(self.taux_autoproduction_pct[index]), 2),
+            production_specifique_kwh_kwc=round(production_specifique, 2),
+            production_mensuelle_kwh=[round(float(v), 2) for v in self.production_mensuelle_kwh[index]],
+            consommation_mensuelle_kwh=[round(float(v), 2) for v in self.consommation_mensuelle_kwh[index]],
+            autoconsommation_mensuelle_kwh=[round(float(v), 2) for v in self.autoconsommation_mensuelle_kwh[index]],
+        )
+
+
+def _as_scenario_matrix(values, nom: str) -> np.ndarray:
+    """Convertit une série (8760,) ou une matrice (N, 8760) en matrice 2-D float64."""
+    matrice = np.asarray(values, dtype=np.float64)
+    if matrice.ndim == 1:
+        matrice = matrice[np.newaxis, :]
+    if matrice.ndim != 2 or matrice.shape[1] != HEURES_PAR_AN:
+        raise ValueError(
+            f"{nom} doit avoir la forme (8760,) ou (N, 8760), reçu {matrice.shape}"
+        )
+    return matrice
+
+
+def calculate_autoconsumption_batch(
+    production_horaire_kw: np.ndarray,
+    consommation_horaire_kw: np.ndarray,
+    puissances_kwc: np.ndarray = None,
+    max_elements: int = BATCH_MAX_ELEMENTS
+) -> BatchHourlyResults:
+    """
+    Calcule l'autoconsommation de N scénarios en un seul appel vectorisé.
+    
+    Production et consommation sont diffusées (broadcast) l'une contre l'autre :
+    - (8760,) × (N, 8760) : une courbe de production contre N profils
+    - (N, 8760) × (8760,) : N productions contre un profil
+    - (N, 8760) × (N, 8760) : scénarios appariés ligne à ligne
+    
+    Si `puissances_kwc` est fourni avec une production 1-D, celle-ci est
+    interprétée comme la production pour 1 kWc : chaque scénario i utilise
+    production × puissances_kwc[i], mis à l'échelle bloc par bloc sans
+    matérialiser la matrice complète.
+    
+    Les totaux et mensuels de production/consommation sont calculés une seule
+    fois par ligne source ; seule l'autoconsommation nécessite le croisement,
+    traité par blocs de lignes pour borner la mémoire à `max_elements` valeurs.
+    
+    Args:
+        production_horaire_kw: Production (8760,) ou (N, 8760) en kW
+        consommation_horaire_kw: Consommation (8760,) ou (N, 8760) en kW
+        puissances_kwc: Puissances des scénarios (N,) (optionnel)
+        max_elements: Nombre max de valeurs par bloc de calcul
+    
+    Returns:
+        BatchHourlyResults: Totaux (N,), taux (N,) et mensuels (N, 12)
+    
+    Example:
+        >>> puissances = np.arange(1, 10.5, 0.5)
+        >>> res = calculate_autoconsumption_batch(prod_1kwc, conso, puissances_kwc=puissances)
+        >>> res.taux_autoproduction_pct.argmax()
+    """
+    production = _as_scenario_matrix(production_horaire_kw, "Production")
+    consommation = _as_scenario_matrix(consommation_horaire_kw, "Consommation")
+    
+    echelle = None
+    if puissances_kwc is not None:
+        puissances_kwc = np.atleast_1d(np.asarray(puissances_kwc, dtype=np.float64))
+        if production.shape[0] == 1:
+            echelle = puissances_kwc[:, np.newaxis]
+    
+    nb_lignes_prod = production.shape[0] if echelle is None else len(echelle)
+    try:
+        nb_scenarios = np.broadcast_shapes((nb_lignes_prod,), (consommation.shape[0],))[0]
+    except ValueError:
+        raise ValueError(
+            f"Nombre de scénarios incompatible : {nb_lignes_prod} productions "
+            f"pour {consommation.shape[0]} consommations"
+        ) from None
+    if puissances_kwc is not None and len(puissances_kwc) not in (1, nb_scenarios):
+        raise ValueError(
+            f"puissances_kwc doit avoir {nb_scenarios} valeurs, reçu {len(puissances_kwc)}"
+        )
+    
+    # ===== AGRÉGATS PAR LIGNE SOURCE (calculés une seule fois) =====
+    prod_totale = production.sum(axis=1)
+    prod_mensuelle = somme_mensuelle(production)
+    if echelle is not None:
+        prod_totale = prod_totale * echelle[:, 0]
+        prod_mensuelle = prod_mensuelle * echelle
+    conso_totale = consommation.sum(axis=1)
+    conso_mensuelle = somme_mensuelle(consommation)
+    
+    prod_totale = np.broadcast_to(prod_totale, (nb_scenarios,))
+    prod_mensuelle = np.broadcast_to(prod_mensuelle, (nb_scenarios, 12))
+    conso_totale = np.broadcast_to(conso_totale, (nb_scenarios,))
+    conso_mensuelle = np.broadcast_to(conso_mensuelle, (nb_scenarios, 12))
+    
+    # ===== AUTOCONSOMMATION (croisement par blocs) =====
+    autoconso_mensuelle = np.empty((nb_scenarios, 12))
+    taille_bloc = max(1, int(max_elements) // HEURES_PAR_AN)
+    
+    for debut in range(0, nb_scenarios, taille_bloc):
+        fin = min(debut + taille_bloc, nb_scenarios)
+        
+        if echelle is not None:
+            bloc_prod = production * np.broadcast_to(echelle, (nb_scenarios, 1))[debut:fin]
+        elif production.shape[0] == 1:
+            bloc_prod = production
+        else:
+            bloc_prod = production[debut:fin]
+        bloc_conso = consommation if consommation.shape[0] == 1 else consommation[debut:fin]
+        
+        autoconso = np.minimum(bloc_prod, bloc_conso)
+        autoconso_mensuelle[debut:fin] = somme_mensuelle(autoconso)
+    
+    autoconso_totale = autoconso_mensuelle.sum(axis=1)
+    
+    # ===== TAUX =====
+    with np.errstate(divide='ignore', invalid='ignore'):
+        taux_autoconso = np.where(prod_totale > 0, autoconso_totale / prod_totale * 100, 0.0)
+        taux_autoprod = np.where(conso_totale > 0, autoconso_totale / conso_totale * 100, 0.0)
+    
+    logger.debug(f"Calcul par lots : {nb_scenarios} scénarios (blocs de {taille_bloc})")
+    
+    return BatchHourlyResults(
+        production_annuelle_kwh=np.array(prod_totale),
+        consommation_annuelle_kwh=np.array(conso_totale),
+        autoconsommation_kwh=autoconso_totale,
+        injection_reseau_kwh=np.maximum(prod_totale - autoconso_totale, 0.0),
+        achat_reseau_kwh=np.maximum(conso_totale - autoconso_totale, 0.0),
+        taux_autoconsommation_pct=taux_autoconso,
+        taux_autoproduction_pct=taux_autoprod,
+        production_mensuelle_kwh=np.array(prod_mensuelle),
+        consommation_mensuelle_kwh=np.array(conso_mensuelle),
+        autoconsommation_mensuelle_kwh=autoconso_mensuelle,
+        puissances_kwc=(
+            None if puissances_kwc is None
+            else np.broadcast_to(puissances_kwc, (nb_scenarios,)).copy()
+        ),
+    )
+
+
+
+# ==============================================================================
+# INDEX TRIÉ : AUTOCONSOMMATION À N'IMPORTE QUELLE PUISSANCE
+# ==============================================================================
+
+class AutoconsumptionIndex:
+    """
+    Index précalculé de l'autoconsommation Σ min(p·a_h, c_h) en fonction de p.
+    
+    Pour une forme de production a (1 kWc) et une consommation c fixées,
+    l'heure h est saturée (autoconsommation = c_h) dès que p ≥ c_h / a_h,
+    et vaut p·a_h sinon. En triant les heures productives par ratio c_h/a_h
+    et en cumulant c et a dans cet ordre (O(n log n), une seule fois) :
+    
+        autoconso(p) = Σ c_h (heures saturées) + p · Σ a_h (autres heures)
+    
+    Le nombre d'heures saturées s'obtient par recherche dichotomique :
+    chaque puissance coûte O(log n) au lieu de O(n). La fonction est
+    linéaire par morceaux et concave en p.
+    
+    Example:
+        >>> index = AutoconsumptionIndex(prod_1kwc, conso)
+        >>> index.autoconsommation(np.arange(0.5, 500.5, 0.5))
+        >>> index.taux_autoproduction(6.0)
+    """
+    
+    def __init__(self, production_1kwc: np.ndarray, consommation_horaire_kw: np.ndarray):
+        """
+        Args:
+            production_1kwc: Production horaire pour 1 kWc (8760,)
+            consommation_horaire_kw: Consommation horaire (8760,), positive
+        """
+        production = np.asarray(production_1kwc, dtype=np.float64).ravel()
+        consommation = np.asarray(consommation_horaire_kw, dtype=np.float64).ravel()
+        if production.shape != consommation.shape:
+            raise ValueError(
+                f"Production et consommation de tailles différentes : "
+                f"{production.shape} ≠ {consommation.shape}"
+            )
+        if (consommation < 0).any() or (production < 0).any():
+            raise ValueError("Production et consommation doivent être positives")
+        
+        # Heures sans production : autoconsommation nulle quelle que soit p
+        productives = production > 0
+        a = production[productives]
+        c = consommation[productives]
+        ordre = np.argsort(c / a, kind='stable')
+        
+        self.seuils_kwc = (c / a)[ordre]
+        # Σ c des k premières heures (saturées) ; Σ a des heures k et suivantes
+        self._conso_saturee = np.concatenate(([0.0], np.cumsum(c[ordre])))
+        self._production_restante = np.concatenate((np.cumsum(a[ordre][::-1])[::-1], [0.0]))
+        for tableau in (self.seuils_kwc, self._conso_saturee, self._production_restante):
+            tableau.flags.writeable = False
+        
+        self.production_1kwc_annuelle_kwh = float(production.sum())
+        self.consommation_annuelle_kwh = float(consommation.sum())
+    
+    def __len__(self) -> int:
+        return len(self.seuils_kwc)
+    
+    def autoconsommation(self, puissances_kwc):
+        """Autoconsommation annuelle (kWh) pour une ou plusieurs puissances."""
+        p = np.asarray(puissances_kwc, dtype=np.float64)
+        k = np.searchsorted(self.seuils_kwc, p, side='right')
+        return self._conso_saturee[k] + p * self._production_restante[k]
+    
+    def production(self, puissances_kwc):
+        """Production annuelle (kWh)."""
+        return self.production_1kwc_annuelle_kwh * np.asarray(puissances_kwc, dtype=np.float64)
+    
+    def injection(self, puissances_kwc):
+        """Injection annuelle (kWh) = production - autoconsommation."""
+        return np.maximum(self.production(puissances_kwc) - self.autoconsommation(puissances_kwc), 0.0)
+    
+    def achat(self, puissances_kwc):
+        """Achat réseau annuel (kWh) = consommation - autoconsommation."""
+        return np.maximum(self.consommation_annuelle_kwh - self.autoconsommation(puissances_kwc), 0.0)
+    
+    def taux_autoconsommation(self, puissances_kwc):
+        """Part de la production autoconsommée (%)."""
+        production = self.production(puissances_kwc)
+        return np.where(
+            production > 0,
+            self.autoconsommation(puissances_kwc) / np.where(production > 0, production, 1.0) * 100,
+            0.0
+        )
+    
+    def taux_autoproduction(self, puissances_kwc):
+        """Part de la consommation couverte par le solaire (%)."""
+        if self.consommation_annuelle_kwh <= 0:
+            return np.zeros_like(np.asarray(puissances_kwc, dtype=np.float64))
+        return self.autoconsommation(puissances_kwc) / self.consommation_annuelle_kwh * 100
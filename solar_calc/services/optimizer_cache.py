@@ -0,0 +1,206 @@
+"""
+Cache des résultats d'optimisation, adressé par contenu.
+solar_calc/services/optimizer_cache.py
+
+La clé est une empreinte stable de toutes les entrées de l'optimiseur :
+courbe de production 1 kWc (météo), consommation, objectifs, plage et pas
+de puissance, matériel et version des grilles tarifaires. Deux
+simulations identiques (même lieu arrondi, même profil, même matériel)
+partagent donc le même résultat.
+
+Le cache Django utilisé est OPTIMISATION_CACHE_ALIAS (Redis en
+production). Le volume est borné par Redis lui-même (maxmemory avec
+maxmemory-policy allkeys-lru) et chaque entrée expire avec le TIMEOUT
+de l'alias : aucun index n'est tenu ici, une lecture ne fait aucune
+écriture hormis l'incrément atomique des compteurs de hits/misses.
+Toute erreur du cache est traitée comme un cache manquant.
+"""
+
+import hashlib
+import json
+import logging
+import zlib
+from typing import Dict, Optional
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+
+from solar_calc.services.power_optimizer import (
+    OBJECTIFS_AUTOCONSOMMATION,
+    optimize_power_all_objectives,
+)
+from solar_calc.services.tarifs import version_grilles_tarifaires
+
+
+logger = logging.getLogger(__name__)
+
+
+# Préfixe des clés (à changer si le format des résultats change)
+CLE_PREFIXE = 'optim:v1'
+
+_CLE_HITS = f'{CLE_PREFIXE}:hits'
+_CLE_MISSES = f'{CLE_PREFIXE}:misses'
+
+
+# ==============================================================================
+# CLÉ
+# ==============================================================================
+
+def _empreinte_serie(valeurs) -> str:
+    """Empreinte (blake2b) d'une série horaire float64."""
+    valeurs = valeurs.values if hasattr(valeurs, 'values') else valeurs
+    return hashlib.blake2b(
+        np.ascontiguousarray(valeurs, dtype=np.float64).tobytes(), digest_size=16
+    ).hexdigest()
+
+
+def cle_optimisation(
+    production_1kwc,
+    consommation_horaire,
+    consommation_annuelle,
+    objectifs,
+    min_power,
+    max_power,
+    step,
+    type_onduleur,
+    type_toiture,
+) -> str:
+    """
+    Clé stable des entrées de l'optimiseur.
+
+    Returns:
+        str: 'optim:v1:<empreinte>'
+    """
+    composantes = json.dumps([
+        _empreinte_serie(production_1kwc),
+        _empreinte_serie(consommation_horaire),
+        round(float(consommation_annuelle), 6),
+        list(objectifs),
+        [float(min_power), float(max_power), float(step)],
+        type_onduleur,
+        type_toiture,
+        version_grilles_tarifaires(),
+    ])
+    return f"{CLE_PREFIXE}:{hashlib.blake2b(composantes.encode(), digest_size=20).hexdigest()}"
+
+
+# ==============================================================================
+# ACCÈS AU CACHE
+# ==============================================================================
+
+def _cache():
+    return caches[getattr(settings, 'OPTIMISATION_CACHE_ALIAS', 'default')]
+
+
+def _incrementer(cache, cle: str) -> None:
+    cache.add(cle, 0, timeout=None)
+    cache.incr(cle)
+
+
+def lire_optimisation(cle: str) -> Optional[Dict]:
+    """Résultat en cache pour `cle` (None si absent), compteurs mis à jour."""
+    try:
+        cache = _cache()
+        donnees = cache.get(cle)
+        _incrementer(cache, _CLE_MISSES if donnees is None else _CLE_HITS)
+        if donnees is None:
+            return None
+        return json.loads(zlib.decompress(donnees))
+    except Exception as e:
+        logger.warning(f"⚠️ Cache optimisation indisponible (lecture) : {e}")
+        return None
+
+
+def ecrire_optimisation(cle: str, resultats: Dict) -> None:
+    """Stocke un résultat (JSON compressé) pour la durée TIMEOUT de l'alias."""
+    donnees = zlib.compress(json.dumps(resultats).encode(), 6)
+    try:
+        _cache().set(cle, donnees)
+    except Exception as e:
+        logger.warning(f"⚠️ Cache optimisation indisponible (écriture) : {e}")
+
+
+def statistiques_cache() -> Dict:
+    """
+    Compteurs du cache d'optimisation.
+
+    Le nombre d'entrées et le volume se lisent côté Redis (INFO keyspace,
+    INFO memory, evicted_keys).
+
+    Returns:
+        dict: hits, misses, taux_hit_pct
+    """
+    try:
+        cache = _cache()
+        hits = cache.get(_CLE_HITS) or 0
+        misses = cache.get(_CLE_MISSES) or 0
+    except Exception as e:
+        logger.warning(f"⚠️ Cache optimisation indisponible (statistiques) : {e}")
+        hits = misses = 0
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'taux_hit_pct': round(hits / total * 100, 1) if total else 0.0,
+    }
+
+
+def vider_cache_optimisation() -> None:
+    """
+    Supprime les résultats et remet les compteurs à zéro.
+
+    Sans suppression par motif (django-redis), seuls les compteurs sont
+    remis à zéro : les résultats expirent avec le TIMEOUT de l'alias.
+    """
+    try:
+        cache = _cache()
+        if hasattr(cache, 'delete_pattern'):
+            cache.delete_pattern(f'{CLE_PREFIXE}:*')
+        else:
+            cache.delete_many([_CLE_HITS, _CLE_MISSES])
+    except Exception as e:
+        logger.warning(f"⚠️ Cache optimisation indisponible (vidage) : {e}")
+
+
+# ==============================================================================
+# OPTIMISATION AVEC CACHE
+# ==============================================================================
+
+def optimize_power_all_objectives_cached(
+    production_1kwc,
+    consommation_horaire,
+    consommation_annuelle,
+    min_power=0.5,
+    max_power=12.0,
+    step=0.5,
+    type_onduleur='string',
+    type_toiture='tuiles',
+) -> Dict:
+    """
+    optimize_power_all_objectives derrière le cache adressé par contenu.
+
+    Un hit saute toute l'étape d'optimisation et renvoie les all_configs
+    et best_config stockés.
+
+    Returns:
+        dict: {objectif: résultat au format optimize_power}
+    """
+    cle = cle_optimisation(
+        production_1kwc, consommation_horaire, consommation_annuelle,
+        OBJECTIFS_AUTOCONSOMMATION + ('revente',),
+        min_power, max_power, step, type_onduleur, type_toiture
+    )
+
+    resultats = lire_optimisation(cle)
+    if resultats is not None:
+        logger.info(f"♻️ Optimisation lue en cache ({cle[-12:]})")
+        return resultats
+
+    resultats = optimize_power_all_objectives(
+        production_1kwc, consommation_horaire, consommation_annuelle,
+        min_power=min_power, max_power=max_power, step=step,
+        type_onduleur=type_onduleur, type_toiture=type_toiture,
+    )
+    ecrire_optimisation(cle, resultats)
+    return resultats
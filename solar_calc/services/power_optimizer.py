@@ -0,0 +1,579 @@
+"""
+Optimiseur de la puissance PV.
+solar_calc/services/power_optimizer.py
+
+Toutes les puissances candidates sont évaluées en opérations sur tableaux :
+autoconsommation (AutoconsumptionIndex : tri des heures une fois, puis
+O(log n) par puissance), coûts, primes, tarifs et scores. Seule la mise
+en forme des configurations (all_configs) reste en Python.
+
+En recherche continue, seuls les segments délimités par les paliers
+tarifaires sont explorés, chacun par une recherche 1-D.
+"""
+
+import logging
+import math
+
+import numpy as np
+
+from solar_calc.services.hourly_calculator import AutoconsumptionIndex
+from solar_calc.services.tarifs import (
+    PALIERS_TARIFAIRES_KWC,
+    TARIF_ACHAT_KWH,
+    calculer_cout_installation_array,
+    get_prime_autoconsommation_array,
+    get_tarif_injection_array,
+    get_tarif_vente_totale_array,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+# ==============================================================================
+# SCORES PAR OBJECTIF
+# ==============================================================================
+
+def _roi(cout_net: np.ndarray, economie_annuelle: np.ndarray) -> np.ndarray:
+    """Temps de retour (ans), 999 si l'économie est nulle."""
+    return np.where(
+        economie_annuelle > 0,
+        cout_net / np.where(economie_annuelle > 0, economie_annuelle, 1.0),
+        999.0
+    )
+
+
+def _scores(objectif: str, roi_annees, autoconso_ratio, autoprod_ratio) -> np.ndarray:
+    """Score de chaque configuration en autoconsommation selon l'objectif."""
+    if objectif == 'autonomie':
+        return autoprod_ratio * np.where(autoconso_ratio < 25, 0.8, 1.0)
+
+    if objectif == 'equilibre':
+        score_roi = np.maximum(0, 15 - roi_annees) / 15
+        score_autoprod = np.minimum(autoprod_ratio / 50, 1.0)
+        score_autoconso = np.minimum(autoconso_ratio / 60, 1.0)
+        return score_roi * 0.4 + score_autoprod * 0.3 + score_autoconso * 0.3
+
+    # 'rentabilite' (défaut)
+    return np.where(roi_annees > 0, 1.0 / np.where(roi_annees > 0, roi_annees, 1.0), 0.0)
+
+
+# ==============================================================================
+# ÉVALUATION VECTORIELLE
+# ==============================================================================
+
+def _evaluer_puissances(
+    puissances,
+    prod_1kwc_annuelle,
+    index,
+    consommation_annuelle,
+    objectifs,
+    type_onduleur,
+    type_toiture,
+):
+    """
+    Évalue un tableau de puissances en opérations vectorielles.
+
+    Les métriques énergétiques et financières sont calculées une seule
+    fois ; seuls les scores dépendent de l'objectif.
+
+    Args:
+        puissances: Puissances à évaluer (kWc), déjà arrondies
+        prod_1kwc_annuelle: Production annuelle pour 1 kWc (kWh)
+        index: AutoconsumptionIndex (None en vente totale)
+        consommation_annuelle: Consommation annuelle totale (kWh)
+        objectifs: Objectifs à scorer ('rentabilite', 'autonomie',
+            'equilibre'), ou ('revente',) seul
+
+    Returns:
+        dict: {objectif: (scores (N,), liste des N configurations)}
+    """
+    puissances = np.asarray(puissances, dtype=np.float64)
+    cout_brut = calculer_cout_installation_array(puissances, type_onduleur, type_toiture)
+    prod_annuelle = prod_1kwc_annuelle * puissances
+
+    vente_totale = tuple(objectifs) == ('revente',)
+
+    if vente_totale:
+        # ─── VENTE TOTALE : 100% injection, pas d'autoconsommation ───
+        tarif_vt = get_tarif_vente_totale_array(puissances)
+        revenu_vente = prod_annuelle * tarif_vt
+
+        # Pas de prime en vente totale ; l'économie = revenu de la vente
+        cout_net = cout_brut
+        economie_annuelle = revenu_vente
+        roi_annees = _roi(cout_net, economie_annuelle)
+        eco_25ans = economie_annuelle * 25 - cout_net  # 25 ans mais contrat = 20 ans
+
+        # Score vente totale : maximiser le bénéfice net sur 20 ans
+        revenu_20ans = revenu_vente * 20
+        benefice_20ans = revenu_20ans - cout_net
+        scores = {'revente': benefice_20ans / 1000}  # Normaliser
+
+    else:
+        # ─── AUTOCONSOMMATION : calcul classique ───
+        autoconso_kwh = index.autoconsommation(puissances)
+        injection_kwh = prod_annuelle - autoconso_kwh
+
+        autoconso_ratio = np.where(
+            prod_annuelle > 0, autoconso_kwh / np.where(prod_annuelle > 0, prod_annuelle, 1.0) * 100, 0.0
+        )
+        autoprod_ratio = (
+            autoconso_kwh / consommation_annuelle * 100 if consommation_annuelle > 0
+            else np.zeros_like(autoconso_kwh)
+        )
+
+        economie_annuelle = autoconso_kwh * TARIF_ACHAT_KWH + injection_kwh * get_tarif_injection_array(puissances)
+        prime = get_prime_autoconsommation_array(puissances)
+        cout_net = cout_brut - prime
+
+        roi_annees = _roi(cout_net, economie_annuelle)
+        eco_25ans = economie_annuelle * 25 - cout_net
+        scores = {
+            objectif: _scores(objectif, roi_annees, autoconso_ratio, autoprod_ratio)
+            for objectif in objectifs
+        }
+
+    # ===== MISE EN FORME DES CONFIGURATIONS =====
+    configs = []
+    for i, p_test in enumerate(puissances.tolist()):
+        config = {
+            'puissance_kwc': p_test,
+            'production_annuelle': round(float(prod_annuelle[i]), 0),
+            'autoconso_kwh': 0,
+            'autoconso_ratio': 0,
+            'autoprod_ratio': 0,
+            'injection_kwh': round(float(prod_annuelle[i]), 0),
+            'economie_annuelle': round(float(economie_annuelle[i]), 0),
+            'cout_brut': round(float(cout_brut[i]), 0),
+            'prime': 0,
+            'cout_net': round(float(cout_net[i]), 0),
+            'roi_annees': round(float(roi_annees[i]), 1),
+            'eco_25ans': round(float(eco_25ans[i]), 0),
+            'score': None,
+        }
+        if vente_totale:
+            # Champs spécifiques vente totale
+            config.update({
+                'tarif_vente_totale': float(tarif_vt[i]),
+                'revenu_vente_annuel': round(float(revenu_vente[i]), 0),
+                'revenu_20ans': round(float(revenu_20ans[i]), 0),
+                'benefice_20ans': round(float(benefice_20ans[i]), 0),
+            })
+        else:
+            config.update({
+                'autoconso_kwh': round(float(autoconso_kwh[i]), 0),
+                'autoconso_ratio': round(float(autoconso_ratio[i]), 1),
+                'autoprod_ratio': round(float(autoprod_ratio[i]), 1),
+                'injection_kwh': round(float(injection_kwh[i]), 0),
+                'prime': round(float(prime[i]), 0),
+            })
+        configs.append(config)
+
+    return {
+        objectif: (
+            scores_objectif,
+            [
+                dict(config, score=round(score, 4))
+                for config, score in zip(configs, scores_objectif.tolist())
+            ]
+        )
+        for objectif, scores_objectif in scores.items()
+    }
+
+
+# ==============================================================================
+# RECHERCHE CONTINUE PAR SEGMENTS TARIFAIRES
+# ==============================================================================
+
+# Nombre d'or pour la recherche par section dorée
+_RATIO_OR = (math.sqrt(5) - 1) / 2
+
+# Seuil d'autoconsommation sous lequel l'objectif 'autonomie' pénalise le score
+SEUIL_AUTOCONSO_AUTONOMIE_PCT = 25
+
+
+def _segments_tarifaires(min_power, max_power, precision, seuils_supplementaires=()):
+    """
+    Découpe [min_power, max_power] aux paliers des grilles tarifaires.
+
+    Les grilles sont fermées à droite (p ≤ palier) : un segment commence
+    un pas de précision après le palier précédent et finit sur le palier.
+
+    Returns:
+        list: Segments (début, fin) en kWc, bornes sur la grille de précision
+    """
+    paliers = sorted(
+        p for p in set(PALIERS_TARIFAIRES_KWC) | set(seuils_supplementaires)
+        if min_power < p < max_power
+    )
+    bornes = [min_power] + paliers + [max_power]
+    segments = []
+    for i, (bas, haut) in enumerate(zip(bornes[:-1], bornes[1:])):
+        debut = bas if i == 0 else math.floor(bas / precision + 1e-9) * precision + precision
+        fin = math.floor(haut / precision + 1e-9) * precision
+        if debut <= fin + 1e-9:
+            segments.append((round(debut, 6), round(fin, 6)))
+    return segments
+
+
+def _seuil_autoconso(index, prod_1kwc_annuelle, min_power, max_power, taux_pct):
+    """Puissance où le taux d'autoconsommation (décroissant en p) passe sous taux_pct."""
+    def taux(p):
+        return index.autoconsommation(p) / (prod_1kwc_annuelle * p) * 100
+
+    if prod_1kwc_annuelle <= 0 or taux(max_power) >= taux_pct or taux(min_power) < taux_pct:
+        return None
+    bas, haut = min_power, max_power
+    for _ in range(60):
+        milieu = (bas + haut) / 2
+        if taux(milieu) >= taux_pct:
+            bas = milieu
+        else:
+            haut = milieu
+    return bas
+
+
+def _optimize_power_continu(
+    prod_1kwc,
+    index,
+    consommation_annuelle,
+    objectif,
+    min_power,
+    max_power,
+    precision,
+    type_onduleur,
+    type_toiture,
+):
+    """
+    Recherche de la puissance optimale sans grille fixe.
+
+    Coût par kWc, prime et tarif d'injection sont constants entre deux
+    paliers : sur chaque segment, le score ne dépend que de
+    l'autoconsommation (concave en p). Chaque segment est exploré par une
+    section dorée sur la grille de précision ; la meilleure puissance
+    tous segments confondus est retenue.
+
+    Returns:
+        dict avec puissance_optimale, all_configs (puissances évaluées),
+        best_config, evaluations
+    """
+    prod_1kwc_annuelle = float(prod_1kwc.sum())
+    evaluations = {}
+
+    def score(p):
+        p = round(round(p / precision) * precision, 6)
+        if p not in evaluations:
+            scores, configs = _evaluer_puissances(
+                [p], prod_1kwc_annuelle, index, consommation_annuelle,
+                (objectif,), type_onduleur, type_toiture
+            )[objectif]
+            evaluations[p] = (float(scores[0]), configs[0])
+        return evaluations[p][0]
+
+    # Discontinuité du score 'autonomie' : découper aussi au seuil de 25%
+    seuils = []
+    if objectif == 'autonomie':
+        seuil = _seuil_autoconso(
+            index, prod_1kwc_annuelle, min_power, max_power, SEUIL_AUTOCONSO_AUTONOMIE_PCT
+        )
+        if seuil is not None:
+            seuils.append(seuil)
+
+    segments = _segments_tarifaires(min_power, max_power, precision, seuils)
+
+    for bas, haut in segments:
+        score(bas)
+        score(haut)
+        x1 = haut - _RATIO_OR * (haut - bas)
+        x2 = bas + _RATIO_OR * (haut - bas)
+        while haut - bas > 2 * precision:
+            if score(x1) >= score(x2):
+                haut, x2 = x2, x1
+                x1 = haut - _RATIO_OR * (haut - bas)
+            else:
+                bas, x1 = x1, x2
+                x2 = bas + _RATIO_OR * (haut - bas)
+        # Points restants de l'encadrement final
+        for p in np.arange(bas, haut + precision / 2, precision):
+            score(p)
+
+    all_configs = [evaluations[p][1] for p in sorted(evaluations)]
+    # Premier meilleur score par puissance croissante (comme le mode grille)
+    best_config = max(all_configs, key=lambda c: evaluations[c['puissance_kwc']][0])
+
+    logger.info(
+        f"🎯 Recherche continue ({objectif}) : {len(segments)} segments, "
+        f"{len(evaluations)} évaluations → {best_config['puissance_kwc']} kWc"
+    )
+
+    return {
+        'puissance_optimale': best_config['puissance_kwc'],
+        'all_configs': all_configs,
+        'best_config': best_config,
+        'evaluations': len(evaluations),
+    }
+
+
+# ==============================================================================
+# OPTIMISEUR DE CONFIGURATION
+# ==============================================================================
+
+def optimize_power(
+    production_1kwc,
+    consommation_horaire,
+    consommation_annuelle,
+    objectif='rentabilite',
+    min_power=0.5,
+    max_power=12.0,
+    step=0.5,
+    type_onduleur='string',
+    type_toiture='tuiles',
+    recherche='grille',
+    precision=0.1,
+):
+    """
+    Optimise la puissance en testant plusieurs configurations
+    avec le vrai profil horaire heure par heure.
+
+    Args:
+        production_1kwc: Production horaire pour 1 kWc (8760 valeurs)
+        consommation_horaire: Consommation horaire (8760 valeurs)
+        consommation_annuelle: Consommation annuelle totale (kWh)
+        objectif: 'rentabilite', 'autonomie', 'equilibre', 'revente'
+        min_power/max_power: Plage de puissances à tester (kWc)
+        step: Pas de test (kWc)
+        recherche: 'grille' (toutes les puissances au pas `step`) ou
+            'continue' (segments tarifaires + section dorée, au pas
+            `precision` ; la vente totale reste en mode grille)
+        precision: Résolution de la recherche continue (kWc)
+
+    Returns:
+        dict avec puissance_optimale, all_configs, best_config
+        (+ evaluations en recherche continue)
+
+    Example:
+        >>> res = optimize_power(prod_1kwc, conso, 4500, max_power=500, recherche='continue')
+        >>> res['evaluations']
+        62
+    """
+    prod_1kwc = production_1kwc.values if hasattr(production_1kwc, 'values') else production_1kwc
+    prod_1kwc = np.asarray(prod_1kwc, dtype=np.float64)
+
+    # ── Ajustement plage pour vente totale (min 9 kWc) ──
+    if objectif == 'revente':
+        min_power = max(min_power, 9.0)
+        # max_power déjà calculé depuis la surface dans la tâche principale
+        logger.info(f"💰 Mode VENTE TOTALE — plage ajustée: {min_power} → {max_power} kWc")
+
+    index = None if objectif == 'revente' else AutoconsumptionIndex(prod_1kwc, consommation_horaire)
+
+    if recherche == 'continue' and objectif != 'revente':
+        return _optimize_power_continu(
+            prod_1kwc, index, consommation_annuelle, objectif,
+            min_power, max_power, precision, type_onduleur, type_toiture
+        )
+
+    puissances = np.round(np.arange(min_power, max_power + step / 2, step), 1)
+
+    logger.info(f"\n{'='*80}")
+    logger.info(f"🔍 OPTIMISATION MULTI-PUISSANCE ({objectif.upper()})")
+    logger.info(f"   Plage: {min_power} → {max_power} kWc (pas {step})")
+    logger.info(f"   {len(puissances)} configurations à tester")
+    logger.info(f"{'='*80}")
+
+    scores, all_configs = _evaluer_puissances(
+        puissances, float(prod_1kwc.sum()), index, consommation_annuelle,
+        (objectif,), type_onduleur, type_toiture
+    )[objectif]
+
+    # Premier meilleur score (comme la comparaison stricte de la boucle historique)
+    best_config = all_configs[int(np.argmax(scores))]
+
+    _log_configurations(objectif, all_configs, best_config)
+
+    return {
+        'puissance_optimale': best_config['puissance_kwc'],
+        'all_configs': all_configs,
+        'best_config': best_config,
+    }
+
+
+def _log_configurations(objectif, all_configs, best_config):
+    """Logs du tableau récapitulatif et de la configuration retenue."""
+    if objectif == 'revente':
+        logger.info(f"\n{'─'*100}")
+        logger.info(
+            f"{'kWc':>5} │ {'Prod kWh':>9} │ {'Tarif €':>8} │ "
+            f"{'Revenu/an':>10} │ {'Coût':>8} │ "
+            f"{'ROI ans':>8} │ {'Bénéf 20a':>10} │ {'Score':>7}"
+        )
+        logger.info(f"{'─'*100}")
+
+        for c in all_configs:
+            marker = " ◀ OPTIMAL" if c['puissance_kwc'] == best_config['puissance_kwc'] else ""
+            logger.info(
+                f"{c['puissance_kwc']:>5.1f} │ {c['production_annuelle']:>9.0f} │ "
+                f"{c.get('tarif_vente_totale', 0):>7.4f}€ │ "
+                f"{c.get('revenu_vente_annuel', 0):>9.0f}€ │ {c['cout_net']:>7.0f}€ │ "
+                f"{c['roi_annees']:>7.1f} │ {c.get('benefice_20ans', 0):>9.0f}€ │ "
+                f"{c['score']:>7.4f}{marker}"
+            )
+    else:
+        logger.info(f"\n{'─'*105}")
+        logger.info(
+            f"{'kWc':>5} │ {'Prod kWh':>9} │ {'AutoC kWh':>10} │ "
+            f"{'AutoC %':>8} │ {'AutoP %':>8} │ {'Éco €/an':>9} │ "
+            f"{'ROI ans':>8} │ {'Score':>7}"
+        )
+        logger.info(f"{'─'*105}")
+
+        for c in all_configs:
+            marker = " ◀ OPTIMAL" if c['puissance_kwc'] == best_config['puissance_kwc'] else ""
+            logger.info(
+                f"{c['puissance_kwc']:>5.1f} │ {c['production_annuelle']:>9.0f} │ "
+                f"{c['autoconso_kwh']:>10.0f} │ {c['autoconso_ratio']:>7.1f}% │ "
+                f"{c['autoprod_ratio']:>7.1f}% │ {c['economie_annuelle']:>8.0f}€ │ "
+                f"{c['roi_annees']:>7.1f} │ {c['score']:>7.4f}{marker}"
+            )
+
+    logger.info(f"{'─'*105}")
+    logger.info(f"✅ PUISSANCE OPTIMALE ({objectif}): {best_config['puissance_kwc']} kWc")
+    logger.info(f"   → Production: {best_config['production_annuelle']:.0f} kWh/an")
+    if objectif == 'revente':
+        logger.info(f"   → Revenu vente: {best_config.get('revenu_vente_annuel', 0):.0f} €/an")
+        logger.info(f"   → Bénéfice 20 ans: {best_config.get('benefice_20ans', 0):.0f} €")
+    else:
+        logger.info(f"   → Autoconsommation: {best_config['autoconso_ratio']:.1f}%")
+        logger.info(f"   → Autoproduction: {best_config['autoprod_ratio']:.1f}%")
+    logger.info(f"   → ROI: {best_config['roi_annees']:.1f} ans")
+    logger.info(f"   → Économies: {best_config['economie_annuelle']:.0f} €/an")
+    logger.info(f"{'='*80}\n")
+
+
+# ==============================================================================
+# TOUS LES OBJECTIFS EN UN PASSAGE
+# ==============================================================================
+
+# Objectifs partageant la même table de métriques (seul le score diffère)
+OBJECTIFS_AUTOCONSOMMATION = ('rentabilite', 'autonomie', 'equilibre')
+
+# Puissance minimale d'éligibilité à la vente totale (kWc)
+PUISSANCE_MIN_VENTE_TOTALE = 9.0
+
+
+def optimize_power_all_objectives(
+    production_1kwc,
+    consommation_horaire,
+    consommation_annuelle,
+    min_power=0.5,
+    max_power=12.0,
+    step=0.5,
+    type_onduleur='string',
+    type_toiture='tuiles',
+):
+    """
+    Optimise la puissance pour tous les objectifs en un seul passage.
+
+    La table des métriques (autoconsommation, coûts, ROI...) est calculée
+    une fois pour 'rentabilite', 'autonomie' et 'equilibre', puis scorée
+    pour chacun. 'revente' est ajouté si la plage atteint le seuil
+    d'éligibilité de la vente totale (9 kWc).
+
+    Args:
+        Mêmes paramètres que optimize_power (sans objectif)
+
+    Returns:
+        dict: {objectif: résultat au format optimize_power}
+
+    Example:
+        >>> optima = optimize_power_all_objectives(prod_1kwc, conso, 4500)
+        >>> optima['autonomie']['puissance_optimale'], optima['rentabilite']['puissance_optimale']
+        (7.5, 3.0)
+    """
+    prod_1kwc = production_1kwc.values if hasattr(production_1kwc, 'values') else production_1kwc
+    prod_1kwc = np.asarray(prod_1kwc, dtype=np.float64)
+    prod_1kwc_annuelle = float(prod_1kwc.sum())
+
+    puissances = np.round(np.arange(min_power, max_power + step / 2, step), 1)
+    evaluations = _evaluer_puissances(
+        puissances, prod_1kwc_annuelle, AutoconsumptionIndex(prod_1kwc, consommation_horaire),
+        consommation_annuelle, OBJECTIFS_AUTOCONSOMMATION, type_onduleur, type_toiture
+    )
+
+    if max_power >= PUISSANCE_MIN_VENTE_TOTALE:
+        puissances_vt = np.round(
+            np.arange(max(min_power, PUISSANCE_MIN_VENTE_TOTALE), max_power + step / 2, step), 1
+        )
+        evaluations.update(_evaluer_puissances(
+            puissances_vt, prod_1kwc_annuelle, None, consommation_annuelle,
+            ('revente',), type_onduleur, type_toiture
+        ))
+
+    resultats = {}
+    for objectif, (scores, all_configs) in evaluations.items():
+        # Premier meilleur score, comme optimize_power
+        best_config = all_configs[int(np.argmax(scores))]
+        resultats[objectif] = {
+            'puissance_optimale': best_config['puissance_kwc'],
+            'all_configs': all_configs,
+            'best_config': best_config,
+        }
+
+    logger.info(
+        "🔍 Optimisation tous objectifs ("
+        + ", ".join(f"{o}: {r['puissance_optimale']} kWc" for o, r in resultats.items())
+        + f") sur {len(puissances)} puissances"
+    )
+
+    return resultats
+
+
+def serialiser_optimisations(resultats):
+    """
+    Forme compacte (JSON) de optimize_power_all_objectives pour Resultat.
+
+    La table commune aux objectifs d'autoconsommation n'est stockée
+    qu'une fois ; chaque objectif ne garde que ses scores et son optimum.
+
+    Returns:
+        dict: {'table': [...], 'objectifs': {objectif: {...}}}
+    """
+    table = None
+    objectifs = {}
+    for objectif, resultat in resultats.items():
+        if objectif in OBJECTIFS_AUTOCONSOMMATION:
+            if table is None:
+                table = [
+                    {cle: valeur for cle, valeur in config.items() if cle != 'score'}
+                    for config in resultat['all_configs']
+                ]
+            objectifs[objectif] = {
+                'puissance_optimale': resultat['puissance_optimale'],
+                'best_config': resultat['best_config'],
+                'scores': [config['score'] for config in resultat['all_configs']],
+            }
+        else:
+            objectifs[objectif] = resultat
+    return {'table': table or [], 'objectifs': objectifs}
+
+
+def restaurer_optimisation(donnees, objectif):
+    """
+    Résultat d'un objectif (format optimize_power) depuis serialiser_optimisations.
+
+    Returns:
+        dict ou None si l'objectif n'a pas été évalué
+    """
+    if not donnees or objectif not in donnees.get('objectifs', {}):
+        return None
+    stocke = donnees['objectifs'][objectif]
+    if 'all_configs' in stocke:
+        return stocke
+    return {
+        'puissance_optimale': stocke['puissance_optimale'],
+        'all_configs': [
+            dict(config, score=score) for config, score in zip(donnees['table'], stocke['scores'])
+        ],
+        'best_config': stocke['best_config'],
+    }
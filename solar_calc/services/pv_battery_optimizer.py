@@ -0,0 +1,285 @@
+"""
+Optimisation conjointe puissance PV × capacité batterie.
+solar_calc/services/pv_battery_optimizer.py
+
+La grille (kWc, kWh) est évaluée en trois temps :
+1. Toutes les puissances sans batterie en un appel vectorisé
+   (calculate_autoconsumption_batch)
+2. Chaque couple (kWc, kWh) reçoit une borne optimiste (coût exact, gain
+   batterie majoré jour par jour) ; les couples déjà dominés par un point
+   sans batterie sont élagués avant toute simulation
+3. Les couples restants sont simulés ensemble dans une seule boucle
+   horaire (simulate_dispatch_batch, une voie par couple)
+
+Le résultat est la frontière de Pareto coût / autonomie / ROI.
+"""
+
+import logging
+from typing import Dict, List
+
+import numpy as np
+
+from battery.services.dispatch import simulate_dispatch_batch
+from battery.services.sizing import (
+    RATIO_CAPACITE_UTILISABLE,
+    RATIO_PUISSANCE_CAPACITE,
+    STANDARD_CAPACITIES,
+)
+from solar_calc.services.hourly_calculator import calculate_autoconsumption_batch
+from solar_calc.services.tarifs import (
+    TARIF_ACHAT_KWH,
+    calculer_cout_installation,
+    get_prime_autoconsommation,
+    get_tarif_injection,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+# ==============================================================================
+# FRONTIÈRE DE PARETO
+# ==============================================================================
+
+def _masque_pareto(cout: np.ndarray, autonomie: np.ndarray, roi: np.ndarray) -> np.ndarray:
+    """
+    Masque des points non dominés (coût ↓, autonomie ↑, ROI ↓).
+
+    Un point est dominé si un autre est au moins aussi bon sur les trois
+    critères et strictement meilleur sur l'un d'eux.
+    """
+    au_moins_aussi_bon = (
+        (cout[:, np.newaxis] <= cout)
+        & (autonomie[:, np.newaxis] >= autonomie)
+        & (roi[:, np.newaxis] <= roi)
+    )
+    strictement_meilleur = (
+        (cout[:, np.newaxis] < cout)
+        | (autonomie[:, np.newaxis] > autonomie)
+        | (roi[:, np.newaxis] < roi)
+    )
+    return ~(au_moins_aussi_bon & strictement_meilleur).any(axis=0)
+
+
+def _domine_par(
+    cout: np.ndarray,
+    autonomie: np.ndarray,
+    roi: np.ndarray,
+    ref_cout: np.ndarray,
+    ref_autonomie: np.ndarray,
+    ref_roi: np.ndarray
+) -> np.ndarray:
+    """Masque des points (N,) dominés par au moins un point de référence (M,)."""
+    au_moins_aussi_bon = (
+        (ref_cout[:, np.newaxis] <= cout)
+        & (ref_autonomie[:, np.newaxis] >= autonomie)
+        & (ref_roi[:, np.newaxis] <= roi)
+    )
+    strictement_meilleur = (
+        (ref_cout[:, np.newaxis] < cout)
+        | (ref_autonomie[:, np.newaxis] > autonomie)
+        | (ref_roi[:, np.newaxis] < roi)
+    )
+    return (au_moins_aussi_bon & strictement_meilleur).any(axis=0)
+
+
+# ==============================================================================
+# BORNE OPTIMISTE DU GAIN BATTERIE
+# ==============================================================================
+
+def _gain_batterie_max(
+    net_kw: np.ndarray,
+    capacites_utilisables_kwh: np.ndarray,
+    puissances_max_kw: np.ndarray
+) -> np.ndarray:
+    """
+    Majore l'énergie restituée par la batterie sur l'année, voie par voie.
+
+    Chaque jour, la décharge est bornée par le déficit accessible (limité
+    par la puissance) et par ce qui peut être stocké : réserve de la veille
+    (≤ capacité utilisable) + surplus du jour. Sur l'année, la décharge ne
+    peut pas non plus dépasser le surplus total + la réserve initiale.
+    Aucune simulation ne peut dépasser cette borne.
+
+    Args:
+        net_kw: Production - consommation par voie (N, 8760)
+        capacites_utilisables_kwh: Capacités utilisables (N,)
+        puissances_max_kw: Puissances max (N,)
+
+    Returns:
+        np.ndarray: Énergie restituée maximale (N,) en kWh
+    """
+    puissance = puissances_max_kw[:, np.newaxis, np.newaxis]
+    net = net_kw.reshape(len(net_kw), 365, 24)
+    surplus_jour = np.minimum(np.maximum(net, 0.0), puissance).sum(axis=2)
+    deficit_jour = np.minimum(np.maximum(-net, 0.0), puissance).sum(axis=2)
+    borne_jour = np.minimum(deficit_jour, surplus_jour + capacites_utilisables_kwh[:, np.newaxis])
+    return np.minimum(borne_jour.sum(axis=1), surplus_jour.sum(axis=1) + capacites_utilisables_kwh)
+
+
+# ==============================================================================
+# OPTIMISEUR CONJOINT
+# ==============================================================================
+
+def optimize_pv_battery(
+    production_1kwc,
+    consommation_horaire,
+    min_power: float = 0.5,
+    max_power: float = 12.0,
+    step: float = 0.5,
+    capacites: List[float] = None,
+    type_onduleur: str = 'string',
+    type_toiture: str = 'tuiles',
+    marque: str = 'standard',
+) -> Dict:
+    """
+    Cherche les couples (kWc, kWh) non dominés en coût, autonomie et ROI.
+
+    Args:
+        production_1kwc: Production horaire pour 1 kWc (8760 valeurs)
+        consommation_horaire: Consommation horaire (8760 valeurs)
+        min_power/max_power: Plage de puissances à tester (kWc)
+        step: Pas de test (kWc)
+        capacites: Capacités nominales testées (kWh), défaut STANDARD_CAPACITIES
+        type_onduleur: Type d'onduleur (surcoût installation)
+        type_toiture: Type de toiture (surcoût installation)
+        marque: Gamme de batterie ('economique', 'standard', 'premium')
+
+    Returns:
+        dict avec 'frontiere' (configurations non dominées, par coût
+        croissant), 'meilleure_rentabilite', 'meilleure_autonomie',
+        'nb_configurations', 'nb_simulees', 'nb_elaguees'
+
+    Example:
+        >>> res = optimize_pv_battery(prod_1kwc, conso, max_power=9.0)
+        >>> [(c['puissance_kwc'], c['capacite_batterie_kwh']) for c in res['frontiere']][:3]
+        [(0.5, 0), (1.0, 0), (1.5, 0)]
+    """
+    from battery.pricing import BATTERY_PRICING_2025, get_battery_price
+
+    prod_1kwc = np.asarray(
+        production_1kwc.values if hasattr(production_1kwc, 'values') else production_1kwc,
+        dtype=np.float64
+    )
+    consommation = np.asarray(
+        consommation_horaire.values if hasattr(consommation_horaire, 'values') else consommation_horaire,
+        dtype=np.float64
+    )
+    consommation_annuelle = float(consommation.sum())
+    if consommation_annuelle <= 0:
+        raise ValueError("Consommation horaire nulle : optimisation impossible")
+
+    if capacites is None:
+        capacites = STANDARD_CAPACITIES
+    capacites = np.asarray(sorted({float(c) for c in capacites if c > 0}), dtype=np.float64)
+    puissances = np.round(np.arange(min_power, max_power + step / 2, step), 1)
+
+    caracteristiques = BATTERY_PRICING_2025['caracteristiques'][marque]
+
+    # ===== 1. SANS BATTERIE : TOUTES LES PUISSANCES EN UN APPEL =====
+    pv = calculate_autoconsumption_batch(prod_1kwc, consommation, puissances_kwc=puissances)
+
+    cout_brut = np.array([
+        calculer_cout_installation(float(p), type_onduleur, type_toiture)['cout_total'] for p in puissances
+    ])
+    prime = np.array([get_prime_autoconsommation(float(p)) for p in puissances])
+    tarif_injection = np.array([get_tarif_injection(float(p)) for p in puissances])
+    cout_pv = cout_brut - prime
+    cout_batterie = np.array([get_battery_price(float(c), marque)['prix_total_ttc'] for c in capacites])
+
+    def economie(autoconso, injection, indice_p):
+        return autoconso * TARIF_ACHAT_KWH + injection * tarif_injection[indice_p]
+
+    def roi(cout, eco):
+        return np.where(eco > 0, cout / np.where(eco > 0, eco, 1.0), 999.0)
+
+    eco_pv = economie(pv.autoconsommation_kwh, pv.injection_reseau_kwh, np.arange(len(puissances)))
+    roi_pv = roi(cout_pv, eco_pv)
+    autonomie_pv = pv.autoconsommation_kwh / consommation_annuelle * 100
+
+    # ===== 2. ÉLAGAGE DES COUPLES (kWc, kWh) DOMINÉS D'AVANCE =====
+    idx_p, idx_c = (grille.ravel() for grille in np.meshgrid(
+        np.arange(len(puissances)), np.arange(len(capacites)), indexing='ij'
+    ))
+    utilisables = capacites[idx_c] * RATIO_CAPACITE_UTILISABLE
+    puissances_max = capacites[idx_c] * RATIO_PUISSANCE_CAPACITE
+
+    net = prod_1kwc * puissances[idx_p, np.newaxis] - consommation
+    gain_max = _gain_batterie_max(net, utilisables, puissances_max)
+
+    cout_couple = cout_pv[idx_p] + cout_batterie[idx_c]
+    autonomie_max = autonomie_pv[idx_p] + gain_max / consommation_annuelle * 100
+    roi_min = roi(cout_couple, eco_pv[idx_p] + gain_max * TARIF_ACHAT_KWH)
+
+    a_simuler = (gain_max > 0) & ~_domine_par(
+        cout_couple, autonomie_max, roi_min, cout_pv, autonomie_pv, roi_pv
+    )
+    idx_p, idx_c = idx_p[a_simuler], idx_c[a_simuler]
+
+    # ===== 3. SIMULATION DES COUPLES RESTANTS (une voie par couple) =====
+    if len(idx_p):
+        batch = simulate_dispatch_batch(
+            prod_1kwc * puissances[idx_p, np.newaxis],
+            consommation,
+            utilisables[a_simuler],
+            puissances_max_kw=puissances_max[a_simuler],
+            efficacites=caracteristiques['efficacite'],
+            dod_max=caracteristiques['dod_max']
+        )
+        autoconso_bat = batch.autoconso_total_kwh
+        injection_bat = batch.surplus_total_kwh
+    else:
+        autoconso_bat = injection_bat = np.zeros(0)
+
+    # ===== 4. FRONTIÈRE DE PARETO =====
+    tous_p = np.concatenate([np.arange(len(puissances)), idx_p])
+    tous_c = np.concatenate([np.full(len(puissances), -1), idx_c])
+    autoconso = np.concatenate([pv.autoconsommation_kwh, autoconso_bat])
+    injection = np.concatenate([pv.injection_reseau_kwh, injection_bat])
+
+    cout_bat_points = np.where(tous_c >= 0, cout_batterie[tous_c], 0.0)
+    cout_total = cout_pv[tous_p] + cout_bat_points
+    eco = economie(autoconso, injection, tous_p)
+    roi_points = roi(cout_total, eco)
+    autonomie = autoconso / consommation_annuelle * 100
+
+    frontiere = np.flatnonzero(_masque_pareto(cout_total, autonomie, roi_points))
+    frontiere = frontiere[np.lexsort((-autonomie[frontiere], cout_total[frontiere]))]
+
+    def config(i):
+        p = int(tous_p[i])
+        production = float(pv.production_annuelle_kwh[p])
+        return {
+            'puissance_kwc': float(puissances[p]),
+            'capacite_batterie_kwh': float(capacites[tous_c[i]]) if tous_c[i] >= 0 else 0,
+            'production_annuelle': round(production, 0),
+            'autoconso_kwh': round(float(autoconso[i]), 0),
+            'autoconso_ratio': round(float(autoconso[i]) / production * 100, 1) if production > 0 else 0,
+            'autoprod_ratio': round(float(autonomie[i]), 1),
+            'injection_kwh': round(float(injection[i]), 0),
+            'economie_annuelle': round(float(eco[i]), 0),
+            'cout_brut': round(float(cout_brut[p]), 0),
+            'prime': round(float(prime[p]), 0),
+            'cout_net': round(float(cout_pv[p]), 0),
+            'cout_batterie': round(float(cout_bat_points[i]), 0),
+            'cout_total': round(float(cout_total[i]), 0),
+            'roi_annees': round(float(roi_points[i]), 1),
+            'eco_25ans': round(float(eco[i]) * 25 - float(cout_total[i]), 0),
+        }
+
+    nb_configurations = len(puissances) * (len(capacites) + 1)
+    nb_simulees = len(idx_p)
+
+    logger.info(
+        f"🔋☀️ Optimisation PV × batterie : {nb_configurations} configurations, "
+        f"{nb_simulees} simulées, {len(frontiere)} sur la frontière"
+    )
+
+    return {
+        'frontiere': [config(i) for i in frontiere],
+        'meilleure_rentabilite': config(int(np.argmin(roi_points))),
+        'meilleure_autonomie': config(int(np.lexsort((cout_total, -autonomie))[0])),
+        'nb_configurations': nb_configurations,
+        'nb_simulees': nb_simulees,
+        'nb_elaguees': nb_configurations - len(puissances) - nb_simulees,
+    }
@@ -14,6 +14,7 @@ from datetime import datetime
 import logging
 from ..dataclasses.consumption import ConsumptionProfile, SystemeChauffage, SystemeECS
 from ..dataclasses.production import SolarInstallation, CaracteristiquesPanneau, ConfigurationOnduleur, DonneesGeographiques, TechnologiePanneau, TypeOnduleur
+from ..tmy_calendar import HEURES_PAR_AN, index_temporel
 
 logger = logging.getLogger(__name__)
 
@@ -208,49 +209,30 @@ class SimulationService:
                 - taux_autoproduction_pct
                 - donnees_horaires (DataFrame complet)
         """
-        # Normaliser les timestamps pour assurer la correspondance
-        # Les données PVGIS et de consommation peuvent avoir des années différentes
-        # On les force toutes à la même année de référence (2016)
-        production_copy = production_horaire.copy()
-        production_copy['timestamp'] = pd.date_range(
-            start='2016-01-01',
-            periods=len(production_copy),
-            freq='h'
-        )
-        
-        consommation_copy = consommation_horaire.copy()
-        consommation_copy['timestamp'] = pd.date_range(
-            start='2016-01-01',
-            periods=len(consommation_copy),
-            freq='h'
-        )
-        
-        # Fusionner les deux DataFrames sur le timestamp
-        df = pd.merge(
-            production_copy[['timestamp', 'puissance_ac_kw']],
-            consommation_copy[['timestamp', 'consommation_kw']],
-            on='timestamp',
-            how='inner'
-        )
+        # Aligner production et consommation par position horaire : les données
+        # PVGIS et de consommation peuvent avoir des années différentes, on les
+        # ramène toutes à la même année de référence (2016)
+        nb_heures = min(len(production_horaire), len(consommation_horaire))
+        production = production_horaire['puissance_ac_kw'].to_numpy(dtype=np.float64)[:nb_heures]
+        consommation = consommation_horaire['consommation_kw'].to_numpy(dtype=np.float64)[:nb_heures]
+        
+        if nb_heures == HEURES_PAR_AN:
+            timestamps = index_temporel(2016)
+        else:
+            timestamps = pd.date_range(start='2016-01-01', periods=nb_heures, freq='h')
         
-        # Calculer les flux énergétiques heure par heure
+        # Calculer les flux énergétiques heure par heure (vectorisé)
         # Autoconsommation = minimum entre production et consommation
-        df['autoconso_kw'] = df.apply(
-            lambda row: min(row['puissance_ac_kw'], row['consommation_kw']),
-            axis=1
-        )
-        
-        # Injection = surplus de production
-        df['injection_kw'] = df.apply(
-            lambda row: max(0, row['puissance_ac_kw'] - row['consommation_kw']),
-            axis=1
-        )
+        autoconso = np.minimum(production, consommation)
         
-        # Achat = déficit de production
-        df['achat_kw'] = df.apply(
-            lambda row: max(0, row['consommation_kw'] - row['puissance_ac_kw']),
-            axis=1
-        )
+        df = pd.DataFrame({
+            'timestamp': timestamps,
+            'puissance_ac_kw': production,
+            'consommation_kw': consommation,
+            'autoconso_kw': autoconso,
+            'injection_kw': production - autoconso,   # Surplus de production
+            'achat_kw': consommation - autoconso,     # Déficit de production
+        })
         
         # Calculer les totaux annuels
         production_totale = df['puissance_ac_kw'].sum()
@@ -290,7 +272,9 @@ class SimulationService:
         use_real_weather: bool = True,
         irradiation_annuelle_fallback: float = None,
         with_battery: bool = False,
-        battery_capacity: float = None
+        battery_capacity: float = None,
+        rng: np.random.Generator = None,
+        simulation=None
     ) -> dict:
         """
         Exécute une simulation complète de l'installation solaire.
@@ -310,6 +294,8 @@ class SimulationService:
             irradiation_annuelle_fallback: Irradiation de secours si PVGIS échoue
             with_battery: Active la simulation avec batterie
             battery_capacity: Capacité de la batterie en kWh
+            rng: Générateur aléatoire de la simulation (profil de consommation)
+            simulation: Simulation Django ; son générateur (get_rng) est utilisé si rng est absent
             
         Returns:
             ict: Résultats avec métriques annuelles
@@ -353,8 +339,10 @@ class SimulationService:
         # Simuler la production solaire
         production_horaire = installation.simuler_annee(donnees_meteo)
         
-        # Générer le profil de consommation
-        consommation_horaire = profil_conso.generer_profil_horaire()
+        # Générer le profil de consommation (tirages reproductibles par simulation)
+        if rng is None and simulation is not None:
+            rng = simulation.get_rng()
+        consommation_horaire = profil_conso.generer_profil_horaire(rng=rng)
         
         # Calculer l'autoconsommation
         resultats_autoconso = self.calculer_autoconsommation(
@@ -385,6 +373,7 @@ class SimulationService:
         if with_battery:
             from battery.services.battery_simulation import BatterySimulationService
             from battery.models import BatterySystem
+            from battery.services.sizing import STANDARD_CAPACITIES, get_sizing_recommendations
             
             # Créer ou récupérer le système de batterie
             battery, created = BatterySystem.objects.get_or_create(
@@ -419,11 +408,25 @@ class SimulationService:
             battery.roi_annees = financial['roi_annees']
             battery.save()
             
+            # Comparer les capacités standards sur les flux horaires réels,
+            # avec l'optimum continu (optimize_battery_capacity)
+            donnees_horaires = resultats_autoconso['donnees_horaires']
+            recommandations = get_sizing_recommendations(
+                resultats_autoconso['production_annuelle_kwh'],
+                resultats_autoconso['consommation_annuelle_kwh'],
+                getattr(django_profile, 'profile_type', 'actif_absent'),
+                capacites=STANDARD_CAPACITIES,
+                production_horaire_kw=donnees_horaires['puissance_ac_kw'].to_numpy(),
+                consommation_horaire_kw=donnees_horaires['consommation_kw'].to_numpy()
+            )
+
             # Ajouter les résultats de la batterie
             resultats['battery'] = {
                 **battery_result,
                 'financial': financial,
-                'system': battery
+                'system': battery,
+                'comparaison': recommandations['comparaison_complete'],
+                'recommandations': recommandations
             }
             
             logger.info(
@@ -441,7 +444,9 @@ def run_simulation_from_django_objects(
     django_installation,
     django_profile,
     use_real_weather: bool = True,
-    irradiation_annuelle_fallback: float = None
+    irradiation_annuelle_fallback: float = None,
+    rng: np.random.Generator = None,
+    simulation=None
 ) -> dict:
     """
     Fonction helper pour exécuter une simulation depuis des objets Django.
@@ -451,6 +456,8 @@ def run_simulation_from_django_objects(
         django_profile: Modèle Django ConsumptionProfileModel
         use_real_weather: Utiliser les données PVGIS (True) ou simplifiées (False)
         irradiation_annuelle_fallback: Irradiation de secours en kWh/m²/an
+        rng: Générateur aléatoire de la simulation (profil de consommation)
+        simulation: Simulation Django dont la graine fixe le profil (si rng est absent)
         
     Returns:
         dict: Résultats de la simulation
@@ -467,5 +474,7 @@ def run_simulation_from_django_objects(
         django_installation,
         django_profile,
         use_real_weather=use_real_weather,
-        irradiation_annuelle_fallback=irradiation_annuelle_fallback
+        irradiation_annuelle_fallback=irradiation_annuelle_fallback,
+        rng=rng,
+        simulation=simulation
     )
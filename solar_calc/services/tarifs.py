@@ -0,0 +1,215 @@
+"""
+Tarifs et coûts d'une installation photovoltaïque (CRE Q1 2026).
+
+Grilles partagées par la tâche de simulation et les optimiseurs de
+configuration (puissance PV, couple PV + batterie).
+
+App Django: solar_calc
+"""
+
+import bisect
+import hashlib
+import math
+from functools import lru_cache
+
+import numpy as np
+
+
+# ==============================================================================
+# TARIFS & CONSTANTES FINANCIÈRES (CRE Q1 2026)
+# ==============================================================================
+
+TARIF_ACHAT_KWH = 0.1940  # €/kWh TTC - Tarif réglementé Base EDF
+
+# Chaque grille est définie une seule fois : bornes hautes des paliers
+# (kWc, incluses, croissantes) puis une valeur par palier, la dernière
+# s'appliquant au-delà de la dernière borne. Les versions scalaires et
+# vectorielles ci-dessous lisent toutes ces tables.
+
+# Coût par kWc, grille dégressive (prix marché France 2025-2026)
+GRILLE_COUT_INSTALLATION_KWC = (
+    (3, 6, 9, 12, 36),
+    (2200, 1900, 1700, 1500, 1400, 1300),
+)
+
+# Tarif injection surplus EDF OA en €/kWh (Arrêté S21 - T1 2026)
+GRILLE_TARIF_INJECTION = (
+    (9, 100),
+    (0.04, 0.0617, 0.0536),
+)
+
+# Tarif vente totale EDF OA en €/kWh (CRE Q1 2026) : non éligible sous
+# 9 kWc (borne exclue, d'où le flottant juste inférieur) ni au-delà de 100 kWc
+GRILLE_TARIF_VENTE_TOTALE = (
+    (math.nextafter(9.0, 0.0), 36, 100),
+    (0, 0.0911, 0.0792, 0),
+)
+
+# Prime à l'autoconsommation en €/kWc (CRE Q1 2026) : Pa 0.08 €/Wc,
+# Pb 0.14 puis 0.07 €/Wc.
+# ⚠️ CORRIGÉ : anciennes valeurs 370/280/200/100 remplacées par 80/80/140/70 €/kWc.
+GRILLE_PRIME_AUTOCONSOMMATION_KWC = (
+    (9, 36, 100),
+    (80, 140, 70, 0),
+)
+
+# Surcoûts par kWc (base = onduleur string, tuiles)
+SURCOUTS_ONDULEUR_KWC = {'string': 0, 'optimiseurs': 100, 'micro': 200}
+SURCOUTS_TOITURE_KWC = {'tuiles': 0, 'ardoise': 80, 'zinc': 60, 'tole': -80, 'beton': 150}
+
+_GRILLES_PAR_PUISSANCE = (
+    GRILLE_COUT_INSTALLATION_KWC,
+    GRILLE_TARIF_INJECTION,
+    GRILLE_TARIF_VENTE_TOTALE,
+    GRILLE_PRIME_AUTOCONSOMMATION_KWC,
+)
+
+# Puissances (kWc) où une grille change de palier : coût/kWc, tarif
+# d'injection, prime, vente totale. Entre deux paliers, tout est linéaire en p.
+PALIERS_TARIFAIRES_KWC = tuple(sorted({
+    round(borne, 6) for bornes, _ in _GRILLES_PAR_PUISSANCE for borne in bornes
+}))
+
+
+def _valeur_palier(grille, puissance_kwc):
+    """Valeur du palier contenant une puissance (borne haute incluse)."""
+    bornes, valeurs = grille
+    return valeurs[bisect.bisect_left(bornes, puissance_kwc)]
+
+
+def _valeurs_paliers(grille, puissances_kwc):
+    """Valeurs des paliers pour un tableau de puissances (même règle que _valeur_palier)."""
+    bornes, valeurs = grille
+    indices = np.searchsorted(bornes, np.asarray(puissances_kwc, dtype=np.float64), side='left')
+    return np.asarray(valeurs, dtype=np.float64)[indices]
+
+
+# ==============================================================================
+# COÛT INSTALLATION (grille dégressive + surcoûts)
+# ==============================================================================
+
+def get_cout_installation_kwc(puissance_kwc):
+    """Coût par kWc selon la puissance (grille dégressive, prix marché France 2025-2026)."""
+    return _valeur_palier(GRILLE_COUT_INSTALLATION_KWC, puissance_kwc)
+
+
+def get_surcout_onduleur(type_onduleur):
+    """Surcoût par kWc selon le type d'onduleur (base = string inclus)."""
+    return SURCOUTS_ONDULEUR_KWC.get(type_onduleur, 0)
+
+
+def get_surcout_toiture(type_toiture):
+    """Surcoût par kWc selon le type de couverture (base = tuiles)."""
+    return SURCOUTS_TOITURE_KWC.get(type_toiture, 0)
+
+
+def calculer_cout_installation(puissance_kwc, type_onduleur='string', type_toiture='tuiles'):
+    """
+    Calcule le coût total estimé de l'installation.
+
+    Returns:
+        dict: cout_kwc, cout_total, detail des composantes
+    """
+    cout_base = get_cout_installation_kwc(puissance_kwc)
+    surcout_ond = get_surcout_onduleur(type_onduleur)
+    surcout_toit = get_surcout_toiture(type_toiture)
+
+    cout_kwc = cout_base + surcout_ond + surcout_toit
+    cout_total = cout_kwc * puissance_kwc
+
+    return {
+        'cout_kwc': cout_kwc,
+        'cout_total': round(cout_total, 0),
+        'detail': {
+            'base_kwc': cout_base,
+            'surcout_onduleur': surcout_ond,
+            'surcout_toiture': surcout_toit,
+        }
+    }
+
+
+def get_tarif_injection(puissance_kwc):
+    """Tarif injection surplus EDF OA selon puissance (Arrêté S21 - T1 2026)."""
+    return _valeur_palier(GRILLE_TARIF_INJECTION, puissance_kwc)
+
+
+def get_tarif_vente_totale(puissance_kwc):
+    """
+    Tarif de rachat en vente totale EDF OA (CRE Q1 2026).
+    Minimum 9 kWc pour être éligible.
+
+    Returns:
+        float: Tarif en €/kWh, ou 0 si non éligible
+    """
+    return _valeur_palier(GRILLE_TARIF_VENTE_TOTALE, puissance_kwc)
+
+
+def get_prime_autoconsommation(puissance_kwc):
+    """
+    Prime à l'autoconsommation selon puissance (CRE Q1 2026).
+    Source : Open Data CRE, arrêté tarifaire en vigueur.
+    """
+    return _valeur_palier(GRILLE_PRIME_AUTOCONSOMMATION_KWC, puissance_kwc) * puissance_kwc
+
+
+# ==============================================================================
+# VERSIONS VECTORIELLES (une valeur par puissance candidate)
+# ==============================================================================
+
+def get_cout_installation_kwc_array(puissances_kwc):
+    """Coût par kWc pour un tableau de puissances (même grille que get_cout_installation_kwc)."""
+    return _valeurs_paliers(GRILLE_COUT_INSTALLATION_KWC, puissances_kwc)
+
+
+def calculer_cout_installation_array(puissances_kwc, type_onduleur='string', type_toiture='tuiles'):
+    """Coût total arrondi à l'euro pour un tableau de puissances (cf. calculer_cout_installation)."""
+    p = np.asarray(puissances_kwc, dtype=np.float64)
+    cout_kwc = (
+        get_cout_installation_kwc_array(p)
+        + get_surcout_onduleur(type_onduleur)
+        + get_surcout_toiture(type_toiture)
+    )
+    return np.round(cout_kwc * p, 0)
+
+
+def get_tarif_injection_array(puissances_kwc):
+    """Tarif injection surplus pour un tableau de puissances."""
+    return _valeurs_paliers(GRILLE_TARIF_INJECTION, puissances_kwc)
+
+
+def get_tarif_vente_totale_array(puissances_kwc):
+    """Tarif vente totale pour un tableau de puissances (0 si non éligible)."""
+    return _valeurs_paliers(GRILLE_TARIF_VENTE_TOTALE, puissances_kwc)
+
+
+def get_prime_autoconsommation_array(puissances_kwc):
+    """Prime à l'autoconsommation pour un tableau de puissances."""
+    p = np.asarray(puissances_kwc, dtype=np.float64)
+    return _valeurs_paliers(GRILLE_PRIME_AUTOCONSOMMATION_KWC, p) * p
+
+
+# ==============================================================================
+# VERSION DES GRILLES (clé des caches de résultats)
+# ==============================================================================
+
+@lru_cache(maxsize=1)
+def version_grilles_tarifaires():
+    """
+    Empreinte des grilles de coûts, surcoûts, tarifs et primes.
+
+    Calculée sur les tables elles-mêmes : toute modification d'une valeur
+    ou d'une borne change la version, sans numéro à incrémenter à la main.
+
+    Returns:
+        str: Empreinte hexadécimale (16 caractères)
+    """
+    grilles = (
+        TARIF_ACHAT_KWH,
+        GRILLE_COUT_INSTALLATION_KWC,
+        GRILLE_TARIF_INJECTION,
+        GRILLE_TARIF_VENTE_TOTALE,
+        GRILLE_PRIME_AUTOCONSOMMATION_KWC,
+        sorted(SURCOUTS_ONDULEUR_KWC.items()),
+        sorted(SURCOUTS_TOITURE_KWC.items()),
+    )
+    return hashlib.blake2b(repr(grilles).encode(), digest_size=8).hexdigest()
@@ -7,337 +7,39 @@ from frontend.models import Simulation, Resultat
 from weather.services.pvgis import get_pvgis_weather_data
 from solar_calc.services.consumption_profiles import ConsumptionProfiles
 from solar_calc.consumption_decomposer import decompose_consumption, get_decomposition_summary
-from solar_calc.hourly_pattern_generator import generate_personalized_hourly_profile
+from solar_calc.hourly_pattern_generator import generate_dual_hourly_profiles
+from solar_calc.services.hourly_calculator import calculate_autoconsumption_batch
+from solar_calc.services.optimizer_cache import optimize_power_all_objectives_cached
+from solar_calc.services.power_optimizer import optimize_power, serialiser_optimisations
+from solar_calc.tmy_calendar import moyenne_horaire, somme_mensuelle
+from solar_calc.services.tarifs import (
+    TARIF_ACHAT_KWH,
+    calculer_cout_installation,
+    get_cout_installation_kwc,
+    get_prime_autoconsommation,
+    get_surcout_onduleur,
+    get_surcout_toiture,
+    get_tarif_injection,
+    get_tarif_vente_totale,
+)
 
 
 logger = logging.getLogger(__name__)
 
-
-# ==============================================================================
-# TARIFS & CONSTANTES FINANCIÈRES (CRE Q1 2026)
-# ==============================================================================
-
-TARIF_ACHAT_KWH = 0.1940  # €/kWh TTC - Tarif réglementé Base EDF
-
-
-# ==============================================================================
-# COÛT INSTALLATION (grille dégressive + surcoûts)
-# ==============================================================================
-
-def get_cout_installation_kwc(puissance_kwc):
-    """Coût par kWc selon la puissance (grille dégressive, prix marché France 2025-2026)."""
-    if puissance_kwc <= 3:
-        return 2200
-    elif puissance_kwc <= 6:
-        return 1900
-    elif puissance_kwc <= 9:
-        return 1700
-    elif puissance_kwc <= 12:
-        return 1500
-    elif puissance_kwc <= 36:
-        return 1400
-    else:
-        return 1300
-
-
-def get_surcout_onduleur(type_onduleur):
-    """Surcoût par kWc selon le type d'onduleur (base = string inclus)."""
-    return {'string': 0, 'optimiseurs': 100, 'micro': 200}.get(type_onduleur, 0)
-
-
-def get_surcout_toiture(type_toiture):
-    """Surcoût par kWc selon le type de couverture (base = tuiles)."""
-    return {'tuiles': 0, 'ardoise': 80, 'zinc': 60, 'tole': -80, 'beton': 150}.get(type_toiture, 0)
-
-
-def calculer_cout_installation(puissance_kwc, type_onduleur='string', type_toiture='tuiles'):
-    """
-    Calcule le coût total estimé de l'installation.
-
-    Returns:
-        dict: cout_kwc, cout_total, detail des composantes
-    """
-    cout_base = get_cout_installation_kwc(puissance_kwc)
-    surcout_ond = get_surcout_onduleur(type_onduleur)
-    surcout_toit = get_surcout_toiture(type_toiture)
-
-    cout_kwc = cout_base + surcout_ond + surcout_toit
-    cout_total = cout_kwc * puissance_kwc
-
-    return {
-        'cout_kwc': cout_kwc,
-        'cout_total': round(cout_total, 0),
-        'detail': {
-            'base_kwc': cout_base,
-            'surcout_onduleur': surcout_ond,
-            'surcout_toiture': surcout_toit,
-        }
-    }
-
-
-def get_tarif_injection(puissance_kwc):
-    """Tarif injection surplus EDF OA selon puissance (Arrêté S21 - T1 2026)."""
-    if puissance_kwc <= 9:
-        return 0.04
-    elif puissance_kwc <= 100:
-        return 0.0617
-    return 0.0536
-
-
-def get_tarif_vente_totale(puissance_kwc):
-    """
-    Tarif de rachat en vente totale EDF OA (CRE Q1 2026).
-    Minimum 9 kWc pour être éligible.
-    
-    Returns:
-        float: Tarif en €/kWh, ou 0 si non éligible
-    """
-    if puissance_kwc < 9:
-        return 0  # Non éligible en vente totale
-    elif puissance_kwc <= 36:
-        return 0.0911
-    elif puissance_kwc <= 100:
-        return 0.0792
-    return 0
-
-
-def get_prime_autoconsommation(puissance_kwc):
-    """
-    Prime à l'autoconsommation selon puissance (CRE Q1 2026).
-    Source : Open Data CRE, arrêté tarifaire en vigueur.
-    
-    ⚠️ CORRIGÉ : anciennes valeurs 370/280/200/100 remplacées
-    par les tarifs actuels 80/80/140/70 €/kWc.
-    """
-    if puissance_kwc <= 3:
-        return 80 * puissance_kwc     # Pa : 0.08 €/Wc
-    elif puissance_kwc <= 9:
-        return 80 * puissance_kwc     # Pa : 0.08 €/Wc
-    elif puissance_kwc <= 36:
-        return 140 * puissance_kwc    # Pb : 0.14 €/Wc
-    elif puissance_kwc <= 100:
-        return 70 * puissance_kwc     # Pb : 0.07 €/Wc
-    return 0
-
-
-# ==============================================================================
-# OPTIMISEUR DE CONFIGURATION
-# ==============================================================================
-
-def optimize_power(
-    production_1kwc,
-    consommation_horaire,
-    consommation_annuelle,
-    objectif='rentabilite',
-    min_power=0.5,
-    max_power=12.0,
-    step=0.5,
-    type_onduleur='string',
-    type_toiture='tuiles',
-):
-    """
-    Optimise la puissance en testant plusieurs configurations
-    avec le vrai profil horaire heure par heure.
-    
-    Args:
-        production_1kwc: Production horaire pour 1 kWc (8760 valeurs)
-        consommation_horaire: Consommation horaire (8760 valeurs)
-        consommation_annuelle: Consommation annuelle totale (kWh)
-        objectif: 'rentabilite', 'autonomie', 'equilibre', 'revente'
-        min_power/max_power: Plage de puissances à tester (kWc)
-        step: Pas de test (kWc)
-    
-    Returns:
-        dict avec puissance_optimale, all_configs, best_config
-    """
-    prod_1kwc = production_1kwc.values if hasattr(production_1kwc, 'values') else production_1kwc
-    
-    # ── Ajustement plage pour vente totale (min 9 kWc) ──
-    if objectif == 'revente':
-        min_power = max(min_power, 9.0)
-        # max_power déjà calculé depuis la surface dans la tâche principale
-        logger.info(f"💰 Mode VENTE TOTALE — plage ajustée: {min_power} → {max_power} kWc")
-    
-    all_configs = []
-    best_score = -float('inf')
-    best_config = None
-    
-    puissances = np.arange(min_power, max_power + step / 2, step)
-    
-    logger.info(f"\n{'='*80}")
-    logger.info(f"🔍 OPTIMISATION MULTI-PUISSANCE ({objectif.upper()})")
-    logger.info(f"   Plage: {min_power} → {max_power} kWc (pas {step})")
-    logger.info(f"   {len(puissances)} configurations à tester")
-    logger.info(f"{'='*80}")
-    
-    for p_test in puissances:
-        p_test = round(p_test, 1)
-        
-        # Production horaire pour cette puissance
-        prod_horaire = prod_1kwc * p_test
-        prod_annuelle = float(prod_horaire.sum())
-        
-        # Investissement
-        cout_detail_opt = calculer_cout_installation(p_test, type_onduleur, type_toiture)
-        cout_brut = cout_detail_opt['cout_total']
-        
-        if objectif == 'revente':
-            # ─── VENTE TOTALE : 100% injection, pas d'autoconsommation ───
-            autoconso_kwh = 0.0
-            injection_kwh = prod_annuelle
-            autoconso_ratio = 0.0
-            autoprod_ratio = 0.0
-            
-            tarif_vt = get_tarif_vente_totale(p_test)
-            revenu_vente = prod_annuelle * tarif_vt
-            
-            # Pas de prime en vente totale
-            prime = 0
-            cout_net = cout_brut
-            
-            # L'économie = revenu de la vente (pas d'économie sur la facture)
-            economie_annuelle = revenu_vente
-            
-            roi_annees = cout_net / economie_annuelle if economie_annuelle > 0 else 999
-            eco_25ans = economie_annuelle * 25 - cout_net  # 25 ans mais contrat = 20 ans
-            
-            # Score vente totale : maximiser le bénéfice net sur 20 ans
-            revenu_20ans = revenu_vente * 20
-            benefice_20ans = revenu_20ans - cout_net
-            score = benefice_20ans / 1000  # Normaliser
-            
-            config = {
-                'puissance_kwc': p_test,
-                'production_annuelle': round(prod_annuelle, 0),
-                'autoconso_kwh': 0,
-                'autoconso_ratio': 0,
-                'autoprod_ratio': 0,
-                'injection_kwh': round(injection_kwh, 0),
-                'economie_annuelle': round(economie_annuelle, 0),
-                'cout_brut': round(cout_brut, 0),
-                'prime': 0,
-                'cout_net': round(cout_net, 0),
-                'roi_annees': round(roi_annees, 1),
-                'eco_25ans': round(eco_25ans, 0),
-                'score': round(score, 4),
-                # Champs spécifiques vente totale
-                'tarif_vente_totale': tarif_vt,
-                'revenu_vente_annuel': round(revenu_vente, 0),
-                'revenu_20ans': round(revenu_20ans, 0),
-                'benefice_20ans': round(benefice_20ans, 0),
-            }
-            
-        else:
-            # ─── AUTOCONSOMMATION : calcul classique ───
-            autoconso_kwh = float(np.minimum(prod_horaire, consommation_horaire).sum())
-            injection_kwh = prod_annuelle - autoconso_kwh
-            
-            autoconso_ratio = (autoconso_kwh / prod_annuelle * 100) if prod_annuelle > 0 else 0
-            autoprod_ratio = (autoconso_kwh / consommation_annuelle * 100) if consommation_annuelle > 0 else 0
-            
-            tarif_inj = get_tarif_injection(p_test)
-            economie_annuelle = autoconso_kwh * TARIF_ACHAT_KWH + injection_kwh * tarif_inj
-            
-            prime = get_prime_autoconsommation(p_test)
-            cout_net = cout_brut - prime
-            
-            roi_annees = cout_net / economie_annuelle if economie_annuelle > 0 else 999
-            eco_25ans = economie_annuelle * 25 - cout_net
-            
-            # ===== SCORING SELON OBJECTIF =====
-            if objectif == 'rentabilite':
-                score = 1.0 / roi_annees if roi_annees > 0 else 0
-                
-            elif objectif == 'autonomie':
-                score = autoprod_ratio
-                if autoconso_ratio < 25:
-                    score *= 0.8
-                    
-            elif objectif == 'equilibre':
-                score_roi = max(0, (15 - roi_annees)) / 15
-                score_autoprod = min(autoprod_ratio / 50, 1.0)
-                score_autoconso = min(autoconso_ratio / 60, 1.0)
-                score = score_roi * 0.4 + score_autoprod * 0.3 + score_autoconso * 0.3
-            else:
-                score = 1.0 / roi_annees if roi_annees > 0 else 0
-            
-            config = {
-                'puissance_kwc': p_test,
-                'production_annuelle': round(prod_annuelle, 0),
-                'autoconso_kwh': round(autoconso_kwh, 0),
-                'autoconso_ratio': round(autoconso_ratio, 1),
-                'autoprod_ratio': round(autoprod_ratio, 1),
-                'injection_kwh': round(injection_kwh, 0),
-                'economie_annuelle': round(economie_annuelle, 0),
-                'cout_brut': round(cout_brut, 0),
-                'prime': round(prime, 0),
-                'cout_net': round(cout_net, 0),
-                'roi_annees': round(roi_annees, 1),
-                'eco_25ans': round(eco_25ans, 0),
-                'score': round(score, 4),
-            }
-        
-        all_configs.append(config)
-        
-        if score > best_score:
-            best_score = score
-            best_config = config
-    
-    # ── Logs tableau récapitulatif ──
-    if objectif == 'revente':
-        logger.info(f"\n{'─'*100}")
-        logger.info(
-            f"{'kWc':>5} │ {'Prod kWh':>9} │ {'Tarif €':>8} │ "
-            f"{'Revenu/an':>10} │ {'Coût':>8} │ "
-            f"{'ROI ans':>8} │ {'Bénéf 20a':>10} │ {'Score':>7}"
-        )
-        logger.info(f"{'─'*100}")
-        
-        for c in all_configs:
-            marker = " ◀ OPTIMAL" if c['puissance_kwc'] == best_config['puissance_kwc'] else ""
-            logger.info(
-                f"{c['puissance_kwc']:>5.1f} │ {c['production_annuelle']:>9.0f} │ "
-                f"{c.get('tarif_vente_totale', 0):>7.4f}€ │ "
-                f"{c.get('revenu_vente_annuel', 0):>9.0f}€ │ {c['cout_net']:>7.0f}€ │ "
-                f"{c['roi_annees']:>7.1f} │ {c.get('benefice_20ans', 0):>9.0f}€ │ "
-                f"{c['score']:>7.4f}{marker}"
-            )
-    else:
-        logger.info(f"\n{'─'*105}")
-        logger.info(
-            f"{'kWc':>5} │ {'Prod kWh':>9} │ {'AutoC kWh':>10} │ "
-            f"{'AutoC %':>8} │ {'AutoP %':>8} │ {'Éco €/an':>9} │ "
-            f"{'ROI ans':>8} │ {'Score':>7}"
-        )
-        logger.info(f"{'─'*105}")
-        
-        for c in all_configs:
-            marker = " ◀ OPTIMAL" if c['puissance_kwc'] == best_config['puissance_kwc'] else ""
-            logger.info(
-                f"{c['puissance_kwc']:>5.1f} │ {c['production_annuelle']:>9.0f} │ "
-                f"{c['autoconso_kwh']:>10.0f} │ {c['autoconso_ratio']:>7.1f}% │ "
-                f"{c['autoprod_ratio']:>7.1f}% │ {c['economie_annuelle']:>8.0f}€ │ "
-                f"{c['roi_annees']:>7.1f} │ {c['score']:>7.4f}{marker}"
-            )
-    
-    logger.info(f"{'─'*105}")
-    logger.info(f"✅ PUISSANCE OPTIMALE ({objectif}): {best_config['puissance_kwc']} kWc")
-    logger.info(f"   → Production: {best_config['production_annuelle']:.0f} kWh/an")
-    if objectif == 'revente':
-        logger.info(f"   → Revenu vente: {best_config.get('revenu_vente_annuel', 0):.0f} €/an")
-        logger.info(f"   → Bénéfice 20 ans: {best_config.get('benefice_20ans', 0):.0f} €")
-    else:
-        logger.info(f"   → Autoconsommation: {best_config['autoconso_ratio']:.1f}%")
-        logger.info(f"   → Autoproduction: {best_config['autoprod_ratio']:.1f}%")
-    logger.info(f"   → ROI: {best_config['roi_annees']:.1f} ans")
-    logger.info(f"   → Économies: {best_config['economie_annuelle']:.0f} €/an")
-    logger.info(f"{'='*80}\n")
-    
-    return {
-        'puissance_optimale': best_config['puissance_kwc'],
-        'all_configs': all_configs,
-        'best_config': best_config,
-    }
+# L'optimiseur et les grilles tarifaires étaient définis ici : ils restent
+# importables depuis ce module pour le code existant
+__all__ = [
+    'run_simulation_task',
+    'optimize_power',
+    'TARIF_ACHAT_KWH',
+    'calculer_cout_installation',
+    'get_cout_installation_kwc',
+    'get_prime_autoconsommation',
+    'get_surcout_onduleur',
+    'get_surcout_toiture',
+    'get_tarif_injection',
+    'get_tarif_vente_totale',
+]
 
 
 # ==============================================================================
@@ -423,11 +125,9 @@ def run_simulation_task(self, simulation_id):
         decomposition = decompose_consumption(profil)
         logger.info("\n" + get_decomposition_summary(decomposition))
 
-        consommation_actuel = generate_personalized_hourly_profile(
-            profil=profil, decomposition=decomposition, optimized=False
-        )
-        consommation_optimise = generate_personalized_hourly_profile(
-            profil=profil, decomposition=decomposition, optimized=True
+        # Postes communs calculés une fois, seuls ECS et appareils programmables diffèrent
+        consommation_actuel, consommation_optimise = generate_dual_hourly_profiles(
+            profil=profil, decomposition=decomposition
         )
 
         consommation_horaire = consommation_actuel
@@ -464,17 +164,20 @@ def run_simulation_task(self, simulation_id):
 
         logger.info(f"📐 Surface toiture: {surface_toiture_m2} m² → max puissance: {max_power_calc} kWc")
 
-        optim = optimize_power(
+        # Tous les objectifs en un passage : changer d'objectif sur la page
+        # résultats devient une lecture de Resultat.optimisations.
+        # Entrées identiques (lieu, profil, matériel, tarifs) → lecture du cache
+        optimisations = optimize_power_all_objectives_cached(
             production_1kwc=production_1kwc,
             consommation_horaire=consommation_actuel,
             consommation_annuelle=consommation_annuelle,
-            objectif=objectif,
             min_power=0.5,
             max_power=max_power_calc,
             step=0.5,
             type_onduleur=type_onduleur,
             type_toiture=type_toiture,
         )
+        optim = optimisations.get(objectif, optimisations['rentabilite'])
         
         puissance_kwc = optim['puissance_optimale']
         best = optim['best_config']
@@ -574,16 +277,20 @@ def run_simulation_task(self, simulation_id):
             # MODE AUTOCONSOMMATION — calcul classique
             # ══════════════════════════════════════════════════════════
             
+            # Scénarios ACTUEL et OPTIMISÉ en un seul calcul par lots
+            scenarios = calculate_autoconsumption_batch(
+                production_horaire,
+                np.stack((consommation_actuel, consommation_optimise))
+            )
+
             # Scénario ACTUEL
-            ac_actuel = np.minimum(production_horaire, consommation_actuel)
-            autoconso_actuel_kwh = float(ac_actuel.sum())
+            autoconso_actuel_kwh = float(scenarios.autoconsommation_kwh[0])
             autoconso_actuel_ratio = (autoconso_actuel_kwh / production_annuelle * 100) if production_annuelle > 0 else 0
             injection_actuel_kwh = production_annuelle - autoconso_actuel_kwh
             autoproduction_actuel_ratio = (autoconso_actuel_kwh / consommation_annuelle * 100) if consommation_annuelle > 0 else 0
 
             # Scénario OPTIMISÉ
-            ac_optimise = np.minimum(production_horaire, consommation_optimise)
-            autoconso_optimise_kwh = float(ac_optimise.sum())
+            autoconso_optimise_kwh = float(scenarios.autoconsommation_kwh[1])
             autoconso_optimise_ratio = (autoconso_optimise_kwh / production_annuelle * 100) if production_annuelle > 0 else 0
             injection_optimise_kwh = production_annuelle - autoconso_optimise_kwh
             autoproduction_optimise_ratio = (autoconso_optimise_kwh / consommation_annuelle * 100) if consommation_annuelle > 0 else 0
@@ -636,17 +343,15 @@ def run_simulation_task(self, simulation_id):
         # ================================================================
         
         prod_vals = production_horaire.values if hasattr(production_horaire, 'values') else production_horaire
-        prod_hourly_avg = [round(float(prod_vals[h::24].mean()), 3) for h in range(24)]
-        conso_hourly_avg = [round(float(consommation_horaire[h::24].mean()), 3) for h in range(24)]
+        series = np.stack((prod_vals, consommation_horaire))
+        
+        hourly_avg = moyenne_horaire(series).round(3)
+        prod_hourly_avg = hourly_avg[0].tolist()
+        conso_hourly_avg = hourly_avg[1].tolist()
         
-        jours_par_mois = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
-        prod_monthly, conso_monthly = [], []
-        idx = 0
-        for jours in jours_par_mois:
-            h = jours * 24
-            prod_monthly.append(round(float(prod_vals[idx:idx+h].sum()), 1))
-            conso_monthly.append(round(float(consommation_horaire[idx:idx+h].sum()), 1))
-            idx += h
+        monthly = somme_mensuelle(series).round(1)
+        prod_monthly = monthly[0].tolist()
+        conso_monthly = monthly[1].tolist()
 
         # ================================================================
         # ÉTAPE 5: Sauvegarde (100%)
@@ -692,6 +397,7 @@ def run_simulation_task(self, simulation_id):
             taux_rentabilite_pct=(economie_25ans / cout_net * 100) if cout_net > 0 else 0,
             puissance_recommandee_kwc=puissance_kwc,
             objectif=objectif,
+            optimisations=serialiser_optimisations(optimisations),
         )
 
         simulation.resultat = resultat
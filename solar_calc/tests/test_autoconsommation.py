@@ -226,6 +226,42 @@ class TestProfilsOccupation(unittest.TestCase):
         
         np.testing.assert_array_equal(pattern1, pattern2)
 
+    def test_pattern_annuel_conforme_aux_jours(self):
+        """Chaque jour du pattern annuel reprend le template semaine/week-end"""
+        for profile_type in ['actif_absent', 'teletravail', 'retraite', 'famille']:
+            pattern = ConsumptionProfiles.generate_yearly_pattern(profile_type, add_randomness=False)
+            weekday = ConsumptionProfiles.get_daily_pattern(profile_type, is_weekend=False)
+            weekend = ConsumptionProfiles.get_daily_pattern(profile_type, is_weekend=True)
+
+            for day in range(365):
+                attendu = weekend if day % 7 in [5, 6] else weekday
+                np.testing.assert_array_equal(pattern[day * 24:(day + 1) * 24], attendu)
+
+    def test_pattern_sans_aleatoire_memoise(self):
+        """Sans aléa, le même tableau (lecture seule) est renvoyé à chaque appel"""
+        pattern1 = ConsumptionProfiles.generate_yearly_pattern('famille', add_randomness=False)
+        pattern2 = ConsumptionProfiles.generate_yearly_pattern('famille', add_randomness=False)
+
+        self.assertIs(pattern1, pattern2)
+        self.assertFalse(pattern1.flags.writeable)
+        with self.assertRaises(ValueError):
+            pattern1[0] = 0.0
+
+        # Les templates journaliers restent modifiables par l'appelant
+        daily = ConsumptionProfiles.get_daily_pattern('famille', is_weekend=False)
+        daily[0] = 99.0
+        self.assertNotEqual(ConsumptionProfiles.get_daily_pattern('famille', is_weekend=False)[0], 99.0)
+
+    def test_variation_aleatoire_bornee(self):
+        """La variation aléatoire reste dans ±10% du pattern de base"""
+        base = ConsumptionProfiles.generate_yearly_pattern('teletravail', add_randomness=False)
+        pattern = ConsumptionProfiles.generate_yearly_pattern('teletravail', random_seed=7)
+
+        ratio = pattern / base
+        self.assertTrue(pattern.flags.writeable)
+        self.assertGreaterEqual(ratio.min(), 0.90)
+        self.assertLessEqual(ratio.max(), 1.10)
+
 
 class TestConsumptionProfile(unittest.TestCase):
     """Tests de la classe ConsumptionProfile"""
@@ -0,0 +1,246 @@
+"""
+Tests unitaires pour les profils de consommation (optimisation solaire
+et profils personnalisés).
+
+Les fonctions de référence reprennent les boucles jour par jour
+d'origine : les versions vectorisées doivent donner les mêmes tableaux.
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import django
+import pytest
+import numpy as np
+import pandas as pd
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from frontend.models import Simulation
+from solar_calc.services.consumption_profiles import ConsumptionProfiles
+from solar_calc.services.simulation import SimulationService, run_simulation_from_django_objects
+
+
+# ==============================================================================
+# IMPLÉMENTATIONS DE RÉFÉRENCE (boucles d'origine)
+# ==============================================================================
+
+def _reference_optimize_for_solar(base_pattern, shift_ratio):
+    optimized = base_pattern.copy()
+    source_hours = list(range(0, 6)) + list(range(21, 24))
+    target_hours = list(range(10, 16))
+    total_shifted = 0
+
+    for day in range(365):
+        day_start = day * 24
+        to_shift = sum(optimized[day_start + h] for h in source_hours) * shift_ratio
+        for h in source_hours:
+            optimized[day_start + h] = max(0, optimized[day_start + h] - to_shift / len(source_hours))
+        for h in target_hours:
+            optimized[day_start + h] += to_shift / len(target_hours)
+        total_shifted += to_shift
+
+    return optimized, total_shifted
+
+
+def _reference_cycles(pattern, jours, heure, duree_h, puissance_kw):
+    for day in jours:
+        for h in range(duree_h):
+            pattern[day * 24 + (heure + h) % 24] += puissance_kw
+
+
+def _reference_personalized(profile_type, consommation_totale, appareils_data, optimized):
+    base_pattern = ConsumptionProfiles.generate_yearly_pattern(profile_type, add_randomness=False)
+    specific_pattern = np.zeros(8760)
+    hebdo = lambda jours: [w * 7 + j for w in range(52) for j in jours if w * 7 + j < 365]
+
+    ecs = appareils_data.get('ecs', {})
+    heure_ecs = ecs.get('heure_optimale', 12) if optimized else ecs.get('heure_habituelle', 2)
+    if ecs.get('type') in ['chauffe_eau_electrique', 'electrique']:
+        _reference_cycles(specific_pattern, range(365), heure_ecs, 4, 2.5)
+    if ecs.get('type') == 'thermodynamique':
+        _reference_cycles(specific_pattern, range(365), heure_ecs, 3, 1.2)
+
+    # (appareil, puissance, durée, heures par défaut, jours possibles, clé et défaut du nombre de jours)
+    appareils = [
+        ('lave_linge', 2.0, 2, (12, 20), [0, 2, 4, 6], ('cycles_par_semaine', 4)),
+        ('lave_vaisselle', 1.8, 2, (13, 21), [0, 1, 2, 3, 4, 5, 6], ('cycles_par_semaine', 5)),
+        ('seche_linge', 2.5, 1, (14, 22), [0, 2, 4], ('cycles_par_semaine', 3)),
+        ('vehicule_electrique', 3.7, 4, (11, 19), [0, 1, 2, 3, 4], ('jours_par_semaine', 5)),
+    ]
+    for nom, puissance, duree, (h_opt, h_hab), jours, (cle, defaut) in appareils:
+        config = appareils_data.get(nom, {})
+        if config.get('present'):
+            heure = config.get('heure_optimale', h_opt) if optimized else config.get('heure_habituelle', h_hab)
+            _reference_cycles(specific_pattern, hebdo(jours[:int(config.get(cle, defaut))]), heure, duree, puissance)
+
+    piscine = appareils_data.get('piscine', {})
+    if piscine.get('present'):
+        heure = piscine.get('heure_optimale', 11) if optimized else piscine.get('heure_habituelle', 6)
+        fin = 120 + piscine.get('mois_utilisation', 6) * 30
+        _reference_cycles(specific_pattern, range(120, min(fin, 365)), heure, 8, 1.0)
+
+    base_normalized = base_pattern / base_pattern.sum() * (consommation_totale * 0.40)
+    if specific_pattern.sum() > 0:
+        specific_normalized = specific_pattern / specific_pattern.sum() * (consommation_totale * 0.60)
+    else:
+        specific_normalized = np.zeros(8760)
+        base_normalized = base_pattern / base_pattern.sum() * consommation_totale
+    combined = base_normalized + specific_normalized
+    return combined / combined.sum() * consommation_totale
+
+
+def _meilleure_duree(fonction, repetitions=3):
+    """Meilleure durée sur quelques exécutions (moins sensible au bruit qu'une mesure unique)."""
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction()
+        durees.append(time.perf_counter() - debut)
+    return min(durees)
+
+
+# ==============================================================================
+# FIXTURES
+# ==============================================================================
+
+@pytest.fixture
+def appareils_complets():
+    return {
+        'ecs': {'type': 'chauffe_eau_electrique', 'heure_habituelle': 22, 'heure_optimale': 12},
+        'lave_linge': {'present': True, 'cycles_par_semaine': 3, 'heure_habituelle': 20},
+        'lave_vaisselle': {'present': True, 'cycles_par_semaine': 7, 'heure_habituelle': 23},
+        'seche_linge': {'present': True},
+        'vehicule_electrique': {'present': True, 'jours_par_semaine': 4},
+        'piscine': {'present': True, 'mois_utilisation': 9},
+    }
+
+
+# ==============================================================================
+# TESTS
+# ==============================================================================
+
+class TestConsumptionProfilesVectorises:
+    """Équivalence et performance des versions vectorisées."""
+
+    @pytest.mark.parametrize('niveau,ratio', [('standard', 0.30), ('agressif', 0.50), ('maximal', 0.70)])
+    def test_optimize_for_solar_equivalent(self, niveau, ratio):
+        """Même profil optimisé et même énergie déplacée que la boucle jour par jour."""
+        base = ConsumptionProfiles.generate_yearly_pattern('famille', random_seed=3) * 2.0
+
+        optimise, details = ConsumptionProfiles.optimize_for_solar(base, niveau)
+        attendu, total_attendu = _reference_optimize_for_solar(base, ratio)
+
+        np.testing.assert_allclose(optimise, attendu, rtol=1e-12, atol=1e-12)
+        assert details['energy_shifted_kwh'] == pytest.approx(round(total_attendu, 2))
+
+    def test_optimize_for_solar_pattern_lecture_seule(self):
+        """Le pattern mémorisé (lecture seule) peut être optimisé sans être modifié."""
+        base = ConsumptionProfiles.generate_yearly_pattern('actif_absent', add_randomness=False)
+
+        optimise, _ = ConsumptionProfiles.optimize_for_solar(base)
+
+        assert not base.flags.writeable
+        assert optimise.flags.writeable
+        assert not np.array_equal(optimise, base)
+
+    @pytest.mark.parametrize('optimized', [False, True])
+    @pytest.mark.parametrize('profile_type', ['actif_absent', 'retraite'])
+    def test_personalized_pattern_equivalent(self, appareils_complets, profile_type, optimized):
+        """Même profil personnalisé que les boucles semaine / jour / heure."""
+        for appareils in (appareils_complets, {'ecs': {'type': 'thermodynamique'}}, {}):
+            np.testing.assert_allclose(
+                ConsumptionProfiles.generate_personalized_pattern(profile_type, 5432.1, appareils, optimized),
+                _reference_personalized(profile_type, 5432.1, appareils, optimized),
+                rtol=1e-12
+            )
+
+    def test_benchmark(self, appareils_complets):
+        """Les versions vectorisées sont bien plus rapides que les boucles d'origine."""
+        base = ConsumptionProfiles.generate_yearly_pattern('famille', random_seed=3)
+
+        def boucles():
+            _reference_optimize_for_solar(base, 0.30)
+            _reference_personalized('famille', 5000, appareils_complets, True)
+
+        def vectorisees():
+            ConsumptionProfiles.optimize_for_solar(base)
+            ConsumptionProfiles.generate_personalized_pattern('famille', 5000, appareils_complets, True)
+
+        duree_boucles = _meilleure_duree(boucles)
+        duree_vectorisee = _meilleure_duree(vectorisees)
+
+        # Mesuré ×11 environ ; ×2 tolère une machine chargée
+        assert duree_vectorisee * 2 < duree_boucles
+
+
+class TestGenerateurAleatoire:
+    """Variation aléatoire tirée d'un générateur explicite."""
+
+    def test_etat_global_inchange(self):
+        """Les profils aléatoires ne modifient plus l'état global de np.random."""
+        np.random.seed(123)
+        attendu = np.random.random(5)
+
+        np.random.seed(123)
+        ConsumptionProfiles.generate_yearly_pattern('famille', random_seed=42)
+        ConsumptionProfiles.generate_yearly_pattern('famille', rng=np.random.default_rng(1))
+
+        np.testing.assert_array_equal(np.random.random(5), attendu)
+
+    def test_graine_et_generateur_equivalents(self):
+        """Même graine, même profil ; graines différentes, profils différents."""
+        par_graine = ConsumptionProfiles.generate_yearly_pattern('famille', random_seed=2024)
+        par_rng = ConsumptionProfiles.generate_yearly_pattern('famille', rng=np.random.default_rng(2024))
+        autre = ConsumptionProfiles.generate_yearly_pattern('famille', rng=np.random.default_rng(2025))
+
+        np.testing.assert_array_equal(par_graine, par_rng)
+        assert not np.array_equal(par_graine, autre)
+
+    def test_reproductible_en_parallele(self):
+        """Des simulations concurrentes retrouvent chacune le profil de leur graine."""
+        graines = list(range(16))
+        attendus = [
+            ConsumptionProfiles.generate_yearly_pattern('teletravail', rng=np.random.default_rng(g))
+            for g in graines
+        ]
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            obtenus = list(pool.map(
+                lambda g: ConsumptionProfiles.generate_yearly_pattern(
+                    'teletravail', rng=np.random.default_rng(g)
+                ),
+                graines
+            ))
+
+        for attendu, obtenu in zip(attendus, obtenus):
+            np.testing.assert_array_equal(obtenu, attendu)
+
+    def test_simulation_reproductible(self):
+        """Même graine de Simulation, même simulation complète ; autre graine, autre autoconsommation."""
+        installation = SimpleNamespace(
+            nom='Test', puissance_panneau_wc=400, nombre_panneaux=8, type_onduleur='central',
+            puissance_onduleur_kw=3.0, latitude=45.75, longitude=4.85, altitude=170,
+            orientation_azimut=180, inclinaison_degres=30, facteur_ombrage=0.0,
+        )
+        profil = SimpleNamespace(
+            annee_construction=2015, surface_habitable=100, nb_personnes=3, dpe='C',
+            type_chauffage='electrique', type_ecs='ballon_electrique',
+        )
+
+        def simuler(graine):
+            return run_simulation_from_django_objects(
+                installation, profil, use_real_weather=False, simulation=Simulation(graine_aleatoire=graine)
+            )
+
+        premiere, seconde, autre = simuler(7), simuler(7), simuler(8)
+        par_rng = SimulationService().run_simulation_complete(
+            installation, profil, use_real_weather=False, rng=np.random.default_rng(7)
+        )
+
+        pd.testing.assert_frame_equal(premiere.pop('donnees_horaires'), seconde.pop('donnees_horaires'))
+        assert premiere == seconde == {k: v for k, v in par_rng.items() if k != 'donnees_horaires'}
+        assert autre['autoconsommation_kwh'] != premiere['autoconsommation_kwh']
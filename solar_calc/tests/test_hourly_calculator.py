@@ -4,7 +4,13 @@ Tests unitaires pour le calculateur horaire.
 
 import pytest
 import numpy as np
-from solar_calc.services.hourly_calculator import HourlyAutoconsumptionCalculator, HourlyResults
+from solar_calc.services.hourly_calculator import (
+    AutoconsumptionIndex,
+    HourlyAutoconsumptionCalculator,
+    HourlyResults,
+    calculate_autoconsumption_batch,
+    compute_hourly_flows,
+)
 
 
 class TestHourlyCalculator:
@@ -57,4 +63,137 @@ class TestHourlyCalculator:
         assert results.autoconsommation_kwh <= results.consommation_annuelle_kwh
         assert results.autoconsommation_kwh == pytest.approx(results.consommation_annuelle_kwh, rel=0.01)
         
-        # Vérifier que tout le surplus est inje
\ No newline at end of file
+        # Vérifier que tout le surplus est inje
+    
+    def test_mensuel_coherent_avec_annuel(self):
+        """Les 12 totaux mensuels doivent sommer aux totaux annuels."""
+        rng = np.random.default_rng(0)
+        production_horaire_kw = rng.uniform(0, 4, 8760)
+        consommation_horaire_kw = rng.uniform(0.2, 2, 8760)
+        
+        results = HourlyAutoconsumptionCalculator(puissance_kwc=4.0).calculate(
+            production_horaire_kw=production_horaire_kw,
+            consommation_horaire_kw=consommation_horaire_kw
+        )
+        
+        assert len(results.production_mensuelle_kwh) == 12
+        assert sum(results.production_mensuelle_kwh) == pytest.approx(results.production_annuelle_kwh, abs=0.1)
+        assert sum(results.autoconsommation_mensuelle_kwh) == pytest.approx(results.autoconsommation_kwh, abs=0.1)
+        # Janvier = 31 jours × 24h
+        assert results.consommation_mensuelle_kwh[0] == pytest.approx(consommation_horaire_kw[:744].sum(), abs=0.01)
+    
+    def test_donnees_horaires_sur_demande(self):
+        """Le DataFrame horaire n'est construit que si include_hourly_data=True."""
+        production_horaire_kw = np.full(8760, 0.5)
+        consommation_horaire_kw = np.full(8760, 0.3)
+        calculator = HourlyAutoconsumptionCalculator(puissance_kwc=4.0)
+        
+        assert calculator.calculate(production_horaire_kw, consommation_horaire_kw).donnees_horaires is None
+        
+        df = calculator.calculate(
+            production_horaire_kw, consommation_horaire_kw, include_hourly_data=True
+        ).donnees_horaires
+        assert len(df) == 8760
+        assert df['injection_kw'].sum() == pytest.approx(1752, rel=0.01)
+        assert df['month'].iloc[-1] == 12
+    
+    def test_flux_conservation_energie(self):
+        """Production = autoconso + injection et consommation = autoconso + achat."""
+        rng = np.random.default_rng(1)
+        production = rng.uniform(0, 3, 8760)
+        consommation = rng.uniform(0.5, 2, 8760)
+        
+        flux = compute_hourly_flows(production, consommation)
+        
+        np.testing.assert_allclose(flux['autoconso_kw'] + flux['injection_kw'], production)
+        np.testing.assert_allclose(flux['autoconso_kw'] + flux['achat_kw'], consommation)
+        assert (flux['injection_kw'] >= 0).all()
+        assert (flux['achat_kw'] >= 0).all()
+
+
+class TestBatchCalculator:
+    """Tests du calcul par lots (N scénarios × 8760)."""
+    
+    def test_batch_identique_aux_appels_unitaires(self):
+        """Chaque scénario du lot doit donner le même résultat que calculate()."""
+        rng = np.random.default_rng(2)
+        prod_1kwc = rng.uniform(0, 0.8, 8760)
+        consommation = rng.uniform(0.2, 2, 8760)
+        puissances = np.arange(1.0, 9.5, 0.5)
+        
+        batch = calculate_autoconsumption_batch(
+            prod_1kwc, consommation, puissances_kwc=puissances, max_elements=8760 * 4
+        )
+        
+        assert len(batch) == len(puissances)
+        for i, puissance in enumerate(puissances):
+            attendu = HourlyAutoconsumptionCalculator(puissance).calculate(
+                prod_1kwc * puissance, consommation
+            )
+            obtenu = batch.to_hourly_results(i)
+            assert obtenu.autoconsommation_kwh == pytest.approx(attendu.autoconsommation_kwh, abs=0.02)
+            assert obtenu.injection_reseau_kwh == pytest.approx(attendu.injection_reseau_kwh, abs=0.02)
+            assert obtenu.taux_autoproduction_pct == pytest.approx(attendu.taux_autoproduction_pct, abs=0.01)
+            assert obtenu.production_specifique_kwh_kwc == pytest.approx(attendu.production_specifique_kwh_kwc, abs=0.01)
+            np.testing.assert_allclose(
+                obtenu.autoconsommation_mensuelle_kwh, attendu.autoconsommation_mensuelle_kwh, atol=0.02
+            )
+    
+    def test_broadcast_profils(self):
+        """Une production contre plusieurs profils de consommation."""
+        production = np.full(8760, 1.0)
+        consommations = np.stack([np.full(8760, 0.5), np.full(8760, 2.0)])
+        
+        batch = calculate_autoconsumption_batch(production, consommations)
+        
+        np.testing.assert_allclose(batch.autoconsommation_kwh, [4380, 8760])
+        np.testing.assert_allclose(batch.taux_autoconsommation_pct, [50, 100])
+        assert batch.autoconsommation_mensuelle_kwh.shape == (2, 12)
+    
+    def test_formes_incompatibles(self):
+        """Des nombres de scénarios non diffusables lèvent une ValueError."""
+        with pytest.raises(ValueError):
+            calculate_autoconsumption_batch(np.ones((2, 8760)), np.ones((3, 8760)))
+
+
+class TestAutoconsumptionIndex:
+    """Tests de l'index trié par ratio consommation / production."""
+    
+    def test_identique_au_calcul_direct(self):
+        """L'index reproduit Σ min(p·a, c) pour des milliers de puissances."""
+        rng = np.random.default_rng(11)
+        heures = np.arange(8760) % 24
+        prod_1kwc = np.clip(np.sin((heures - 6) / 12 * np.pi), 0, None) * rng.uniform(0.2, 1.0, 8760)
+        consommation = rng.uniform(0.1, 2.0, 8760)
+        puissances = np.concatenate(([0.0], np.arange(0.1, 300.0, 0.1)))
+        
+        index = AutoconsumptionIndex(prod_1kwc, consommation)
+        attendu = [np.minimum(prod_1kwc * p, consommation).sum() for p in puissances]
+        
+        np.testing.assert_allclose(index.autoconsommation(puissances), attendu, rtol=1e-10, atol=1e-9)
+        np.testing.assert_allclose(
+            index.injection(puissances) + index.autoconsommation(puissances), index.production(puissances)
+        )
+        assert len(index) == int((prod_1kwc > 0).sum())
+    
+    def test_points_de_saturation(self):
+        """Aux seuils c/a, l'heure correspondante bascule exactement sur c."""
+        prod_1kwc = np.zeros(8760)
+        prod_1kwc[:3] = [1.0, 2.0, 0.5]
+        consommation = np.full(8760, 1.0)
+        
+        index = AutoconsumptionIndex(prod_1kwc, consommation)
+        
+        np.testing.assert_array_equal(index.seuils_kwc, [0.5, 1.0, 2.0])
+        # p = 1 : heures 0 et 1 saturées (1 + 1), heure 2 → 0.5
+        assert index.autoconsommation(1.0) == pytest.approx(2.5)
+        assert index.autoconsommation(10.0) == pytest.approx(3.0)
+        assert index.taux_autoconsommation(0.0) == 0.0
+        assert index.taux_autoproduction(10.0) == pytest.approx(3.0 / 8760 * 100)
+    
+    def test_entrees_invalides(self):
+        """Consommation négative ou tailles différentes : ValueError."""
+        with pytest.raises(ValueError):
+            AutoconsumptionIndex(np.ones(8760), -np.ones(8760))
+        with pytest.raises(ValueError):
+            AutoconsumptionIndex(np.ones(8760), np.ones(24))
@@ -0,0 +1,364 @@
+"""
+Tests unitaires pour le générateur de patterns horaires personnalisés.
+
+Les fonctions de référence reprennent les boucles heure par heure
+d'origine : les versions vectorisées doivent produire exactement les
+mêmes tableaux.
+"""
+
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+import numpy as np
+
+from solar_calc import hourly_pattern_generator as hpg
+from solar_calc.services.consumption_profiles import ConsumptionProfiles
+
+
+PROFILS = ['actif_absent', 'teletravail', 'retraite', 'famille']
+
+
+# ==============================================================================
+# IMPLÉMENTATIONS DE RÉFÉRENCE (boucles d'origine)
+# ==============================================================================
+
+def _mois_approx(h):
+    return (h // 730) % 12 + 1
+
+
+def _reference_heating(base_pattern, profile_type):
+    pattern = base_pattern.copy()
+    seasonal = np.full(8760, 1.2)
+    for h in range(8760):
+        if _mois_approx(h) in (11, 12, 1, 2, 3):
+            seasonal[h] = 2.0
+        elif _mois_approx(h) in (6, 7, 8):
+            seasonal[h] = 0.3
+    pattern = pattern * seasonal
+    if profile_type == 'actif_absent':
+        for h in range(8760):
+            if 9 <= h % 24 <= 17:
+                pattern[h] *= 0.3
+    return pattern
+
+
+def _reference_ecs(profile_type):
+    pattern = np.zeros(8760)
+    for h in range(8760):
+        hour_of_day = h % 24
+        day_of_week = (h // 24) % 7
+        if profile_type == 'actif_absent':
+            if hour_of_day in [7, 19]:
+                pattern[h] = 1.0
+        elif profile_type == 'teletravail':
+            if hour_of_day in [7, 12, 19]:
+                pattern[h] = 0.8
+        elif profile_type == 'retraite':
+            if 7 <= hour_of_day <= 20:
+                pattern[h] = 0.5
+        elif profile_type == 'famille':
+            if hour_of_day in [7, 8, 19, 20]:
+                pattern[h] = 1.0
+            if day_of_week in [5, 6] and hour_of_day == 12:
+                pattern[h] = 0.7
+    return pattern
+
+
+def _reference_ecs_optimise(heure_optimale):
+    pattern = np.zeros(8760)
+    for h in range(8760):
+        hour_of_day = h % 24
+        if heure_optimale - 1 <= hour_of_day <= heure_optimale + 2:
+            pattern[h] = 1.0
+        elif hour_of_day in [19, 20]:
+            pattern[h] = 0.3
+    return pattern
+
+
+def _reference_cycles(debuts, duree, valeur):
+    pattern = np.zeros(8760)
+    for heure_debut in debuts:
+        if heure_debut < 8760 - duree:
+            for offset in range(duree):
+                pattern[heure_debut + offset] = valeur
+    return pattern
+
+
+def _reference_appareil(appareil, heure, cycles_par_semaine):
+    conso = {'lave_linge': 1.0, 'lave_vaisselle': 1.2, 'seche_linge': 3.0}.get(appareil, 1.0)
+    nb_cycles_an = int(cycles_par_semaine * 52)
+    debuts = [int(i * 365 / nb_cycles_an) * 24 + int(heure) for i in range(nb_cycles_an)]
+    return _reference_cycles(debuts, 2, conso / 2)
+
+
+def _reference_ve(heure, conso_annuelle):
+    nb_charges = 365 // 2
+    debuts = [i * 2 * 24 + int(heure) for i in range(nb_charges)]
+    return _reference_cycles(debuts, 4, conso_annuelle / nb_charges / 4)
+
+
+def _reference_piscine(heure, conso_annuelle):
+    debuts = [jour * 24 + int(heure) for jour in range(120, 270)]
+    return _reference_cycles(debuts, 8, conso_annuelle / 150 / 8)
+
+
+def _reference_eclairage(base_pattern):
+    pattern = np.zeros(8760)
+    for h in range(8760):
+        hour_of_day = h % 24
+        winter_factor = 1.5 if _mois_approx(h) in (11, 12, 1, 2) else 1.0
+        if 6 <= hour_of_day <= 8:
+            pattern[h] = 0.5 * winter_factor
+        elif 18 <= hour_of_day <= 23:
+            pattern[h] = 1.0 * winter_factor
+        elif 0 <= hour_of_day <= 1:
+            pattern[h] = 0.3
+    return pattern * base_pattern
+
+
+def _reference_toutes(base_pattern, profile_type):
+    """Tous les patterns d'un profil, calculés par les boucles d'origine."""
+    return [
+        _reference_heating(base_pattern, profile_type),
+        _reference_ecs(profile_type),
+        _reference_ecs_optimise(13),
+        _reference_appareil('lave_linge', 20, 3),
+        _reference_appareil('lave_vaisselle', 21, 4),
+        _reference_appareil('seche_linge', 20, 2),
+        _reference_ve(19, 1500.0),
+        _reference_piscine(10, 1200.0),
+        _reference_eclairage(base_pattern),
+    ]
+
+
+def _vectorisees_toutes(base_pattern, profile_type):
+    return [
+        hpg.modulate_heating_by_occupation(base_pattern, profile_type, 'D'),
+        hpg.modulate_ecs_by_occupation(base_pattern, profile_type),
+        hpg.generate_ecs_optimized_pattern(13),
+        hpg.generate_appliance_pattern('lave_linge', 20, 3),
+        hpg.generate_appliance_pattern('lave_vaisselle', 21, 4),
+        hpg.generate_appliance_pattern('seche_linge', 20, 2),
+        hpg.generate_ev_charging_pattern(19, 1500.0),
+        hpg.generate_pool_pattern(10, 1200.0),
+        hpg.generate_lighting_pattern(base_pattern),
+    ]
+
+
+def _meilleure_duree(fonction, repetitions=3):
+    """Meilleure durée sur quelques exécutions (moins sensible au bruit qu'une mesure unique)."""
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction()
+        durees.append(time.perf_counter() - debut)
+    return min(durees)
+
+
+# ==============================================================================
+# FIXTURES
+# ==============================================================================
+
+@pytest.fixture
+def profil_equipe():
+    """Profil famille avec ECS thermodynamique, lave-linge, VE et piscine."""
+    return SimpleNamespace(
+        nom='Test',
+        profile_type='famille',
+        type_ecs='thermodynamique',
+        get_effective_dpe=lambda: 'D',
+        appareils_json=json.dumps({
+            'ecs': {'heure_optimale': 13},
+            'appareils': {
+                'lave_linge': {'present': True, 'heure_habituelle': 20, 'heure_optimale': 12},
+                'seche_linge': {'present': False},
+                'vehicule_electrique': {'present': True, 'heure_habituelle': 19, 'heure_optimale': 11},
+                'piscine': {'present': True, 'heure_habituelle': 8, 'heure_optimale': 10},
+            },
+        }),
+    )
+
+
+@pytest.fixture
+def decomposition():
+    return {
+        'chauffage': 4000.0, 'ecs': 1500.0, 'vehicule_electrique': 2000.0,
+        'piscine': 1000.0, 'cuisson': 500.0, 'electromenager': 800.0,
+        'eclairage': 300.0, 'multimedia': 400.0,
+    }
+
+
+# ==============================================================================
+# TESTS
+# ==============================================================================
+
+class TestHourlyPatternGenerator:
+    """Tests de non-régression des patterns vectorisés."""
+
+    @pytest.mark.parametrize('profile_type', PROFILS + ['inconnu'])
+    def test_patterns_occupation_identiques(self, profile_type):
+        """Chauffage, ECS et éclairage identiques aux boucles d'origine."""
+        base = ConsumptionProfiles.generate_yearly_pattern(profile_type, add_randomness=False)
+
+        np.testing.assert_array_equal(
+            hpg.modulate_heating_by_occupation(base, profile_type, 'D'),
+            _reference_heating(base, profile_type)
+        )
+        np.testing.assert_array_equal(
+            hpg.modulate_ecs_by_occupation(base, profile_type), _reference_ecs(profile_type)
+        )
+        np.testing.assert_array_equal(hpg.generate_lighting_pattern(base), _reference_eclairage(base))
+
+    @pytest.mark.parametrize('heure', [0, 2, 12, 13.5, 22, 23])
+    def test_patterns_cycles_identiques(self, heure):
+        """Appareils, VE, piscine et ECS optimisé identiques aux boucles d'origine."""
+        np.testing.assert_array_equal(
+            hpg.generate_ecs_optimized_pattern(heure), _reference_ecs_optimise(heure)
+        )
+        for appareil in ['lave_linge', 'lave_vaisselle', 'seche_linge', 'autre']:
+            for cycles in [1, 2.5, 4, 7, 10]:
+                np.testing.assert_array_equal(
+                    hpg.generate_appliance_pattern(appareil, heure, cycles),
+                    _reference_appareil(appareil, heure, cycles)
+                )
+        np.testing.assert_array_equal(
+            hpg.generate_ev_charging_pattern(heure, 1500.0), _reference_ve(heure, 1500.0)
+        )
+        np.testing.assert_array_equal(
+            hpg.generate_pool_pattern(heure, 1200.0), _reference_piscine(heure, 1200.0)
+        )
+
+    def test_appareil_sans_cycle(self):
+        """Zéro cycle par semaine → pattern nul."""
+        pattern = hpg.generate_appliance_pattern('lave_linge', 20, 0)
+
+        assert pattern.shape == (8760,)
+        assert pattern.sum() == 0
+
+    def test_profil_complet_conserve_l_energie(self, profil_equipe, decomposition):
+        """Le profil personnalisé totalise la somme des postes décomposés."""
+        for optimized in (False, True):
+            profil_horaire = hpg.generate_personalized_hourly_profile(profil_equipe, decomposition, optimized)
+            attendu = (
+                sum(decomposition.values())
+                + hpg.generate_appliance_pattern('lave_linge', 20, 3).sum()
+            )
+            assert profil_horaire.sum() == pytest.approx(attendu, rel=1e-9)
+
+    def test_benchmark_vectorisation(self):
+        """Les patterns vectorisés sont bien plus rapides que les boucles d'origine."""
+        base = ConsumptionProfiles.generate_yearly_pattern('actif_absent', add_randomness=False)
+
+        duree_boucles = _meilleure_duree(lambda: _reference_toutes(base, 'actif_absent'))
+        duree_vectorisee = _meilleure_duree(lambda: _vectorisees_toutes(base, 'actif_absent'))
+
+        # Mesuré ×20 environ ; ×3 tolère une machine chargée
+        assert duree_vectorisee * 3 < duree_boucles
+
+
+class TestScenariosHoraires:
+    """Tests de la construction des scénarios ACTUEL / OPTIMISÉ et des variantes."""
+
+    def test_dual_equivalent_a_deux_appels(self, profil_equipe, decomposition):
+        """Un seul passage donne les mêmes profils que deux appels séparés."""
+        actuel, optimise = hpg.generate_dual_hourly_profiles(profil_equipe, decomposition)
+
+        np.testing.assert_allclose(
+            actuel, hpg.generate_personalized_hourly_profile(profil_equipe, decomposition, False),
+            rtol=1e-12
+        )
+        np.testing.assert_allclose(
+            optimise, hpg.generate_personalized_hourly_profile(profil_equipe, decomposition, True),
+            rtol=1e-12
+        )
+        assert actuel.sum() == pytest.approx(optimise.sum(), rel=1e-9)
+        assert not np.allclose(actuel, optimise)
+
+    def test_variantes(self, profil_equipe, decomposition):
+        """Seuls les postes décalés d'une variante diffèrent du scénario actuel."""
+        actuel, optimise = hpg.generate_dual_hourly_profiles(profil_equipe, decomposition)
+
+        variantes = hpg.generate_hourly_profile_variants(profil_equipe, decomposition, [
+            {},
+            {'lave_linge': 12},
+            {'ecs': 13, 'lave_linge': 12, 'vehicule_electrique': 11, 'piscine': 10},
+            {'seche_linge': 12},  # Appareil absent : ignoré
+        ])
+
+        assert variantes.shape == (4, 8760)
+        np.testing.assert_allclose(variantes[0], actuel, rtol=1e-12)
+        np.testing.assert_allclose(
+            variantes[1] - variantes[0],
+            hpg.generate_appliance_pattern('lave_linge', 12, 3)
+            - hpg.generate_appliance_pattern('lave_linge', 20, 3),
+            atol=1e-12
+        )
+        np.testing.assert_allclose(variantes[2], optimise, rtol=1e-12)
+        np.testing.assert_allclose(variantes[3], actuel, rtol=1e-12)
+
+
+class TestComposantesConsommation:
+    """Tests de la matrice de consommation par poste."""
+
+    def test_matrice_egale_au_profil(self, profil_equipe, decomposition):
+        """La somme des lignes redonne le profil et chaque poste son énergie."""
+        profil_horaire = hpg.generate_personalized_hourly_profile(profil_equipe, decomposition, True)
+        composantes = hpg.generate_personalized_hourly_profile(
+            profil_equipe, decomposition, True, composantes=True
+        )
+
+        assert composantes.matrice.dtype == np.float32
+        assert composantes.matrice.shape == (len(composantes), 8760)
+        assert composantes.postes == (
+            'chauffage', 'ecs', 'lave_linge', 'vehicule_electrique', 'piscine',
+            'cuisson', 'electromenager', 'eclairage', 'multimedia',
+        )
+        np.testing.assert_allclose(composantes.total(), profil_horaire, rtol=1e-6, atol=1e-6)
+
+        energies = composantes.energie_par_poste()
+        assert energies['chauffage'] == pytest.approx(4000.0, rel=1e-6)
+        assert energies['lave_linge'] == pytest.approx(
+            hpg.generate_appliance_pattern('lave_linge', 12, 3).sum(), rel=1e-6
+        )
+
+    def test_decaler_un_poste(self, profil_equipe, decomposition):
+        """Décaler un appareil ne modifie que sa ligne et rejoint l'autre scénario."""
+        actuel = hpg.generate_personalized_hourly_profile(
+            profil_equipe, decomposition, False, composantes=True
+        )
+        optimise = hpg.generate_personalized_hourly_profile(
+            profil_equipe, decomposition, True, composantes=True
+        )
+        avant = actuel.matrice.copy()
+
+        hpg.decaler_poste(actuel, profil_equipe, decomposition, 'lave_linge', 12)
+
+        modifiees = np.flatnonzero((actuel.matrice != avant).any(axis=1))
+        assert [actuel.postes[i] for i in modifiees] == ['lave_linge']
+        np.testing.assert_array_equal(actuel.ligne('lave_linge'), optimise.ligne('lave_linge'))
+
+        for poste, heure in [('ecs', 13), ('vehicule_electrique', 11), ('piscine', 10)]:
+            hpg.decaler_poste(actuel, profil_equipe, decomposition, poste, heure)
+        np.testing.assert_array_equal(actuel.matrice, optimise.matrice)
+
+        with pytest.raises(ValueError):
+            hpg.decaler_poste(actuel, profil_equipe, decomposition, 'seche_linge', 12)
+
+    def test_autoconsommation_par_poste(self, profil_equipe, decomposition):
+        """L'autoconsommation par poste se somme à l'autoconsommation totale."""
+        composantes = hpg.generate_personalized_hourly_profile(
+            profil_equipe, decomposition, True, composantes=True
+        )
+        heures = np.arange(8760) % 24
+        production = np.clip(np.sin((heures - 6) / 12 * np.pi), 0, None) * 4.0
+
+        par_poste = composantes.autoconsommation_par_poste(production)
+        total = np.minimum(production, composantes.total()).sum()
+
+        assert sum(par_poste.values()) == pytest.approx(total, rel=1e-6)
+        for poste, kwh in par_poste.items():
+            assert 0 <= kwh <= composantes.energie_par_poste()[poste] + 1e-6
+        # La piscine décalée à 10h est presque entièrement autoconsommée
+        assert par_poste['piscine'] > par_poste['multimedia']
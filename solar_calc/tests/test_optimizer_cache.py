@@ -0,0 +1,121 @@
+"""
+Tests unitaires pour le cache des résultats d'optimisation.
+"""
+
+import json
+import os
+import zlib
+
+import django
+import pytest
+import numpy as np
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.core.cache import caches
+from django.test import override_settings
+
+from solar_calc.services import optimizer_cache
+from solar_calc.services.power_optimizer import optimize_power_all_objectives
+
+
+CACHES_TEST = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'optimisations': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'optimisations-test',
+    },
+}
+
+
+@pytest.fixture
+def flux_annuels():
+    """Production 1 kWc en cloche et consommation bruitée sur 8760 h."""
+    rng = np.random.default_rng(5)
+    heures = np.arange(8760) % 24
+    production_1kwc = np.clip(np.sin((heures - 6) / 12 * np.pi), 0, None) * 0.8
+    production_1kwc *= rng.uniform(0.3, 1.0, 8760)
+    consommation = rng.uniform(0.2, 1.2, 8760)
+    return production_1kwc, consommation
+
+
+@pytest.fixture(autouse=True)
+def cache_local():
+    with override_settings(CACHES=CACHES_TEST, OPTIMISATION_CACHE_ALIAS='optimisations'):
+        caches['optimisations'].clear()
+        yield
+        caches['optimisations'].clear()
+
+
+class TestOptimizerCache:
+    """Tests du cache adressé par contenu."""
+
+    def test_hit_renvoie_le_resultat_stocke(self, flux_annuels, monkeypatch):
+        """Le second appel saute l'optimisation et renvoie le même résultat."""
+        production_1kwc, consommation = flux_annuels
+        attendu = optimize_power_all_objectives(
+            production_1kwc, consommation, consommation.sum(), max_power=20.0
+        )
+
+        premier = optimizer_cache.optimize_power_all_objectives_cached(
+            production_1kwc, consommation, consommation.sum(), max_power=20.0
+        )
+        monkeypatch.setattr(
+            optimizer_cache, 'optimize_power_all_objectives',
+            lambda *args, **kwargs: pytest.fail("optimisation relancée malgré le cache")
+        )
+        second = optimizer_cache.optimize_power_all_objectives_cached(
+            production_1kwc, consommation.copy(), consommation.sum(), max_power=20.0
+        )
+
+        assert premier == second == attendu
+        stats = optimizer_cache.statistiques_cache()
+        assert (stats['hits'], stats['misses']) == (1, 1)
+        assert stats['taux_hit_pct'] == 50.0
+
+    def test_cle_depend_de_chaque_entree(self, flux_annuels):
+        """Météo, consommation, plage et matériel changent la clé."""
+        production_1kwc, consommation = flux_annuels
+        base = dict(
+            production_1kwc=production_1kwc, consommation_horaire=consommation,
+            consommation_annuelle=4500, objectifs=('rentabilite',), min_power=0.5,
+            max_power=12.0, step=0.5, type_onduleur='string', type_toiture='tuiles',
+        )
+        variantes = [
+            {'production_1kwc': production_1kwc * 1.01},
+            {'consommation_horaire': consommation[::-1]},
+            {'objectifs': ('autonomie',)},
+            {'max_power': 12.5},
+            {'step': 0.1},
+            {'type_onduleur': 'micro'},
+        ]
+
+        cle = optimizer_cache.cle_optimisation(**base)
+
+        assert cle == optimizer_cache.cle_optimisation(**base)
+        for variante in variantes:
+            assert optimizer_cache.cle_optimisation(**{**base, **variante}) != cle
+
+    def test_lecture_sans_reecriture(self, monkeypatch):
+        """Un hit ne réécrit rien : seuls les compteurs sont incrémentés."""
+        resultat = {'rentabilite': {'all_configs': list(range(2000))}}
+        optimizer_cache.ecrire_optimisation('optim:v1:a', resultat)
+        cache = caches['optimisations']
+        monkeypatch.setattr(cache, 'set', lambda *args, **kwargs: pytest.fail("écriture sur un hit"))
+
+        assert optimizer_cache.lire_optimisation('optim:v1:a') == resultat
+        assert optimizer_cache.lire_optimisation('optim:v1:b') is None
+        assert json.loads(zlib.decompress(cache.get('optim:v1:a'))) == resultat
+        assert optimizer_cache.statistiques_cache()['hits'] == 1
+
+    def test_cache_indisponible(self, flux_annuels):
+        """Un backend absent ne bloque pas l'optimisation."""
+        production_1kwc, consommation = flux_annuels
+
+        with override_settings(OPTIMISATION_CACHE_ALIAS='inexistant'):
+            resultats = optimizer_cache.optimize_power_all_objectives_cached(
+                production_1kwc, consommation, consommation.sum()
+            )
+
+        assert resultats['rentabilite']['best_config']
@@ -0,0 +1,196 @@
+"""
+Tests unitaires pour l'optimiseur de puissance vectorisé.
+"""
+
+import json
+
+import pytest
+import numpy as np
+
+from solar_calc.services import tarifs
+from solar_calc.services.power_optimizer import (
+    _segments_tarifaires,
+    optimize_power,
+    optimize_power_all_objectives,
+    restaurer_optimisation,
+    serialiser_optimisations,
+)
+
+
+@pytest.fixture
+def flux_annuels():
+    """Production 1 kWc en cloche et consommation bruitée sur 8760 h."""
+    rng = np.random.default_rng(3)
+    heures = np.arange(8760) % 24
+    production_1kwc = np.clip(np.sin((heures - 6) / 12 * np.pi), 0, None) * 0.8
+    production_1kwc *= rng.uniform(0.3, 1.0, 8760)
+    consommation = rng.uniform(0.2, 1.2, 8760)
+    return production_1kwc, consommation
+
+
+class TestPowerOptimizer:
+    """Tests de l'évaluation vectorielle de toutes les puissances."""
+
+    def test_grilles_vectorielles_identiques_aux_scalaires(self):
+        """Les versions tableau reproduisent les grilles tarifaires scalaires."""
+        puissances = np.round(np.arange(0.5, 150.01, 0.5), 1)
+
+        np.testing.assert_array_equal(
+            tarifs.calculer_cout_installation_array(puissances, 'micro', 'ardoise'),
+            [tarifs.calculer_cout_installation(p, 'micro', 'ardoise')['cout_total'] for p in puissances]
+        )
+        np.testing.assert_array_equal(
+            tarifs.get_tarif_injection_array(puissances),
+            [tarifs.get_tarif_injection(p) for p in puissances]
+        )
+        np.testing.assert_array_equal(
+            tarifs.get_tarif_vente_totale_array(puissances),
+            [tarifs.get_tarif_vente_totale(p) for p in puissances]
+        )
+        np.testing.assert_allclose(
+            tarifs.get_prime_autoconsommation_array(puissances),
+            [tarifs.get_prime_autoconsommation(p) for p in puissances]
+        )
+
+    def test_grille_modifiee_une_seule_fois(self, monkeypatch):
+        """Modifier une table change scalaire, tableau et version des grilles."""
+        version = tarifs.version_grilles_tarifaires()
+        monkeypatch.setattr(tarifs, 'GRILLE_TARIF_INJECTION', ((9, 100), (0.05, 0.0617, 0.0536)))
+        tarifs.version_grilles_tarifaires.cache_clear()
+        try:
+            assert tarifs.get_tarif_injection(6) == 0.05
+            assert tarifs.get_tarif_injection_array([6, 50])[0] == 0.05
+            assert tarifs.version_grilles_tarifaires() != version
+        finally:
+            tarifs.version_grilles_tarifaires.cache_clear()
+
+        assert tarifs.get_tarif_vente_totale(9) == tarifs.get_tarif_vente_totale_array([9])[0] == 0.0911
+        assert tarifs.get_tarif_vente_totale(8.9) == 0
+        assert tarifs.PALIERS_TARIFAIRES_KWC == (3, 6, 9, 12, 36, 100)
+
+    @pytest.mark.parametrize('objectif', ['rentabilite', 'autonomie', 'equilibre'])
+    def test_configurations_conformes(self, flux_annuels, objectif):
+        """Chaque configuration correspond au calcul scalaire de sa puissance."""
+        production_1kwc, consommation = flux_annuels
+
+        resultat = optimize_power(production_1kwc, consommation, consommation.sum(), objectif)
+
+        assert len(resultat['all_configs']) == 24
+        for config in resultat['all_configs'][::7]:
+            p = config['puissance_kwc']
+            autoconso = np.minimum(production_1kwc * p, consommation).sum()
+            cout_net = (
+                tarifs.calculer_cout_installation(p)['cout_total'] - tarifs.get_prime_autoconsommation(p)
+            )
+            economie = (
+                autoconso * tarifs.TARIF_ACHAT_KWH
+                + (production_1kwc.sum() * p - autoconso) * tarifs.get_tarif_injection(p)
+            )
+            assert config['autoconso_kwh'] == round(autoconso, 0)
+            assert config['cout_net'] == round(cout_net, 0)
+            assert config['roi_annees'] == round(cout_net / economie, 1)
+
+        meilleur = max(resultat['all_configs'], key=lambda c: c['score'])
+        assert resultat['best_config']['score'] == meilleur['score']
+        assert resultat['puissance_optimale'] == resultat['best_config']['puissance_kwc']
+
+    def test_revente(self, flux_annuels):
+        """La vente totale démarre à 9 kWc et maximise le bénéfice 20 ans."""
+        production_1kwc, consommation = flux_annuels
+
+        resultat = optimize_power(
+            production_1kwc, consommation, consommation.sum(), 'revente', max_power=120.0
+        )
+
+        assert resultat['all_configs'][0]['puissance_kwc'] == 9.0
+        assert resultat['best_config']['benefice_20ans'] == max(
+            c['benefice_20ans'] for c in resultat['all_configs']
+        )
+        assert resultat['best_config']['autoconso_kwh'] == 0
+
+
+class TestPowerOptimizerContinu:
+    """Tests de la recherche continue par segments tarifaires."""
+
+    def test_segments_aux_paliers(self):
+        """Les segments s'arrêtent sur les paliers et reprennent un pas plus loin."""
+        assert _segments_tarifaires(0.5, 12.0, 0.1) == [
+            (0.5, 3.0), (3.1, 6.0), (6.1, 9.0), (9.1, 12.0)
+        ]
+        # Segment vide entre 3 et 3.2 au pas de 0.5
+        assert _segments_tarifaires(2.0, 4.0, 0.5, seuils_supplementaires=(3.2,)) == [
+            (2.0, 3.0), (3.5, 4.0)
+        ]
+
+    @pytest.mark.parametrize('objectif', ['rentabilite', 'autonomie', 'equilibre'])
+    def test_meme_optimum_que_la_grille_fine(self, flux_annuels, objectif):
+        """Le meilleur score égale celui d'une grille au pas de précision."""
+        production_1kwc, consommation = flux_annuels
+        consommation = consommation * 6  # Profil tertiaire : optimum hors de la plage résidentielle
+
+        grille = optimize_power(
+            production_1kwc, consommation, consommation.sum(), objectif, max_power=150.0, step=0.1
+        )
+        continu = optimize_power(
+            production_1kwc, consommation, consommation.sum(), objectif, max_power=150.0,
+            recherche='continue', precision=0.1
+        )
+
+        assert continu['best_config']['score'] == pytest.approx(grille['best_config']['score'], abs=1e-4)
+        assert continu['best_config'].keys() == grille['best_config'].keys()
+        assert continu['evaluations'] < 100 < len(grille['all_configs'])
+
+    def test_revente_reste_en_grille(self, flux_annuels):
+        """La vente totale ignore le mode continu."""
+        production_1kwc, consommation = flux_annuels
+
+        resultat = optimize_power(
+            production_1kwc, consommation, consommation.sum(), 'revente',
+            max_power=20.0, recherche='continue'
+        )
+
+        assert 'evaluations' not in resultat
+        assert len(resultat['all_configs']) == 23
+
+
+class TestAllObjectives:
+    """Tests de l'optimisation de tous les objectifs en un passage."""
+
+    def test_identique_a_un_appel_par_objectif(self, flux_annuels):
+        """Chaque objectif reproduit exactement optimize_power."""
+        production_1kwc, consommation = flux_annuels
+
+        optima = optimize_power_all_objectives(
+            production_1kwc, consommation, consommation.sum(), max_power=40.0
+        )
+
+        assert list(optima) == ['rentabilite', 'autonomie', 'equilibre', 'revente']
+        for objectif, resultat in optima.items():
+            assert resultat == optimize_power(
+                production_1kwc, consommation, consommation.sum(), objectif, max_power=40.0
+            )
+
+    def test_revente_non_eligible(self, flux_annuels):
+        """Sous 9 kWc, la vente totale n'est pas évaluée."""
+        production_1kwc, consommation = flux_annuels
+
+        optima = optimize_power_all_objectives(
+            production_1kwc, consommation, consommation.sum(), max_power=8.0
+        )
+
+        assert 'revente' not in optima
+
+    def test_stockage_compact(self, flux_annuels):
+        """La forme stockée (JSON) restitue chaque objectif à l'identique."""
+        production_1kwc, consommation = flux_annuels
+        optima = optimize_power_all_objectives(
+            production_1kwc, consommation, consommation.sum(), max_power=40.0
+        )
+
+        donnees = json.loads(json.dumps(serialiser_optimisations(optima)))
+
+        assert len(donnees['table']) == len(optima['rentabilite']['all_configs'])
+        for objectif, resultat in optima.items():
+            assert restaurer_optimisation(donnees, objectif) == resultat
+        assert restaurer_optimisation(donnees, 'inconnu') is None
+        assert restaurer_optimisation(None, 'rentabilite') is None
@@ -0,0 +1,132 @@
+"""
+Tests unitaires pour l'optimiseur conjoint PV × batterie.
+"""
+
+import time
+
+import pytest
+import numpy as np
+
+from battery.pricing import get_battery_price
+from battery.services.dispatch import BatteryParams, simulate_dispatch
+from battery.services.sizing import STANDARD_CAPACITIES
+from solar_calc.services.pv_battery_optimizer import optimize_pv_battery
+from solar_calc.services.tarifs import (
+    TARIF_ACHAT_KWH,
+    calculer_cout_installation,
+    get_prime_autoconsommation,
+    get_tarif_injection,
+)
+
+
+@pytest.fixture
+def flux_residentiels():
+    """Production 1 kWc en cloche et consommation avec pointe du soir."""
+    rng = np.random.default_rng(7)
+    heures = np.arange(8760) % 24
+    production_1kwc = np.clip(np.sin((heures - 6) / 12 * np.pi), 0, None) * 0.75
+    production_1kwc *= rng.uniform(0.3, 1.0, 8760)
+    consommation = rng.uniform(0.2, 1.0, 8760) + 0.8 * ((heures >= 18) & (heures <= 22))
+    return production_1kwc, consommation
+
+
+def _point(production_1kwc, consommation, puissance, capacite):
+    """Coût, autonomie et ROI d'un couple, simulé isolément."""
+    production = production_1kwc * puissance
+    cout = (
+        calculer_cout_installation(puissance, 'string', 'tuiles')['cout_total']
+        - get_prime_autoconsommation(puissance)
+    )
+    if capacite:
+        resultat = simulate_dispatch(production, consommation, BatteryParams(
+            capacite_utilisable_kwh=capacite * 0.9,
+            puissance_max_kw=capacite * 0.5,
+        ))
+        autoconso = resultat['autoconso_total_kwh']
+        injection = resultat['surplus_total_kwh']
+        cout += get_battery_price(capacite)['prix_total_ttc']
+    else:
+        autoconso = float(np.minimum(production, consommation).sum())
+        injection = float(production.sum()) - autoconso
+    economie = autoconso * TARIF_ACHAT_KWH + injection * get_tarif_injection(puissance)
+    return cout, autoconso / consommation.sum() * 100, cout / economie
+
+
+def _meilleure_duree(fonction, repetitions=3):
+    """Meilleure durée sur quelques exécutions (moins sensible au bruit qu'une mesure unique)."""
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction()
+        durees.append(time.perf_counter() - debut)
+    return min(durees)
+
+
+class TestPvBatteryOptimizer:
+    """Tests de la frontière coût / autonomie / ROI."""
+
+    def test_frontiere_identique_a_la_recherche_exhaustive(self, flux_residentiels):
+        """L'élagage ne retire aucun couple de la frontière exhaustive."""
+        production_1kwc, consommation = flux_residentiels
+        puissances = [1.0, 2.0, 3.0, 4.0, 5.0, 6.0]
+        capacites = [3, 7, 13.5]
+
+        resultat = optimize_pv_battery(
+            production_1kwc, consommation,
+            min_power=1.0, max_power=6.0, step=1.0, capacites=capacites
+        )
+
+        points = {
+            (p, c): _point(production_1kwc, consommation, p, c)
+            for p in puissances for c in [0] + capacites
+        }
+        attendue = {
+            cle for cle, (cout, autonomie, roi) in points.items()
+            if not any(
+                o_cout <= cout and o_auto >= autonomie and o_roi <= roi
+                and (o_cout, o_auto, o_roi) != (cout, autonomie, roi)
+                for o_cout, o_auto, o_roi in points.values()
+            )
+        }
+        frontiere = {(c['puissance_kwc'], c['capacite_batterie_kwh']) for c in resultat['frontiere']}
+
+        assert frontiere == attendue
+        assert resultat['nb_configurations'] == 6 * 4
+
+    def test_valeurs_conformes_a_une_simulation_isolee(self, flux_residentiels):
+        """Chaque point de la frontière correspond à sa simulation isolée."""
+        production_1kwc, consommation = flux_residentiels
+
+        resultat = optimize_pv_battery(production_1kwc, consommation, max_power=6.0)
+
+        for config in resultat['frontiere'][::5]:
+            cout, autonomie, roi = _point(
+                production_1kwc, consommation,
+                config['puissance_kwc'], config['capacite_batterie_kwh']
+            )
+            assert config['cout_total'] == pytest.approx(cout, abs=0.5)
+            assert config['autoprod_ratio'] == pytest.approx(autonomie, abs=0.05)
+            assert config['roi_annees'] == pytest.approx(roi, abs=0.05)
+
+        couts = [c['cout_total'] for c in resultat['frontiere']]
+        assert couts == sorted(couts)
+        assert resultat['meilleure_autonomie']['capacite_batterie_kwh'] > 0
+
+    def test_performance_residentielle(self, flux_residentiels):
+        """24 puissances × 7 capacités : nettement plus rapide que la recherche exhaustive."""
+        production_1kwc, consommation = flux_residentiels
+        puissances = np.round(np.arange(0.5, 12.0 + 0.25, 0.5), 1)
+
+        def exhaustive():
+            for puissance in puissances:
+                for capacite in [0] + STANDARD_CAPACITIES:
+                    _point(production_1kwc, consommation, puissance, capacite)
+
+        resultat = optimize_pv_battery(production_1kwc, consommation)
+        duree_exhaustive = _meilleure_duree(exhaustive, repetitions=2)
+        duree_optimiseur = _meilleure_duree(lambda: optimize_pv_battery(production_1kwc, consommation))
+
+        assert resultat['nb_configurations'] == 24 * 7
+        assert resultat['nb_elaguees'] > 0
+        # Mesuré ×4 environ ; ×1,5 tolère une machine chargée
+        assert duree_optimiseur * 1.5 < duree_exhaustive
@@ -0,0 +1,53 @@
+"""
+Tests unitaires pour le calendrier TMY partagé.
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+
+from solar_calc import tmy_calendar as cal
+
+
+class TestTmyCalendar:
+    """Tests des index précalculés sur 8760 heures."""
+
+    def test_mois_identiques_a_date_range(self):
+        """Les mois et heures correspondent à un pd.date_range non bissextile."""
+        dates = pd.date_range('2023-01-01', periods=8760, freq='h')
+
+        np.testing.assert_array_equal(cal.MOIS_PAR_HEURE, dates.month)
+        np.testing.assert_array_equal(cal.HEURE_DU_JOUR, dates.hour)
+        assert cal.DEBUT_MOIS_HEURE[-1] == 8760 - 31 * 24
+
+    def test_somme_mensuelle_et_moyenne_horaire(self):
+        """Les agrégations équivalent aux groupby pandas."""
+        rng = np.random.default_rng(0)
+        valeurs = rng.uniform(0, 3, 8760)
+        df = pd.DataFrame({
+            'v': valeurs,
+            'month': cal.MOIS_PAR_HEURE,
+            'hour': cal.HEURE_DU_JOUR,
+        })
+
+        np.testing.assert_allclose(cal.somme_mensuelle(valeurs), df.groupby('month')['v'].sum())
+        np.testing.assert_allclose(cal.moyenne_horaire(valeurs), df.groupby('hour')['v'].mean())
+        assert cal.somme_mensuelle(np.stack([valeurs, valeurs])).shape == (2, 12)
+
+    def test_masques(self):
+        """Week-ends, jours fériés et saisons."""
+        assert cal.MASQUE_WEEKEND.sum() == 104 * 24  # 52 semaines + 1 lundi
+        assert cal.MASQUE_FERIES.sum() == len(cal.JOURS_FERIES) * 24
+        assert cal.MASQUE_FERIES[(31 + 28 + 31 + 30) * 24]  # 1er mai
+        assert cal.masque_saison('ete').sum() == (30 + 31 + 31) * 24
+        np.testing.assert_array_equal(
+            cal.masque_mois(6, 7, 8, approx=True),
+            np.isin((np.arange(8760) // 730) % 12 + 1, [6, 7, 8])
+        )
+
+    def test_tableaux_en_lecture_seule(self):
+        """Les tableaux partagés ne peuvent pas être modifiés par un appelant."""
+        with pytest.raises(ValueError):
+            cal.MOIS_PAR_HEURE[0] = 5
+        with pytest.raises(ValueError):
+            cal.masque_heures(12)[0] = True
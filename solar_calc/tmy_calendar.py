@@ -0,0 +1,188 @@
+"""
+Calendrier de l'année météo type (TMY) : index précalculés pour les 8760 heures.
+
+Toutes les agrégations (mensuelles, profil moyen 24h) et modulations
+(saisons, heures de la journée, week-ends, jours fériés) sur une année
+horaire s'appuient sur ces tableaux plutôt que sur des pd.date_range
+recalculés à chaque appel.
+
+Conventions :
+- Année non bissextile de 365 jours, heure 0 = 1er janvier 0h
+- Jour 0 = lundi (convention de ConsumptionProfiles)
+- Tous les tableaux exposés sont en lecture seule
+
+App Django: solar_calc
+"""
+
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+
+def _lecture_seule(tableau: np.ndarray) -> np.ndarray:
+    """Verrouille un tableau partagé contre toute modification en place."""
+    tableau.setflags(write=False)
+    return tableau
+
+
+# ==============================================================================
+# DIMENSIONS
+# ==============================================================================
+
+HEURES_PAR_JOUR = 24
+JOURS_PAR_AN = 365
+HEURES_PAR_AN = JOURS_PAR_AN * HEURES_PAR_JOUR  # 8760
+
+JOURS_PAR_MOIS = _lecture_seule(np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]))
+
+
+# ==============================================================================
+# INDEX PAR HEURE
+# ==============================================================================
+
+# Indice de la première heure de chaque mois (bornes pour np.add.reduceat)
+DEBUT_MOIS_HEURE = _lecture_seule(
+    np.concatenate(([0], np.cumsum(JOURS_PAR_MOIS * HEURES_PAR_JOUR)[:-1]))
+)
+
+# Mois calendaire (1-12) de chaque heure
+MOIS_PAR_HEURE = _lecture_seule(np.repeat(np.arange(1, 13), JOURS_PAR_MOIS * HEURES_PAR_JOUR))
+
+# Mois approximatif (1-12) en blocs de 730 h, convention historique des
+# générateurs de patterns horaires (hourly_pattern_generator)
+MOIS_APPROX_PAR_HEURE = _lecture_seule((np.arange(HEURES_PAR_AN) // 730) % 12 + 1)
+
+# Heure de la journée (0-23) de chaque heure
+HEURE_DU_JOUR = _lecture_seule(np.tile(np.arange(HEURES_PAR_JOUR), JOURS_PAR_AN))
+
+# Jour de l'année (0-364) de chaque heure
+JOUR_PAR_HEURE = _lecture_seule(np.repeat(np.arange(JOURS_PAR_AN), HEURES_PAR_JOUR))
+
+
+# ==============================================================================
+# INDEX PAR JOUR
+# ==============================================================================
+
+# Jour de la semaine (0 = lundi ... 6 = dimanche) de chaque jour de l'année
+JOUR_SEMAINE = _lecture_seule(np.arange(JOURS_PAR_AN) % 7)
+
+# Week-end (samedi, dimanche) par jour et par heure
+WEEKEND_PAR_JOUR = _lecture_seule(JOUR_SEMAINE >= 5)
+MASQUE_WEEKEND = _lecture_seule(np.repeat(WEEKEND_PAR_JOUR, HEURES_PAR_JOUR))
+
+# Jours fériés français à date fixe (mois, jour) — les fêtes mobiles
+# (Pâques, Ascension, Pentecôte) n'ont pas de date stable sur une année type
+JOURS_FERIES = (
+    (1, 1),    # Jour de l'an
+    (5, 1),    # Fête du travail
+    (5, 8),    # Victoire 1945
+    (7, 14),   # Fête nationale
+    (8, 15),   # Assomption
+    (11, 1),   # Toussaint
+    (11, 11),  # Armistice
+    (12, 25),  # Noël
+)
+
+_DEBUT_MOIS_JOUR = np.concatenate(([0], np.cumsum(JOURS_PAR_MOIS)[:-1]))
+
+FERIE_PAR_JOUR = np.zeros(JOURS_PAR_AN, dtype=bool)
+FERIE_PAR_JOUR[[_DEBUT_MOIS_JOUR[mois - 1] + jour - 1 for mois, jour in JOURS_FERIES]] = True
+FERIE_PAR_JOUR = _lecture_seule(FERIE_PAR_JOUR)
+MASQUE_FERIES = _lecture_seule(np.repeat(FERIE_PAR_JOUR, HEURES_PAR_JOUR))
+
+
+# ==============================================================================
+# SAISONS
+# ==============================================================================
+
+SAISONS = {
+    'hiver': (12, 1, 2),
+    'printemps': (3, 4, 5),
+    'ete': (6, 7, 8),
+    'automne': (9, 10, 11),
+}
+
+
+@lru_cache(maxsize=None)
+def masque_mois(*mois: int, approx: bool = False) -> np.ndarray:
+    """
+    Masque horaire (8760 booléens) des heures appartenant aux mois donnés.
+
+    Args:
+        *mois: Numéros de mois (1-12)
+        approx: Si True, utilise les mois approximatifs de 730 h
+
+    Returns:
+        np.ndarray: Masque en lecture seule (mis en cache)
+
+    Example:
+        >>> hiver = masque_mois(11, 12, 1, 2, 3)
+        >>> pattern[hiver] *= 2.0
+    """
+    reference = MOIS_APPROX_PAR_HEURE if approx else MOIS_PAR_HEURE
+    return _lecture_seule(np.isin(reference, mois))
+
+
+@lru_cache(maxsize=None)
+def masque_saison(saison: str) -> np.ndarray:
+    """Masque horaire d'une saison météorologique ('hiver', 'printemps', 'ete', 'automne')."""
+    return masque_mois(*SAISONS[saison])
+
+
+@lru_cache(maxsize=None)
+def masque_heures(*heures: int) -> np.ndarray:
+    """
+    Masque horaire (8760 booléens) des heures de la journée données.
+
+    Example:
+        >>> journee = masque_heures(*range(9, 18))
+    """
+    return _lecture_seule(np.isin(HEURE_DU_JOUR, heures))
+
+
+@lru_cache(maxsize=4)
+def index_temporel(annee: int = 2023) -> pd.DatetimeIndex:
+    """
+    Index horaire (8760 pas) démarrant au 1er janvier de l'année donnée.
+
+    Réservé aux sorties qui exigent des timestamps (DataFrames exportés) :
+    les calculs doivent utiliser les index numériques ci-dessus.
+    """
+    return pd.date_range(start=f'{annee}-01-01', periods=HEURES_PAR_AN, freq='h')
+
+
+# ==============================================================================
+# AGRÉGATIONS
+# ==============================================================================
+
+def somme_mensuelle(valeurs) -> np.ndarray:
+    """
+    Totaux mensuels d'une ou plusieurs séries horaires.
+
+    Args:
+        valeurs: Série (8760,) ou matrice (..., 8760)
+
+    Returns:
+        np.ndarray: 12 totaux (ou (..., 12))
+    """
+    return np.add.reduceat(np.asarray(valeurs, dtype=np.float64), DEBUT_MOIS_HEURE, axis=-1)
+
+
+def moyenne_horaire(valeurs) -> np.ndarray:
+    """
+    Profil moyen sur 24 h d'une ou plusieurs séries horaires.
+
+    Args:
+        valeurs: Série (8760,) ou matrice (..., 8760)
+
+    Returns:
+        np.ndarray: 24 moyennes (ou (..., 24))
+    """
+    valeurs = np.asarray(valeurs, dtype=np.float64)
+    return valeurs.reshape(valeurs.shape[:-1] + (JOURS_PAR_AN, HEURES_PAR_JOUR)).mean(axis=-2)
+
+
+def vue_journaliere(valeurs: np.ndarray) -> np.ndarray:
+    """Vue (365, 24) d'une série horaire de 8760 valeurs (sans copie si contiguë)."""
+    return np.asarray(valeurs).reshape(JOURS_PAR_AN, HEURES_PAR_JOUR)
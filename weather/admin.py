@@ -28,7 +28,7 @@ class PVGISDataAdmin(admin.ModelAdmin):
     ]
     list_filter = ['database', 'is_valid', 'created_at']
     search_fields = ['location__nom']
-    readonly_fields = ['created_at']
+    readonly_fields = ['created_at', 'resume_donnees']
     
     fieldsets = (
         ('Localisation', {
@@ -43,8 +43,8 @@ class PVGISDataAdmin(admin.ModelAdmin):
         ('Cache', {
             'fields': ('is_valid', 'expires_at')
         }),
-        ('Données brutes', {
-            'fields': ('raw_data',),
+        ('Données', {
+            'fields': ('resume_donnees',),
             'classes': ('collapse',)
         }),
         ('Métadonnées', {
@@ -52,6 +52,18 @@ class PVGISDataAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+    
+    @admin.display(description="Données horaires")
+    def resume_donnees(self, obj):
+        """Taille et colonnes du blob, sans l'afficher."""
+        if not obj.donnees_horaires:
+            return "-"
+        horodatages, colonnes = obj.get_colonnes()
+        brut = f"{len(obj.raw_data_zlib) / 1024:.0f} Ko" if obj.raw_data_zlib else "non conservé"
+        return (
+            f"{len(horodatages)} h × {len(colonnes)} colonnes ({', '.join(colonnes)}) - "
+            f"{len(obj.donnees_horaires) / 1024:.0f} Ko ; JSON brut : {brut}"
+        )
 
 
 @admin.register(WeatherData)
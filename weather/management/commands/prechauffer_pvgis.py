@@ -0,0 +1,179 @@
+# weather/management/commands/prechauffer_pvgis.py
+"""
+Commande Django pour préchauffer le cache PVGIS d'une liste de lieux ou d'une région.
+
+Usage:
+    python manage.py prechauffer_pvgis --points 45.75,4.85 43.30,5.37
+    python manage.py prechauffer_pvgis --bbox 45.6 4.7 45.9 5.0 --pas-km 5
+    python manage.py prechauffer_pvgis --csv codes_postaux.csv --concurrence 8
+    python manage.py prechauffer_pvgis --bbox ... --journal echecs.jsonl  # Reprise sans retenter les points en mer
+
+Relancer la même commande reprend là où elle s'était arrêtée : les lieux
+déjà en cache (ou couverts par un voisin) sont sautés.
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from weather.services.prechauffage import (
+    lire_journal,
+    points_csv,
+    points_grille,
+    prechauffer,
+    selectionner_points,
+)
+from weather.services.pvgis import RAYON_REUTILISATION_KM_DEFAUT, cle_localisation
+
+
+class Command(BaseCommand):
+    help = 'Télécharge en masse les données TMY PVGIS manquantes (liste, boîte englobante ou CSV)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--points',
+            nargs='+',
+            metavar='LAT,LON',
+            help='Liste de coordonnées "latitude,longitude"',
+        )
+        parser.add_argument(
+            '--bbox',
+            nargs=4,
+            type=float,
+            metavar=('LAT_MIN', 'LON_MIN', 'LAT_MAX', 'LON_MAX'),
+            help='Boîte englobante à quadriller',
+        )
+        parser.add_argument(
+            '--pas-km',
+            type=float,
+            default=5.0,
+            help='Pas de la grille pour --bbox (km, défaut 5)',
+        )
+        parser.add_argument(
+            '--csv',
+            help='CSV avec colonnes latitude/longitude (ex. codes postaux)',
+        )
+        parser.add_argument(
+            '--concurrence',
+            type=int,
+            default=4,
+            help='Appels PVGIS simultanés (défaut 4)',
+        )
+        parser.add_argument(
+            '--tentatives',
+            type=int,
+            default=3,
+            help='Appels maximum par lieu (défaut 3)',
+        )
+        parser.add_argument(
+            '--backoff',
+            type=float,
+            default=2.0,
+            help='Attente initiale entre deux tentatives, doublée ensuite (secondes, défaut 2)',
+        )
+        parser.add_argument(
+            '--lot',
+            type=int,
+            default=50,
+            help='Lignes écrites par transaction (défaut 50)',
+        )
+        parser.add_argument(
+            '--rayon-km',
+            type=float,
+            default=None,
+            help='Rayon de réutilisation d\'un cache voisin (défaut : PVGIS_RAYON_REUTILISATION_KM)',
+        )
+        parser.add_argument(
+            '--cache-days',
+            type=int,
+            default=30,
+            help='Durée de validité du cache écrit (jours, défaut 30)',
+        )
+        parser.add_argument(
+            '--url-base',
+            default=None,
+            help='URL de base de l\'API (miroir ou stub local)',
+        )
+        parser.add_argument(
+            '--journal',
+            default=None,
+            help='Fichier JSON lines des échecs définitifs (sautés à la reprise)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Affiche les lieux à télécharger sans appeler l\'API',
+        )
+
+    def handle(self, *args, **options):
+        points = self.lire_points(options)
+        if not points:
+            raise CommandError("Aucun lieu : utiliser --points, --bbox ou --csv")
+        if options['concurrence'] < 1 or options['tentatives'] < 1 or options['lot'] < 1:
+            raise CommandError("--concurrence, --tentatives et --lot doivent être ≥ 1")
+
+        self.stdout.write(f"📍 {len(points)} lieu(x) demandé(s)")
+
+        if options['dry_run']:
+            rayon_km = options['rayon_km']
+            if rayon_km is None:
+                rayon_km = getattr(settings, 'PVGIS_RAYON_REUTILISATION_KM', RAYON_REUTILISATION_KM_DEFAUT)
+            retenus = selectionner_points(points, rayon_km, lire_journal(options['journal']))
+            self.stdout.write(self.style.WARNING(f"🔍 {len(retenus)} lieu(x) à télécharger (dry-run)"))
+            for latitude, longitude in retenus:
+                self.stdout.write(f"  {latitude:.4f},{longitude:.4f}")
+            return
+
+        rapport = prechauffer(
+            points,
+            concurrence=options['concurrence'],
+            tentatives=options['tentatives'],
+            backoff_s=options['backoff'],
+            taille_lot=options['lot'],
+            cache_days=options['cache_days'],
+            rayon_km=options['rayon_km'],
+            base_url=options['url_base'],
+            journal=options['journal'],
+            progression=self.afficher_progression,
+        )
+        self.afficher_rapport(rapport)
+
+    def lire_points(self, options):
+        """Lieux demandés, toutes sources confondues."""
+        points = []
+        try:
+            for texte in options['points'] or []:
+                latitude, longitude = (float(v) for v in texte.split(','))
+                points.append(cle_localisation(latitude, longitude))
+            if options['bbox']:
+                points += points_grille(*options['bbox'], pas_km=options['pas_km'])
+            if options['csv']:
+                points += points_csv(options['csv'])
+        except (ValueError, OSError) as e:
+            raise CommandError(f"Lieux invalides : {e}")
+        return points
+
+    def afficher_progression(self, rapport):
+        self.stdout.write(
+            f"  💾 {rapport.telecharges}/{rapport.a_telecharger} écrits, "
+            f"{len(rapport.echecs)} échec(s), {rapport.debit_par_minute:.0f} lieux/min"
+        )
+
+    def afficher_rapport(self, rapport):
+        resume = rapport.resume()
+        self.stdout.write(
+            f"♻️ Déjà en cache : {resume['deja_en_cache']} | voisins ou doublons : "
+            f"{resume['voisins_dans_le_lot']} | journalisés : {resume['journalises']}"
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ {resume['telecharges']} lieu(x) téléchargé(s) en {resume['duree_s']} s "
+                f"({resume['debit_par_minute']} lieux/min, {resume['tentatives']} appels, "
+                f"{resume['octets'] / 1024:.0f} Ko)"
+            )
+        )
+        if rapport.echecs:
+            self.stdout.write(self.style.ERROR(f"❌ {len(rapport.echecs)} échec(s) :"))
+            for latitude, longitude, erreur in rapport.echecs[:20]:
+                self.stdout.write(f"  {latitude:.4f},{longitude:.4f} : {erreur}")
+            if len(rapport.echecs) > 20:
+                self.stdout.write(f"  ... et {len(rapport.echecs) - 20} autre(s)")
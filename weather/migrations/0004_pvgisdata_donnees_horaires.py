@@ -0,0 +1,141 @@
+# Generated by Django 4.2.18 on 2026-10-16 21:10
+
+import json
+import struct
+import zlib
+
+import numpy as np
+import pandas as pd
+from django.db import migrations, models
+
+
+# Copies figées de PVGISClient.parse_tmy_to_dataframe et de encode_tmy
+# (format TMY1) à la date de la migration : une évolution ultérieure du
+# client ou du format de blob ne doit pas changer ce qu'elle écrit.
+
+_COLONNES_PVGIS = {
+    "G(h)": "ghi",
+    "Gb(n)": "dni",
+    "Gd(h)": "dhi",
+    "T2m": "temperature",
+    "WS10m": "vitesse_vent",
+    "RH": "humidite",
+    "SP": "pression",
+    "WD10m": "direction_vent",
+    "IR(h)": "infrarouge",
+}
+_COLONNES_CONSERVEES = [
+    "ghi", "dni", "dhi", "temperature", "vitesse_vent", "humidite", "pression", "direction_vent",
+]
+
+
+def _parser_tmy(tmy_data):
+    """Réponse /tmy → DataFrame 'timestamp' + colonnes normalisées."""
+    sorties = tmy_data.get("outputs", {})
+    horaires = sorties.get("tmy_hourly") or sorties.get("hourly")
+    if not horaires:
+        raise ValueError("Pas de données horaires dans la réponse PVGIS")
+
+    df = pd.DataFrame(horaires)
+    if "time(UTC)" in df.columns:
+        df["timestamp"] = pd.to_datetime(df["time(UTC)"], format="%Y%m%d:%H%M", errors="coerce")
+        if df["timestamp"].isna().all():
+            df["timestamp"] = pd.to_datetime(df["time(UTC)"], errors="coerce")
+    elif all(col in df.columns for col in ["year", "month", "day", "hour"]):
+        df["timestamp"] = pd.to_datetime(df[["year", "month", "day", "hour"]])
+    else:
+        df["timestamp"] = pd.date_range(start="2005-01-01 00:00", periods=len(df), freq="h")
+
+    df = df.rename(columns={k: v for k, v in _COLONNES_PVGIS.items() if k in df.columns})
+    return df[["timestamp"] + [col for col in _COLONNES_CONSERVEES if col in df.columns]]
+
+
+def _encoder_tmy(df):
+    """Blob TMY1 : en-tête, noms, zlib(secondes en différences int64 | colonnes float32)."""
+    colonnes = [col for col in df.columns if col != "timestamp"]
+    noms = ",".join(colonnes).encode("ascii")
+
+    secondes = df["timestamp"].to_numpy(dtype="datetime64[s]").view(np.int64)
+    differences = np.diff(secondes, prepend=np.int64(0)).astype("<i8")
+
+    table = np.empty((len(colonnes), len(df)), dtype="<f4")
+    for i, col in enumerate(colonnes):
+        table[i] = df[col].to_numpy(dtype=np.float64)
+
+    contenu = zlib.compress(differences.tobytes() + table.tobytes(), 6)
+    return struct.pack("<4sIH", b"TMY1", len(df), len(noms)) + noms + contenu
+
+
+def json_vers_colonnes(apps, schema_editor):
+    """Parse une dernière fois chaque réponse JSON en cache et l'encode en colonnes."""
+    PVGISData = apps.get_model("weather", "PVGISData")
+
+    illisibles = []
+    for cache in PVGISData.objects.iterator():
+        try:
+            df = _parser_tmy(json.loads(cache.raw_data))
+        except Exception:
+            illisibles.append(cache.pk)
+            continue
+        cache.donnees_horaires = _encoder_tmy(df)
+        # La réponse existante est conservée (compressée) pour rester réversible
+        cache.raw_data_zlib = zlib.compress(cache.raw_data.encode(), 6)
+        cache.raw_data = ""
+        cache.save(update_fields=["donnees_horaires", "raw_data_zlib", "raw_data"])
+
+    # Cache illisible : il sera reconstruit au prochain appel
+    PVGISData.objects.filter(pk__in=illisibles).delete()
+
+
+def colonnes_vers_json(apps, schema_editor):
+    """Retour arrière : restaure le JSON brut ; les lignes sans JSON conservé sont supprimées."""
+    PVGISData = apps.get_model("weather", "PVGISData")
+
+    sans_json = []
+    for cache in PVGISData.objects.iterator():
+        if not cache.raw_data_zlib:
+            sans_json.append(cache.pk)
+            continue
+        cache.raw_data = zlib.decompress(bytes(cache.raw_data_zlib)).decode()
+        cache.save(update_fields=["raw_data"])
+
+    PVGISData.objects.filter(pk__in=sans_json).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("weather", "0003_alter_apicache_id_alter_location_id_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="pvgisdata",
+            name="donnees_horaires",
+            field=models.BinaryField(
+                default=b"",
+                help_text="timestamp, ghi, dni, dhi, temperature... (float32 par colonne, zlib)",
+                verbose_name="Données horaires",
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="pvgisdata",
+            name="raw_data_zlib",
+            field=models.BinaryField(
+                blank=True, null=True, verbose_name="Données JSON brutes (zlib)"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="pvgisdata",
+            name="raw_data",
+            field=models.TextField(
+                blank=True, default="", verbose_name="Données JSON brutes"
+            ),
+        ),
+        migrations.RunPython(json_vers_colonnes, colonnes_vers_json),
+        migrations.RemoveField(
+            model_name="pvgisdata",
+            name="raw_data",
+        ),
+    ]
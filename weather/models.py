@@ -5,8 +5,14 @@ Stockage des données météorologiques et cache des appels API.
 """
 
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.core.validators import MinValueValidator, MaxValueValidator
 import json
+import zlib
+
+from .services.pvgis import invalider_cache_meteo
+from .services.tmy_storage import decode_tmy, tmy_vers_dataframe
 
 
 class Location(models.Model):
@@ -79,9 +85,17 @@ class PVGISData(models.Model):
         verbose_name="Année max"
     )
     
-    # Données brutes (JSON)
-    raw_data = models.TextField(
-        verbose_name="Données JSON brutes"
+    # Colonnes horaires normalisées (blob colonnaire, cf. services/tmy_storage.py)
+    donnees_horaires = models.BinaryField(
+        verbose_name="Données horaires",
+        help_text="timestamp, ghi, dni, dhi, temperature... (float32 par colonne, zlib)"
+    )
+    
+    # Réponse brute PVGIS (optionnelle, cf. PVGIS_CONSERVER_JSON_BRUT)
+    raw_data_zlib = models.BinaryField(
+        null=True,
+        blank=True,
+        verbose_name="Données JSON brutes (zlib)"
     )
     
     # Statistiques
@@ -119,11 +133,32 @@ class PVGISData(models.Model):
         return f"PVGIS - {self.location} ({self.created_at.strftime('%Y-%m-%d')})"
     
     def get_data_dict(self):
-        """Retourne les données parsées en dict."""
+        """Retourne la réponse brute PVGIS en dict (None si non conservée)."""
+        if not self.raw_data_zlib:
+            return None
         try:
-            return json.loads(self.raw_data)
-        except json.JSONDecodeError:
+            return json.loads(zlib.decompress(bytes(self.raw_data_zlib)))
+        except (zlib.error, json.JSONDecodeError):
             return None
+    
+    def get_colonnes(self):
+        """
+        Décode les données horaires, sans aucun parsing.
+        
+        Returns:
+            (horodatages, {colonne: série float32}) en lecture seule
+        """
+        return decode_tmy(self.donnees_horaires)
+    
+    def get_dataframe(self):
+        """Retourne les données horaires au format de PVGISClient.parse_tmy_to_dataframe."""
+        return tmy_vers_dataframe(*self.get_colonnes())
+
+
+@receiver([post_save, post_delete], sender=PVGISData)
+def invalider_cache_memoire_pvgis(sender, instance, **kwargs):
+    """Une ligne PVGISData créée, modifiée ou supprimée n'est plus servie par le cache mémoire."""
+    invalider_cache_meteo(instance.location_id)
 
 
 class WeatherData(models.Model):
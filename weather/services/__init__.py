@@ -7,6 +7,8 @@ from .pvgis import (
     fetch_pvgis_data_with_cache,
     get_pvgis_weather_data,
     get_normalized_weather_data,  # ← AJOUTÉ
+    invalider_cache_meteo,
+    statistiques_cache_meteo,
 )
 
 __all__ = [
@@ -14,4 +16,6 @@ __all__ = [
     'fetch_pvgis_data_with_cache',
     'get_pvgis_weather_data',      # Ancien (rétrocompatibilité)
     'get_normalized_weather_data',  # ← AJOUTÉ (nouveau avec contrat)
+    'invalider_cache_meteo',
+    'statistiques_cache_meteo',
 ]
\ No newline at end of file
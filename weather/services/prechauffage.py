@@ -0,0 +1,424 @@
+"""
+Préchauffage du cache PVGIS sur une liste de lieux ou une région.
+weather/services/prechauffage.py
+
+Utilisé par `python manage.py prechauffer_pvgis` avant une campagne :
+1. Les lieux demandés (liste, grille d'une boîte englobante ou CSV) sont
+   dédoublonnés : un lieu couvert par un cache valide, ou à moins de
+   PVGIS_RAYON_REUTILISATION_KM d'un lieu déjà retenu, est sauté ;
+2. Les données TMY manquantes sont téléchargées en parallèle (concurrence
+   bornée, session HTTP partagée, reprises avec backoff exponentiel sur
+   les erreurs réseau, 429 et 5xx) ;
+3. Les lignes PVGISData sont écrites par lots (bulk_create) depuis le
+   thread principal.
+
+Les lots sont validés au fil de l'eau : relancer la commande après une
+interruption reprend là où elle s'était arrêtée. Les échecs définitifs
+(4xx, ex. point en mer) peuvent être journalisés pour ne pas être retentés.
+"""
+
+import csv
+import json
+import logging
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import timedelta
+from itertools import islice
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+
+from .proximite import KM_PAR_DEGRE, distance_km, voisin_le_plus_proche
+from .pvgis import (
+    RAYON_REUTILISATION_KM_DEFAUT,
+    PVGISClient,
+    cle_localisation,
+    invalider_cache_meteo,
+    preparer_cache_pvgis,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+Point = Tuple[float, float]
+
+
+# ==============================================================================
+# RÉSULTATS
+# ==============================================================================
+
+@dataclass
+class ResultatPoint:
+    """Téléchargement d'un lieu (champs PVGISData prêts à écrire si succès)."""
+    latitude: float
+    longitude: float
+    tentatives: int
+    champs: Optional[Dict] = None
+    erreur: Optional[str] = None
+    definitif: bool = False
+
+    @property
+    def succes(self) -> bool:
+        return self.champs is not None
+
+
+@dataclass
+class RapportPrechauffage:
+    """Bilan d'un préchauffage."""
+    demandes: int = 0
+    deja_en_cache: int = 0
+    voisins_dans_le_lot: int = 0
+    journalises: int = 0
+    telecharges: int = 0
+    tentatives: int = 0
+    octets: int = 0
+    duree_s: float = 0.0
+    echecs: List[Tuple[float, float, str]] = field(default_factory=list)
+
+    @property
+    def a_telecharger(self) -> int:
+        return self.demandes - self.deja_en_cache - self.voisins_dans_le_lot - self.journalises
+
+    @property
+    def debit_par_minute(self) -> float:
+        """Lieux téléchargés par minute."""
+        return self.telecharges / self.duree_s * 60 if self.duree_s > 0 else 0.0
+
+    def resume(self) -> Dict:
+        return {
+            'demandes': self.demandes,
+            'deja_en_cache': self.deja_en_cache,
+            'voisins_dans_le_lot': self.voisins_dans_le_lot,
+            'journalises': self.journalises,
+            'telecharges': self.telecharges,
+            'echecs': len(self.echecs),
+            'tentatives': self.tentatives,
+            'octets': self.octets,
+            'duree_s': round(self.duree_s, 1),
+            'debit_par_minute': round(self.debit_par_minute, 1),
+        }
+
+
+# ==============================================================================
+# LIEUX DEMANDÉS
+# ==============================================================================
+
+def points_grille(
+    lat_min: float,
+    lon_min: float,
+    lat_max: float,
+    lon_max: float,
+    pas_km: float
+) -> List[Point]:
+    """
+    Grille régulière (en km) couvrant une boîte englobante.
+
+    Le pas en longitude est corrigé par cos(latitude) sur chaque rangée
+    pour garder un espacement de `pas_km` sur le terrain.
+
+    Returns:
+        list: [(latitude, longitude)] arrondis comme Location
+    """
+    if pas_km <= 0:
+        raise ValueError(f"Pas de grille invalide : {pas_km} km")
+    if lat_min > lat_max or lon_min > lon_max:
+        raise ValueError("Boîte englobante invalide (min > max)")
+
+    pas_lat = pas_km / KM_PAR_DEGRE
+    points = []
+    for latitude in np.arange(lat_min, lat_max + pas_lat / 2, pas_lat):
+        pas_lon = pas_km / (KM_PAR_DEGRE * max(np.cos(np.radians(latitude)), 1e-6))
+        for longitude in np.arange(lon_min, lon_max + pas_lon / 2, pas_lon):
+            points.append(cle_localisation(float(latitude), float(longitude)))
+    return points
+
+
+def points_csv(chemin: str) -> List[Point]:
+    """
+    Lieux d'un CSV (ex. codes postaux) avec colonnes latitude/longitude (ou lat/lon).
+
+    Les lignes sans coordonnées exploitables sont ignorées (avec un avertissement).
+
+    Raises:
+        ValueError: Colonnes de coordonnées absentes
+    """
+    with open(chemin, newline='', encoding='utf-8-sig') as fichier:
+        lecteur = csv.DictReader(fichier, delimiter=_separateur(fichier))
+        colonnes = {nom.strip().lower(): nom for nom in (lecteur.fieldnames or [])}
+        col_lat = colonnes.get('latitude') or colonnes.get('lat')
+        col_lon = colonnes.get('longitude') or colonnes.get('lon')
+        if not col_lat or not col_lon:
+            raise ValueError(f"Colonnes latitude/longitude absentes de {chemin} ({lecteur.fieldnames})")
+
+        points = []
+        for numero, ligne in enumerate(lecteur, start=2):
+            try:
+                latitude = float(ligne[col_lat].replace(',', '.'))
+                longitude = float(ligne[col_lon].replace(',', '.'))
+            except (AttributeError, ValueError):
+                logger.warning(f"⚠️ {chemin}:{numero} ignorée (coordonnées invalides)")
+                continue
+            points.append(cle_localisation(latitude, longitude))
+    return points
+
+
+def _separateur(fichier) -> str:
+    """Virgule ou point-virgule (export Excel français)."""
+    entete = fichier.readline()
+    fichier.seek(0)
+    return ';' if entete.count(';') > entete.count(',') else ','
+
+
+def selectionner_points(
+    points: Iterable[Point],
+    rayon_km: float,
+    exclus: Iterable[Point] = (),
+    rapport: Optional[RapportPrechauffage] = None
+) -> List[Point]:
+    """
+    Lieux à télécharger, dans l'ordre demandé.
+
+    Sont écartés : les doublons, les lieux de `exclus` (journal des échecs
+    définitifs), ceux couverts par un cache valide dans le rayon et ceux à
+    moins de `rayon_km` d'un lieu déjà retenu (servis ensuite par le voisin).
+    """
+    rapport = rapport if rapport is not None else RapportPrechauffage()
+    exclus = set(exclus)
+    retenus: List[Point] = []
+    vus = set()
+
+    for point in points:
+        rapport.demandes += 1
+        if point in vus:
+            rapport.voisins_dans_le_lot += 1
+            continue
+        vus.add(point)
+
+        if point in exclus:
+            rapport.journalises += 1
+        elif voisin_le_plus_proche(point[0], point[1], rayon_km):
+            rapport.deja_en_cache += 1
+        elif retenus and rayon_km > 0 and distance_km(
+            point[0], point[1], *np.array(retenus).T
+        ).min() <= rayon_km:
+            rapport.voisins_dans_le_lot += 1
+        else:
+            retenus.append(point)
+
+    return retenus
+
+
+# ==============================================================================
+# TÉLÉCHARGEMENT
+# ==============================================================================
+
+def _reessayable(erreur: Exception) -> bool:
+    """Erreurs transitoires : réseau, timeout, 429 (quota PVGIS) et 5xx."""
+    if isinstance(erreur, requests.HTTPError) and erreur.response is not None:
+        return erreur.response.status_code == 429 or erreur.response.status_code >= 500
+    return isinstance(erreur, (requests.ConnectionError, requests.Timeout))
+
+
+def telecharger_point(
+    client: PVGISClient,
+    point: Point,
+    tentatives: int = 3,
+    backoff_s: float = 2.0
+) -> ResultatPoint:
+    """
+    Télécharge et prépare un lieu, avec reprises et backoff exponentiel.
+
+    Args:
+        client: Client PVGIS (session partagée entre threads)
+        point: (latitude, longitude)
+        tentatives: Nombre maximal d'appels
+        backoff_s: Attente avant la 2e tentative, doublée ensuite (± 50 % d'aléa)
+
+    Returns:
+        ResultatPoint: champs PVGISData ou erreur (definitif si non réessayable)
+    """
+    latitude, longitude = point
+    for tentative in range(1, tentatives + 1):
+        try:
+            data = client.get_tmy_data(latitude, longitude, usehorizon=1)
+            champs, _, _ = preparer_cache_pvgis(client, data)
+            return ResultatPoint(latitude, longitude, tentative, champs=champs)
+        except Exception as e:
+            if not _reessayable(e) or tentative == tentatives:
+                return ResultatPoint(
+                    latitude, longitude, tentative,
+                    erreur=f"{type(e).__name__}: {e}", definitif=not _reessayable(e)
+                )
+            attente = backoff_s * 2 ** (tentative - 1) * random.uniform(0.5, 1.5)
+            logger.info(f"🔁 PVGIS {point} : {e} - nouvelle tentative dans {attente:.1f}s")
+            time.sleep(attente)
+
+
+def ecrire_lot(resultats: List[ResultatPoint], cache_days: int = 30) -> int:
+    """
+    Écrit un lot de téléchargements réussis en une transaction.
+
+    Les Location manquantes sont créées en bloc, les anciennes lignes
+    PVGISData des mêmes lieux remplacées (bulk_create n'émettant pas de
+    signal, le cache mémoire est invalidé explicitement).
+
+    Returns:
+        int: Nombre de lignes PVGISData écrites
+    """
+    from ..models import Location, PVGISData
+
+    resultats = [r for r in resultats if r.succes]
+    if not resultats:
+        return 0
+
+    expires_at = timezone.now() + timedelta(days=cache_days)
+    cles = {cle_localisation(r.latitude, r.longitude) for r in resultats}
+
+    with transaction.atomic():
+        Location.objects.bulk_create(
+            [Location(latitude=lat, longitude=lon, altitude=0) for lat, lon in cles],
+            ignore_conflicts=True,
+        )
+        locations = {
+            (lat, lon): pk
+            for pk, lat, lon in Location.objects.filter(
+                latitude__in={lat for lat, _ in cles},
+                longitude__in={lon for _, lon in cles},
+            ).values_list('id', 'latitude', 'longitude')
+            if (lat, lon) in cles
+        }
+
+        PVGISData.objects.filter(location_id__in=locations.values()).delete()
+        PVGISData.objects.bulk_create([
+            PVGISData(
+                location_id=locations[cle_localisation(r.latitude, r.longitude)],
+                expires_at=expires_at,
+                **r.champs
+            )
+            for r in resultats
+        ])
+
+    for location_id in locations.values():
+        invalider_cache_meteo(location_id)
+    return len(resultats)
+
+
+def lire_journal(chemin: Optional[str]) -> List[Point]:
+    """Lieux en échec définitif d'un journal JSON lines (vide si absent)."""
+    if not chemin:
+        return []
+    try:
+        with open(chemin, encoding='utf-8') as fichier:
+            return [
+                cle_localisation(entree['latitude'], entree['longitude'])
+                for entree in map(json.loads, filter(str.strip, fichier))
+            ]
+    except FileNotFoundError:
+        return []
+
+
+def prechauffer(
+    points: Iterable[Point],
+    concurrence: int = 4,
+    tentatives: int = 3,
+    backoff_s: float = 2.0,
+    taille_lot: int = 50,
+    cache_days: int = 30,
+    rayon_km: Optional[float] = None,
+    base_url: Optional[str] = None,
+    journal: Optional[str] = None,
+    progression: Optional[Callable[[RapportPrechauffage], None]] = None,
+    client: Optional[PVGISClient] = None
+) -> RapportPrechauffage:
+    """
+    Télécharge les données TMY manquantes et les écrit par lots.
+
+    Args:
+        points: Lieux demandés (latitude, longitude)
+        concurrence: Appels PVGIS simultanés (PVGIS limite à ~30 requêtes/s par IP)
+        tentatives: Appels maximum par lieu
+        backoff_s: Attente initiale entre deux tentatives (secondes)
+        taille_lot: Lignes PVGISData par transaction
+        cache_days: Durée de validité du cache écrit
+        rayon_km: Rayon de réutilisation (défaut : PVGIS_RAYON_REUTILISATION_KM)
+        base_url: URL de l'API (miroir, stub local)
+        journal: Fichier JSON lines des échecs définitifs (lu puis complété)
+        progression: Appelé après chaque lot écrit
+        client: Client à utiliser (défaut : PVGISClient sur base_url)
+
+    Returns:
+        RapportPrechauffage
+
+    Example:
+        >>> rapport = prechauffer(points_grille(45.6, 4.7, 45.9, 5.0, pas_km=5), concurrence=8)
+        >>> rapport.resume()['debit_par_minute']
+    """
+    if rayon_km is None:
+        rayon_km = getattr(settings, 'PVGIS_RAYON_REUTILISATION_KM', RAYON_REUTILISATION_KM_DEFAUT)
+
+    rapport = RapportPrechauffage()
+    a_telecharger = selectionner_points(points, rayon_km, lire_journal(journal), rapport)
+    if not a_telecharger:
+        return rapport
+
+    # Session partagée : une connexion keep-alive par thread au plus
+    client = client or PVGISClient(base_url=base_url)
+    adaptateur = HTTPAdapter(pool_connections=1, pool_maxsize=concurrence)
+    client.session.mount('https://', adaptateur)
+    client.session.mount('http://', adaptateur)
+
+    lot: List[ResultatPoint] = []
+    debut = time.perf_counter()
+
+    def _vider_lot():
+        rapport.telecharges += ecrire_lot(lot, cache_days)
+        rapport.octets += sum(len(r.champs['donnees_horaires']) for r in lot)
+        lot.clear()
+        rapport.duree_s = time.perf_counter() - debut
+        if progression:
+            progression(rapport)
+
+    # Fenêtre de 2 × concurrence tâches en vol : les résultats (~150 Ko
+    # chacun) ne s'accumulent pas en mémoire sur une grande région
+    restants = iter(a_telecharger)
+    with ThreadPoolExecutor(max_workers=concurrence, thread_name_prefix='pvgis') as pool:
+        en_vol = set()
+        while True:
+            for point in islice(restants, 2 * concurrence - len(en_vol)):
+                en_vol.add(pool.submit(telecharger_point, client, point, tentatives, backoff_s))
+            if not en_vol:
+                break
+
+            termines, en_vol = wait(en_vol, return_when=FIRST_COMPLETED)
+            for futur in termines:
+                resultat = futur.result()
+                rapport.tentatives += resultat.tentatives
+
+                if resultat.succes:
+                    lot.append(resultat)
+                    if len(lot) >= taille_lot:
+                        _vider_lot()
+                    continue
+
+                rapport.echecs.append((resultat.latitude, resultat.longitude, resultat.erreur))
+                logger.warning(f"❌ PVGIS ({resultat.latitude}, {resultat.longitude}) : {resultat.erreur}")
+                if resultat.definitif and journal:
+                    with open(journal, 'a', encoding='utf-8') as fichier:
+                        fichier.write(json.dumps({
+                            'latitude': resultat.latitude,
+                            'longitude': resultat.longitude,
+                            'erreur': resultat.erreur,
+                        }) + '\n')
+
+    if lot:
+        _vider_lot()
+    rapport.duree_s = time.perf_counter() - debut
+    return rapport
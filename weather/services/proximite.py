@@ -0,0 +1,140 @@
+"""
+Réutilisation du cache PVGIS d'un lieu voisin.
+weather/services/proximite.py
+
+L'irradiance TMY de PVGIS vient d'une grille satellite de quelques km
+(SARAH : ~0,05°) : deux adresses d'un même village ont les mêmes
+données. Plutôt que d'appeler l'API pour chaque coordonnée arrondie à
+4 décimales, on réutilise la ligne PVGISData valide la plus proche dans
+un rayon PVGIS_RAYON_REUTILISATION_KM.
+
+La recherche se fait en deux temps :
+1. Boîte englobante du rayon en degrés, filtrée en SQL sur l'index
+   (latitude, longitude) de Location (unique_together) ;
+2. Distance exacte (haversine) des quelques candidats en NumPy.
+
+Le passage de l'antiméridien n'est pas géré (la boîte est coupée à ±180°).
+"""
+
+import logging
+from typing import Optional, Tuple
+
+import numpy as np
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+
+RAYON_TERRE_KM = 6371.0
+
+# Longueur d'un degré de latitude
+KM_PAR_DEGRE = np.pi * RAYON_TERRE_KM / 180
+
+
+def distance_km(latitude, longitude, latitudes, longitudes) -> np.ndarray:
+    """
+    Distance orthodromique (haversine) d'un point à un ou plusieurs points.
+
+    Args:
+        latitude, longitude: Point de référence (degrés)
+        latitudes, longitudes: Points comparés (degrés, scalaires ou tableaux)
+
+    Returns:
+        np.ndarray: Distances en km
+    """
+    phi1 = np.radians(latitude)
+    phi2 = np.radians(np.asarray(latitudes, dtype=float))
+    dphi = phi2 - phi1
+    dlambda = np.radians(np.asarray(longitudes, dtype=float) - longitude)
+
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    return 2 * RAYON_TERRE_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def boite_englobante(latitude: float, longitude: float, rayon_km: float) -> Tuple[float, float, float, float]:
+    """
+    Boîte (lat_min, lat_max, lon_min, lon_max) contenant le cercle du rayon.
+
+    L'écart en longitude est élargi avec la latitude (1° de longitude vaut
+    cos(latitude) × 111 km) ; près des pôles la boîte couvre toutes les longitudes.
+    """
+    delta_lat = rayon_km / KM_PAR_DEGRE
+    lat_min, lat_max = max(latitude - delta_lat, -90.0), min(latitude + delta_lat, 90.0)
+
+    cos_lat = np.cos(np.radians(max(abs(lat_min), abs(lat_max))))
+    if cos_lat < 1e-6 or rayon_km >= KM_PAR_DEGRE * cos_lat * 180.0:
+        # Le cercle contient un pôle : toutes les longitudes
+        return lat_min, lat_max, -180.0, 180.0
+
+    delta_lon = rayon_km / (KM_PAR_DEGRE * cos_lat)
+    return lat_min, lat_max, max(longitude - delta_lon, -180.0), min(longitude + delta_lon, 180.0)
+
+
+def voisin_le_plus_proche(
+    latitude: float,
+    longitude: float,
+    rayon_km: float,
+    cree_apres=None
+) -> Optional[Tuple[int, float]]:
+    """
+    Identifiant et distance de la ligne PVGISData valide la plus proche, sans charger de blob.
+
+    Args:
+        latitude, longitude: Coordonnées demandées (arrondies comme Location)
+        rayon_km: Rayon de réutilisation (0 = même lieu uniquement)
+        cree_apres: Ne retenir que les lignes créées après cette date (optionnel)
+
+    Returns:
+        (id PVGISData, distance en km) ou None si aucun cache valide dans le rayon
+    """
+    from ..models import PVGISData
+
+    lat_min, lat_max, lon_min, lon_max = boite_englobante(latitude, longitude, max(rayon_km, 0.0))
+
+    lignes = PVGISData.objects.filter(
+        is_valid=True,
+        expires_at__gt=timezone.now(),
+        location__latitude__range=(lat_min, lat_max),
+        location__longitude__range=(lon_min, lon_max),
+    )
+    if cree_apres is not None:
+        lignes = lignes.filter(created_at__gte=cree_apres)
+    candidats = list(lignes.values_list('id', 'location__latitude', 'location__longitude'))
+    if not candidats:
+        return None
+
+    ids, latitudes, longitudes = zip(*candidats)
+    distances = distance_km(latitude, longitude, latitudes, longitudes)
+    plus_proche = int(np.argmin(distances))
+    if distances[plus_proche] > rayon_km:
+        return None
+    return ids[plus_proche], float(distances[plus_proche])
+
+
+def chercher_cache_voisin(latitude: float, longitude: float, rayon_km: float, cree_apres=None):
+    """
+    Ligne PVGISData valide la plus proche dans le rayon.
+
+    Args:
+        latitude, longitude: Coordonnées demandées (arrondies comme Location)
+        rayon_km: Rayon de réutilisation (0 = même lieu uniquement)
+        cree_apres: Ne retenir que les lignes créées après cette date (optionnel)
+
+    Returns:
+        (PVGISData, distance en km) ou None si aucun cache valide dans le rayon
+    """
+    from ..models import PVGISData
+
+    voisin = voisin_le_plus_proche(latitude, longitude, rayon_km, cree_apres)
+    if voisin is None:
+        return None
+
+    pvgis_id, distance = voisin
+    cached = PVGISData.objects.select_related('location').filter(id=pvgis_id).first()
+    if cached is None:
+        # Ligne remplacée entre les deux requêtes
+        return None
+
+    logger.debug(f"Cache PVGIS voisin : {cached.location} à {distance:.2f} km")
+    return cached, distance
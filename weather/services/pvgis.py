@@ -6,13 +6,23 @@ API Documentation : https://joint-research-centre.ec.europa.eu/pvgis-tools/api_e
 """
 
 import requests
+import numpy as np
 import pandas as pd
 import json
+import threading
+import time
+from collections import OrderedDict
 from typing import Dict, Optional, Tuple
 from datetime import datetime, timedelta
+from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 import logging
 
+from .proximite import chercher_cache_voisin
+from .single_flight import executer_une_seule_fois
+from .tmy_storage import compresser_json, decode_tmy, encode_tmy, tmy_vers_dataframe
+
 logger = logging.getLogger(__name__)
 
 
@@ -38,14 +48,16 @@ class PVGISClient:
         'PVGIS-COSMO': 'Europe (2007-2016)',
     }
     
-    def __init__(self, timeout: int = 60):
+    def __init__(self, timeout: int = 60, base_url: Optional[str] = None):
         """
         Initialise le client PVGIS.
         
         Args:
             timeout: Timeout des requêtes HTTP en secondes (augmenté à 60s car PVGIS peut être lent)
+            base_url: URL de base de l'API (défaut : BASE_URL ; miroir ou stub local en test)
         """
         self.timeout = timeout
+        self.base_url = (base_url or self.BASE_URL).rstrip('/')
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'SolarSimulator/1.0 (Python; PVGIS Client)'
@@ -111,7 +123,7 @@ class PVGISClient:
         params.update(filtered_kwargs)
         
         # Endpoint TMY
-        url = f"{self.BASE_URL}/tmy"
+        url = f"{self.base_url}/tmy"
         
         logger.info(f"Appel PVGIS 5.3 TMY pour {latitude}, {longitude}")
         logger.debug(f"URL: {url}")
@@ -272,7 +284,7 @@ class PVGISClient:
         
         params.update(kwargs)
         
-        url = f"{self.BASE_URL}/MRcalc"
+        url = f"{self.base_url}/MRcalc"
         
         logger.info(f"Appel PVGIS monthly radiation pour {latitude}, {longitude}")
         
@@ -328,64 +340,342 @@ class PVGISClient:
         }
 
 
+# ==============================================================================
+# CACHE MÉMOIRE (PAR PROCESSUS)
+# ==============================================================================
+
+# Valeurs par défaut si les réglages sont absents (~0,4 Mo par lieu)
+CACHE_MEMOIRE_ENTREES_DEFAUT = 32
+CACHE_MEMOIRE_TTL_DEFAUT = 60 * 60
+
+# Rayon par défaut de réutilisation d'un cache voisin (cf. services/proximite.py)
+RAYON_REUTILISATION_KM_DEFAUT = 2.0
+
+# Durée de vie du verrou d'appel API (> timeout du client, 60 s)
+VERROU_TIMEOUT_DEFAUT = 90
+
+
+def cle_localisation(latitude: float, longitude: float) -> Tuple[float, float]:
+    """Clé d'un lieu : coordonnées arrondies comme pour Location."""
+    return round(latitude, 4), round(longitude, 4)
+
+
+class CacheMeteoMemoire:
+    """
+    Cache LRU des données PVGIS décodées, borné en entrées et en durée de vie.
+    
+    Chaque entrée garde les tableaux en lecture seule de decode_tmy et les
+    métadonnées du cache ; un hit évite la requête PVGISData et la
+    décompression. Le verrou protège les workers multi-threads.
+    
+    Le cache est propre au processus : une ligne PVGISData remplacée par un
+    autre processus reste servie au plus PVGIS_CACHE_MEMOIRE_TTL secondes.
+    """
+    
+    def __init__(self):
+        self._entrees = OrderedDict()  # clé -> (échéance monotonic, valeur)
+        self._verrou = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def lire(self, cle: Tuple[float, float]) -> Optional[Dict]:
+        """Entrée pour `cle` (None si absente ou expirée), compteurs mis à jour."""
+        with self._verrou:
+            entree = self._entrees.get(cle)
+            if entree is not None and entree[0] <= time.monotonic():
+                del self._entrees[cle]
+                self.expirations += 1
+                entree = None
+            
+            if entree is None:
+                self.misses += 1
+                return None
+            
+            self._entrees.move_to_end(cle)
+            self.hits += 1
+            return entree[1]
+    
+    def ecrire(
+        self,
+        cle: Tuple[float, float],
+        valeur: Dict,
+        duree_vie: float,
+        max_entrees: int
+    ) -> None:
+        """Stocke une entrée et évince les moins récemment utilisées au-delà de max_entrees."""
+        if duree_vie <= 0 or max_entrees <= 0:
+            return
+        
+        with self._verrou:
+            self._entrees[cle] = (time.monotonic() + duree_vie, valeur)
+            self._entrees.move_to_end(cle)
+            while len(self._entrees) > max_entrees:
+                self._entrees.popitem(last=False)
+                self.evictions += 1
+    
+    def invalider(self, location_id: Optional[int] = None) -> int:
+        """
+        Supprime les entrées d'une localisation (toutes si location_id est None).
+        
+        Returns:
+            int: Nombre d'entrées supprimées
+        """
+        with self._verrou:
+            cles = [
+                cle for cle, (_, valeur) in self._entrees.items()
+                if location_id is None or valeur['location_id'] == location_id
+            ]
+            for cle in cles:
+                del self._entrees[cle]
+            return len(cles)
+    
+    def statistiques(self) -> Dict:
+        """
+        Compteurs du cache.
+        
+        Returns:
+            dict: hits, misses, evictions, expirations, taux_hit_pct, entrees, octets
+        """
+        with self._verrou:
+            total = self.hits + self.misses
+            octets = sum(
+                valeur['horodatages'].nbytes + sum(serie.nbytes for serie in valeur['colonnes'].values())
+                for _, valeur in self._entrees.values()
+            )
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'taux_hit_pct': round(self.hits / total * 100, 1) if total else 0.0,
+                'entrees': len(self._entrees),
+                'octets': octets,
+            }
+    
+    def vider(self) -> None:
+        """Supprime toutes les entrées et remet les compteurs à zéro."""
+        with self._verrou:
+            self._entrees.clear()
+            self.hits = self.misses = self.evictions = self.expirations = 0
+
+
+# Instance du processus
+cache_meteo_memoire = CacheMeteoMemoire()
+
+
+def _memoriser(
+    cle: Tuple[float, float],
+    cached,
+    horodatages,
+    colonnes
+) -> None:
+    """Place la ligne PVGISData décodée du lieu `cle` dans le cache mémoire (jusqu'à son expiration au plus)."""
+    duree_vie = getattr(settings, 'PVGIS_CACHE_MEMOIRE_TTL', CACHE_MEMOIRE_TTL_DEFAUT)
+    if cached.expires_at:
+        duree_vie = min(duree_vie, (cached.expires_at - timezone.now()).total_seconds())
+    
+    cache_meteo_memoire.ecrire(
+        cle,
+        {
+            'location_id': cached.location_id,
+            'horodatages': horodatages,
+            'colonnes': colonnes,
+            'cached_at': cached.created_at,
+            'irradiation_annuelle': cached.irradiation_annuelle_kwh_m2,
+            'distance_km': 0.0,
+            'location_source': cached.location.coordinates_str(),
+        },
+        duree_vie,
+        getattr(settings, 'PVGIS_CACHE_MEMOIRE_ENTREES', CACHE_MEMOIRE_ENTREES_DEFAUT),
+    )
+
+
+def invalider_cache_meteo(location_id: Optional[int] = None) -> int:
+    """Invalide le cache mémoire d'une localisation (de toutes si None)."""
+    return cache_meteo_memoire.invalider(location_id)
+
+
+def statistiques_cache_meteo() -> Dict:
+    """Compteurs du cache mémoire PVGIS du processus."""
+    return cache_meteo_memoire.statistiques()
+
+
 def fetch_pvgis_data_with_cache(
     latitude: float,
     longitude: float,
     use_cache: bool = True,
-    cache_days: int = 30
+    cache_days: int = 30,
+    rayon_km: Optional[float] = None
 ) -> Tuple[pd.DataFrame, Dict]:
     """
     Récupère les données PVGIS 5.3 avec système de cache Django.
     
+    Le cache stocke les colonnes horaires déjà normalisées (blob float32) :
+    un hit est une simple décompression, sans parsing JSON. La réponse brute
+    n'est conservée (compressée) que si PVGIS_CONSERVER_JSON_BRUT est activé.
+    
+    Les lignes décodées sont gardées dans un cache mémoire du processus
+    (CacheMeteoMemoire) : un lieu déjà servi ne touche plus la base.
+    
+    Sans cache pour le lieu exact, le cache valide le plus proche dans
+    `rayon_km` est réutilisé (distance dans metadata['distance_km']) ; il
+    est relu en base à chaque appel, seul le lieu exact étant mémorisé.
+    
+    Les appels concurrents pour un même lieu sont coalescés : une seule
+    tâche appelle l'API, les autres relisent sa ligne (metadata['coalesce']).
+    
     Args:
         latitude: Latitude
         longitude: Longitude
         use_cache: Utiliser le cache Django
         cache_days: Durée de validité du cache en jours
+        rayon_km: Rayon de réutilisation d'un cache voisin
+            (défaut : PVGIS_RAYON_REUTILISATION_KM, 0 = lieu exact uniquement)
         
     Returns:
         Tuple[pd.DataFrame, Dict]: (DataFrame météo, métadonnées)
     """
+    cle = cle_localisation(latitude, longitude)
+    if rayon_km is None:
+        rayon_km = getattr(settings, 'PVGIS_RAYON_REUTILISATION_KM', RAYON_REUTILISATION_KM_DEFAUT)
+    
+    # Cache mémoire du processus (aucune requête SQL)
+    if use_cache:
+        entree = cache_meteo_memoire.lire(cle)
+        if entree is not None and entree['distance_km'] <= rayon_km:
+            logger.info(f"⚡ Données PVGIS en mémoire pour {cle}")
+            metadata = {
+                'source': 'cache',
+                'cache_niveau': 'memoire',
+                'cached_at': entree['cached_at'],
+                'irradiation_annuelle': entree['irradiation_annuelle'],
+                'distance_km': entree['distance_km'],
+                'location_source': entree['location_source'],
+            }
+            return tmy_vers_dataframe(entree['horodatages'], entree['colonnes']), metadata
+    
+    # Chercher dans le cache : lieu exact ou voisin le plus proche dans le rayon
+    if use_cache:
+        resultat = _lire_cache_base(cle, rayon_km)
+        if resultat is not None:
+            return resultat
+    
+    # Single-flight : une seule tâche par lieu appelle l'API, les tâches
+    # concurrentes attendent la ligne qu'elle crée (après `debut`)
+    debut = timezone.now()
+    (df, metadata), role = executer_une_seule_fois(
+        f"pvgis:verrou:{cle[0]:.4f}:{cle[1]:.4f}",
+        produire=lambda: _appeler_api_et_stocker(latitude, longitude, cle, cache_days),
+        relire=lambda: _lire_cache_base(cle, rayon_km, cree_apres=debut),
+        timeout=getattr(settings, 'PVGIS_VERROU_TIMEOUT', VERROU_TIMEOUT_DEFAUT),
+        attente_max=getattr(settings, 'PVGIS_VERROU_ATTENTE_MAX', VERROU_TIMEOUT_DEFAUT),
+        alias=getattr(settings, 'PVGIS_VERROU_CACHE_ALIAS', 'default'),
+    )
+    if role == 'suiveur':
+        metadata['coalesce'] = True
+    
+    return df, metadata
+
+
+def _lire_cache_base(
+    cle: Tuple[float, float],
+    rayon_km: float,
+    cree_apres: Optional[datetime] = None
+) -> Optional[Tuple[pd.DataFrame, Dict]]:
+    """
+    Données du cache en base pour `cle` (lieu exact ou voisin dans le rayon).
+    
+    Args:
+        cle: Coordonnées arrondies du lieu demandé
+        rayon_km: Rayon de réutilisation d'un cache voisin
+        cree_apres: Ignorer les lignes créées avant (attente d'un autre appel)
+    
+    Returns:
+        (DataFrame, métadonnées) ou None (absent ou illisible)
+    """
+    voisin = chercher_cache_voisin(cle[0], cle[1], rayon_km, cree_apres=cree_apres)
+    if not voisin:
+        return None
+    
+    cached, distance_km = voisin
+    logger.info(
+        f"✅ Données PVGIS trouvées en cache pour {cached.location}"
+        + (f" (voisin à {distance_km:.2f} km)" if distance_km > 0 else "")
+    )
+    try:
+        horodatages, colonnes = cached.get_colonnes()
+        df = tmy_vers_dataframe(horodatages, colonnes)
+        # Seule la ligne du lieu exact est mémorisée : celle d'un voisin
+        # masquerait un appel avec un rayon plus petit, puis la ligne propre
+        # du lieu une fois créée (l'invalidation se fait par ligne source)
+        if distance_km == 0:
+            _memoriser(cle, cached, horodatages, colonnes)
+    except Exception as e:
+        logger.warning(f"⚠️ Erreur lecture cache, nouvel appel API: {e}")
+        # Le cache est corrompu, on va réessayer avec l'API
+        return None
+    
+    metadata = {
+        'source': 'cache',
+        'cache_niveau': 'base',
+        'cached_at': cached.created_at,
+        'irradiation_annuelle': cached.irradiation_annuelle_kwh_m2,
+        'distance_km': round(distance_km, 3),
+        'location_source': cached.location.coordinates_str(),
+    }
+    return df, metadata
+
+
+def preparer_cache_pvgis(client: PVGISClient, data: Dict) -> Tuple[Dict, np.ndarray, Dict]:
+    """
+    Parse une réponse TMY et prépare les champs d'une ligne PVGISData.
+    
+    Le DataFrame n'est parsé qu'ici ; les colonnes renvoyées sont relues
+    depuis le blob pour avoir la même précision (float32) qu'un hit du cache.
+    
+    Args:
+        client: Client PVGIS (parsing et irradiation annuelle)
+        data: Réponse JSON de get_tmy_data
+    
+    Returns:
+        (champs PVGISData hors location / expires_at, horodatages, colonnes)
+    """
+    donnees_horaires = encode_tmy(client.parse_tmy_to_dataframe(data))
+    horodatages, colonnes = decode_tmy(donnees_horaires)
+    df = tmy_vers_dataframe(horodatages, colonnes)
+    
+    temperature_moyenne = df['temperature'].mean() if 'temperature' in df.columns else None
+    champs = {
+        'database': 'PVGIS-SARAH3',  # Informatif seulement
+        'donnees_horaires': donnees_horaires,
+        'raw_data_zlib': (
+            compresser_json(data)
+            if getattr(settings, 'PVGIS_CONSERVER_JSON_BRUT', False) else None
+        ),
+        'irradiation_annuelle_kwh_m2': client.calculate_annual_irradiation(df),
+        'temperature_moyenne_annuelle': round(temperature_moyenne, 2) if temperature_moyenne else None,
+    }
+    return champs, horodatages, colonnes
+
+
+def _appeler_api_et_stocker(
+    latitude: float,
+    longitude: float,
+    cle: Tuple[float, float],
+    cache_days: int
+) -> Tuple[pd.DataFrame, Dict]:
+    """Appelle l'API PVGIS et remplace le cache du lieu (appelé sous verrou)."""
     from ..models import Location, PVGISData
     
-    # Créer ou récupérer la localisation
+    # Créer ou récupérer la localisation (seulement si on appelle l'API)
     location, _ = Location.objects.get_or_create(
-        latitude=round(latitude, 4),
-        longitude=round(longitude, 4),
+        latitude=cle[0],
+        longitude=cle[1],
         defaults={'altitude': 0}
     )
     
-    # Database pour le cache (informatif seulement)
-    database = 'PVGIS-SARAH3'
-    
-    # Chercher dans le cache
-    if use_cache:
-        cached = PVGISData.objects.filter(
-            location=location,
-            is_valid=True,
-            expires_at__gt=timezone.now()
-        ).first()
-        
-        if cached:
-            logger.info(f"✅ Données PVGIS trouvées en cache pour {location}")
-            data = cached.get_data_dict()
-            
-            if data:
-                client = PVGISClient()
-                try:
-                    df = client.parse_tmy_to_dataframe(data)
-                    
-                    metadata = {
-                        'source': 'cache',
-                        'cached_at': cached.created_at,
-                        'irradiation_annuelle': cached.irradiation_annuelle_kwh_m2,
-                    }
-                    
-                    return df, metadata
-                except Exception as e:
-                    logger.warning(f"⚠️ Erreur parsing cache, nouvel appel API: {e}")
-                    # Le cache est corrompu, on va réessayer avec l'API
-    
     # Appel API PVGIS 5.3
     logger.info(f"🌐 Appel API PVGIS 5.3 pour {location}")
     client = PVGISClient()
@@ -393,34 +683,31 @@ def fetch_pvgis_data_with_cache(
     try:
         # Appel avec usehorizon pour meilleure précision
         data = client.get_tmy_data(latitude, longitude, usehorizon=1)
-        df = client.parse_tmy_to_dataframe(data)
-        
-        # Calculer l'irradiation annuelle
-        irradiation_annuelle = client.calculate_annual_irradiation(df)
-        temperature_moyenne = df['temperature'].mean() if 'temperature' in df.columns else None
+        champs, horodatages, colonnes = preparer_cache_pvgis(client, data)
+        df = tmy_vers_dataframe(horodatages, colonnes)
         
         # Sauvegarder en cache
         expires_at = timezone.now() + timedelta(days=cache_days)
         
-        # Supprimer les anciens caches pour cette localisation
-        PVGISData.objects.filter(location=location).delete()
-        
-        pvgis_cache = PVGISData.objects.create(
-            location=location,
-            database=database,
-            raw_data=json.dumps(data),
-            irradiation_annuelle_kwh_m2=irradiation_annuelle,
-            temperature_moyenne_annuelle=round(temperature_moyenne, 2) if temperature_moyenne else None,
-            expires_at=expires_at,
-        )
+        # Remplacer les anciens caches pour cette localisation en une transaction
+        with transaction.atomic():
+            PVGISData.objects.filter(location=location).delete()
+            
+            pvgis_cache = PVGISData.objects.create(
+                location=location,
+                expires_at=expires_at,
+                **champs
+            )
         
         logger.info(f"💾 Données PVGIS sauvegardées en cache (expire: {expires_at.strftime('%Y-%m-%d')})")
+        _memoriser(cle, pvgis_cache, horodatages, colonnes)
         
         metadata = {
             'source': 'api',
+            'distance_km': 0.0,
             'database': 'PVGIS-TMY (SARAH3)',
-            'irradiation_annuelle': irradiation_annuelle,
-            'temperature_moyenne': temperature_moyenne,
+            'irradiation_annuelle': champs['irradiation_annuelle_kwh_m2'],
+            'temperature_moyenne': champs['temperature_moyenne_annuelle'],
         }
         
         return df, metadata
@@ -0,0 +1,135 @@
+"""
+Coalescence des appels concurrents (single-flight) via le cache Django.
+weather/services/single_flight.py
+
+Quand plusieurs tâches demandent le même lieu en même temps, une seule
+appelle PVGIS : elle pose un verrou (cache.add, atomique sur Redis et
+LocMemCache) et les autres attendent, puis relisent son résultat.
+
+Le verrou expire seul après `timeout` secondes, si bien qu'une tâche
+tuée ne bloque pas le lieu. En test et en développement, un
+LocMemCache sert de verrou local (partagé entre les threads d'un
+processus). Un cache indisponible revient à se passer du verrou.
+
+Sur Redis, la libération compare et supprime en un seul script Lua :
+un get suivi d'un delete pourrait retirer le verrou qu'un autre worker
+vient de reprendre après expiration.
+"""
+
+import logging
+import time
+import uuid
+from typing import Callable, Optional, Tuple, TypeVar
+
+from django.core.cache import caches
+
+
+logger = logging.getLogger(__name__)
+
+
+T = TypeVar('T')
+
+# Intervalle par défaut entre deux relectures pendant l'attente (secondes)
+INTERVALLE_ATTENTE_DEFAUT = 0.5
+
+# Compare-and-delete atomique : ne retire le verrou que s'il porte encore notre jeton
+SCRIPT_LIBERATION = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def _acquerir(cache, cle: str, jeton: str, timeout: float) -> bool:
+    """Pose le verrou s'il est libre ; True aussi si le cache est indisponible."""
+    try:
+        acquis = cache.add(cle, jeton, timeout=timeout)
+    except Exception as e:
+        logger.warning(f"⚠️ Verrou {cle} indisponible, appel sans coalescence : {e}")
+        return True
+    if acquis is None:
+        # django_redis avec IGNORE_EXCEPTIONS renvoie None si Redis est injoignable
+        logger.warning(f"⚠️ Verrou {cle} indisponible, appel sans coalescence")
+        return True
+    return bool(acquis)
+
+
+def _liberer(cache, alias: str, cle: str, jeton: str) -> None:
+    """Retire le verrou s'il nous appartient encore (il a pu expirer et être repris)."""
+    try:
+        if type(cache).__module__.startswith('django_redis'):
+            from django_redis import get_redis_connection
+            # Jeton encodé comme django-redis l'a écrit (sérialiseur + compression)
+            get_redis_connection(alias).eval(
+                SCRIPT_LIBERATION, 1, cache.make_key(cle), cache.client.encode(jeton)
+            )
+        elif cache.get(cle) == jeton:
+            # LocMemCache : verrou local au processus (test, développement)
+            cache.delete(cle)
+    except Exception as e:
+        logger.warning(f"⚠️ Verrou {cle} non libéré (expirera seul) : {e}")
+
+
+def executer_une_seule_fois(
+    cle: str,
+    produire: Callable[[], T],
+    relire: Callable[[], Optional[T]],
+    timeout: float,
+    attente_max: float,
+    intervalle: float = INTERVALLE_ATTENTE_DEFAUT,
+    alias: str = 'default'
+) -> Tuple[T, str]:
+    """
+    Exécute `produire` une seule fois pour tous les appelants concurrents de `cle`.
+
+    Le meneur (premier à poser le verrou) relit d'abord le résultat, au cas
+    où un meneur précédent vient de terminer, puis appelle `produire`. Les
+    suiveurs relisent toutes les `intervalle` secondes jusqu'à obtenir le
+    résultat. Si le verrou se libère sans résultat (échec du meneur), l'un
+    d'eux devient meneur. Au-delà de `attente_max`, ils produisent eux-mêmes.
+
+    Args:
+        cle: Clé du verrou dans le cache
+        produire: Calcul coûteux (appel API + écriture du résultat)
+        relire: Lecture du résultat écrit par un autre appelant (None si absent)
+        timeout: Durée de vie du verrou (secondes), à régler au-delà de la durée de `produire`
+        attente_max: Attente maximale d'un suiveur (secondes)
+        intervalle: Délai entre deux relectures (secondes)
+        alias: Cache Django portant le verrou (partagé entre workers en production)
+
+    Returns:
+        (résultat, rôle) avec rôle 'meneur' ou 'suiveur'
+
+    Example:
+        >>> donnees, role = executer_une_seule_fois('pvgis:verrou:45.75:4.85', appeler_api, lire_cache,
+        ...                                         timeout=90, attente_max=90)
+    """
+    try:
+        cache = caches[alias]
+    except Exception as e:
+        logger.warning(f"⚠️ Cache de verrou '{alias}' indisponible, appel sans coalescence : {e}")
+        return produire(), 'meneur'
+
+    jeton = uuid.uuid4().hex
+    echeance = time.monotonic() + attente_max
+
+    while True:
+        if _acquerir(cache, cle, jeton, timeout):
+            try:
+                resultat = relire()
+                if resultat is not None:
+                    return resultat, 'suiveur'
+                return produire(), 'meneur'
+            finally:
+                _liberer(cache, alias, cle, jeton)
+
+        if time.monotonic() >= echeance:
+            logger.warning(f"⏱️ Attente du verrou {cle} dépassée ({attente_max}s), appel direct")
+            return produire(), 'meneur'
+
+        logger.debug(f"Verrou {cle} pris, attente du résultat")
+        time.sleep(intervalle)
+        resultat = relire()
+        if resultat is not None:
+            return resultat, 'suiveur'
@@ -0,0 +1,117 @@
+"""
+Stockage colonnaire compact des données TMY PVGIS.
+weather/services/tmy_storage.py
+
+Les colonnes horaires normalisées (ghi, dni, dhi, temperature...) sont
+parsées une seule fois, à l'écriture du cache, puis stockées en un blob :
+
+    en-tête : b'TMY1' | nb_heures (uint32) | longueur des noms (uint16) | 'ghi,dni,...'
+    contenu : zlib( horodatages int64 en secondes, codés en différences
+                    | colonnes float32 mises bout à bout )
+
+Contrairement à la trace batterie (entrelacée heure par heure), les
+colonnes sont contiguës : chaque série se relit d'un np.frombuffer sans
+copie. Un hit du cache n'a ainsi plus de json.loads, de pd.to_datetime ni
+de renommage de colonnes.
+"""
+
+import json
+import struct
+import zlib
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# Version du format (à changer si la disposition du blob change)
+TMY_MAGIC = b'TMY1'
+
+# float32 little-endian : 7 chiffres significatifs, PVGIS en fournit 2 décimales
+TMY_DTYPE = np.dtype('<f4')
+
+_HORODATAGE_DTYPE = np.dtype('<i8')
+_EN_TETE = struct.Struct('<4sIH')
+
+
+def encode_tmy(df: pd.DataFrame, niveau: int = 6) -> bytes:
+    """
+    Encode un DataFrame TMY normalisé en blob colonnaire compressé.
+
+    Args:
+        df: DataFrame issu de PVGISClient.parse_tmy_to_dataframe
+            (colonne 'timestamp' + colonnes météo numériques)
+        niveau: Niveau de compression zlib (1-9)
+
+    Returns:
+        bytes: Blob (≈ 150 Ko pour 8760 h × 8 colonnes, contre ~1,5 Mo de JSON)
+    """
+    colonnes = [col for col in df.columns if col != 'timestamp']
+    noms = ','.join(colonnes).encode('ascii')
+
+    # Secondes depuis l'epoch ; les différences (3600 s sauf aux changements
+    # de mois, tirés d'années différentes) se compressent presque entièrement
+    secondes = df['timestamp'].to_numpy(dtype='datetime64[s]').view(np.int64)
+    differences = np.diff(secondes, prepend=np.int64(0)).astype(_HORODATAGE_DTYPE)
+
+    table = np.empty((len(colonnes), len(df)), dtype=TMY_DTYPE)
+    for i, col in enumerate(colonnes):
+        table[i] = df[col].to_numpy(dtype=np.float64)
+
+    contenu = zlib.compress(differences.tobytes() + table.tobytes(), niveau)
+    return _EN_TETE.pack(TMY_MAGIC, len(df), len(noms)) + noms + contenu
+
+
+def decode_tmy(blob: bytes) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Décode un blob en tableaux NumPy (une décompression, aucun parsing).
+
+    Args:
+        blob: Blob produit par encode_tmy
+
+    Returns:
+        (horodatages datetime64[s], {colonne: série float32}), tous en lecture seule
+
+    Raises:
+        ValueError: Blob absent ou d'un format inconnu
+    """
+    blob = bytes(blob or b'')
+    if len(blob) < _EN_TETE.size or blob[:4] != TMY_MAGIC:
+        raise ValueError("Blob TMY invalide (format inconnu)")
+
+    _, nb_heures, longueur_noms = _EN_TETE.unpack_from(blob)
+    debut = _EN_TETE.size + longueur_noms
+    noms = blob[_EN_TETE.size:debut].decode('ascii')
+    colonnes = noms.split(',') if noms else []
+
+    contenu = zlib.decompress(blob[debut:])
+    differences = np.frombuffer(contenu, dtype=_HORODATAGE_DTYPE, count=nb_heures)
+    horodatages = np.cumsum(differences).view('datetime64[s]')
+    horodatages.flags.writeable = False
+
+    table = np.frombuffer(
+        contenu, dtype=TMY_DTYPE, offset=nb_heures * _HORODATAGE_DTYPE.itemsize
+    ).reshape(len(colonnes), nb_heures)
+
+    return horodatages, dict(zip(colonnes, table))
+
+
+def tmy_vers_dataframe(horodatages: np.ndarray, colonnes: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """
+    DataFrame au format de PVGISClient.parse_tmy_to_dataframe.
+
+    Les séries sont recopiées en float64 : le DataFrame est modifiable sans
+    toucher aux tableaux décodés, et les calculs en aval gardent leur dtype.
+
+    Returns:
+        pd.DataFrame: 'timestamp' puis les colonnes météo, dans l'ordre du blob
+    """
+    donnees = {'timestamp': horodatages.astype('datetime64[ns]')}
+    for nom, serie in colonnes.items():
+        donnees[nom] = serie.astype(np.float64)
+    return pd.DataFrame(donnees)
+
+
+def compresser_json(donnees: Dict, niveau: int = 6) -> bytes:
+    """Réponse PVGIS brute en JSON compact compressé zlib."""
+    return zlib.compress(json.dumps(donnees, separators=(',', ':')).encode(), niveau)
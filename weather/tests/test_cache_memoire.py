@@ -0,0 +1,189 @@
+"""
+Tests unitaires pour le cache mémoire PVGIS (par processus).
+"""
+
+import os
+from datetime import timedelta
+from types import SimpleNamespace
+
+import django
+import numpy as np
+import pytest
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.test import override_settings
+from django.utils import timezone
+
+from weather.models import PVGISData, invalider_cache_memoire_pvgis
+from weather.services import pvgis
+from weather.services.pvgis import CacheMeteoMemoire, cache_meteo_memoire
+
+
+def _entree(location_id, nb_heures=8760):
+    """Entrée au format du cache : tableaux en lecture seule, comme decode_tmy."""
+    horodatages = np.arange(nb_heures).astype('datetime64[h]').astype('datetime64[s]')
+    ghi = np.linspace(0, 900, nb_heures, dtype=np.float32)
+    horodatages.flags.writeable = False
+    ghi.flags.writeable = False
+    return {
+        'location_id': location_id,
+        'horodatages': horodatages,
+        'colonnes': {'ghi': ghi},
+        'cached_at': None,
+        'irradiation_annuelle': 1500.0,
+        'distance_km': 0.0,
+        'location_source': '45.7500,4.8500',
+    }
+
+
+@pytest.fixture(autouse=True)
+def cache_vide():
+    cache_meteo_memoire.vider()
+    yield
+    cache_meteo_memoire.vider()
+
+
+class TestCacheMeteoMemoire:
+    """Tests du LRU borné en entrées et en durée de vie."""
+
+    def test_hits_et_misses(self):
+        """Un lieu absent compte un miss, un lieu présent un hit."""
+        cache = CacheMeteoMemoire()
+        assert cache.lire((45.75, 4.85)) is None
+
+        cache.ecrire((45.75, 4.85), _entree(1), duree_vie=60, max_entrees=4)
+
+        assert cache.lire((45.75, 4.85))['location_id'] == 1
+        stats = cache.statistiques()
+        assert (stats['hits'], stats['misses'], stats['taux_hit_pct']) == (1, 1, 50.0)
+        assert stats['octets'] == 8760 * 8 + 8760 * 4
+
+    def test_eviction_lru(self):
+        """Au-delà de max_entrees, le lieu le moins récemment lu est évincé."""
+        cache = CacheMeteoMemoire()
+        for i in range(3):
+            cache.ecrire((float(i), 0.0), _entree(i), duree_vie=60, max_entrees=3)
+
+        cache.lire((0.0, 0.0))
+        cache.ecrire((3.0, 0.0), _entree(3), duree_vie=60, max_entrees=3)
+
+        assert cache.lire((1.0, 0.0)) is None
+        assert cache.lire((0.0, 0.0)) is not None
+        assert cache.statistiques()['evictions'] == 1
+        assert cache.statistiques()['entrees'] == 3
+
+    def test_expiration(self, monkeypatch):
+        """Une entrée expirée n'est plus servie et compte une expiration."""
+        cache = CacheMeteoMemoire()
+        cache.ecrire((45.75, 4.85), _entree(1), duree_vie=60, max_entrees=4)
+
+        horloge = pvgis.time.monotonic() + 61
+        monkeypatch.setattr(pvgis.time, 'monotonic', lambda: horloge)
+
+        assert cache.lire((45.75, 4.85)) is None
+        assert cache.statistiques()['expirations'] == 1
+        assert cache.statistiques()['entrees'] == 0
+
+    def test_desactive(self):
+        """Une durée de vie ou une taille nulle désactive le stockage."""
+        cache = CacheMeteoMemoire()
+        cache.ecrire((1.0, 1.0), _entree(1), duree_vie=0, max_entrees=4)
+        cache.ecrire((2.0, 2.0), _entree(2), duree_vie=60, max_entrees=0)
+
+        assert cache.statistiques()['entrees'] == 0
+
+    def test_invalidation_par_localisation(self):
+        """invalider(location_id) ne retire que les entrées de ce lieu."""
+        cache = CacheMeteoMemoire()
+        cache.ecrire((1.0, 1.0), _entree(1), duree_vie=60, max_entrees=4)
+        cache.ecrire((2.0, 2.0), _entree(2), duree_vie=60, max_entrees=4)
+
+        assert cache.invalider(1) == 1
+        assert cache.lire((1.0, 1.0)) is None
+        assert cache.lire((2.0, 2.0)) is not None
+        assert cache.invalider() == 1
+
+
+class TestFetchAvecCacheMemoire:
+    """Intégration dans fetch_pvgis_data_with_cache."""
+
+    def test_hit_sans_base_de_donnees(self, monkeypatch):
+        """Un hit mémoire ne touche ni la base ni l'API et renvoie un DataFrame modifiable."""
+        cache_meteo_memoire.ecrire(
+            pvgis.cle_localisation(45.750012, 4.849996), _entree(7), duree_vie=60, max_entrees=4
+        )
+        monkeypatch.setattr(pvgis.PVGISClient, 'get_tmy_data', lambda *a, **k: pytest.fail("appel API"))
+
+        df, metadata = pvgis.fetch_pvgis_data_with_cache(45.75, 4.85)
+
+        assert (metadata['source'], metadata['cache_niveau']) == ('cache', 'memoire')
+        assert list(df.columns) == ['timestamp', 'ghi']
+        assert df['ghi'].dtype == np.float64
+        df.loc[0, 'ghi'] = -1.0
+        assert cache_meteo_memoire.lire((45.75, 4.85))['colonnes']['ghi'][0] == 0.0
+
+    def test_rayon_nul_apres_hit_voisin(self, monkeypatch):
+        """Un voisin n'est pas mémorisé : rayon_km=0 ensuite appelle l'API, jamais la mémoire."""
+        entree = _entree(9)
+        voisin = SimpleNamespace(
+            location_id=9, location=SimpleNamespace(coordinates_str=lambda: '45.0160,5.0000'),
+            created_at=None, irradiation_annuelle_kwh_m2=1450.0,
+            expires_at=timezone.now() + timedelta(days=1),
+            get_colonnes=lambda: (entree['horodatages'], entree['colonnes']),
+        )
+        monkeypatch.setattr(
+            pvgis, 'chercher_cache_voisin',
+            lambda lat, lon, rayon_km, cree_apres=None: (voisin, 1.8) if rayon_km >= 1.8 else None
+        )
+        appels_api = []
+        monkeypatch.setattr(
+            pvgis, '_appeler_api_et_stocker',
+            lambda *args: appels_api.append(args) or (None, {'source': 'api'})
+        )
+
+        with override_settings(PVGIS_CACHE_MEMOIRE_TTL=3600, PVGIS_CACHE_MEMOIRE_ENTREES=4):
+            _, voisinage = pvgis.fetch_pvgis_data_with_cache(45.0, 5.0, rayon_km=2.0)
+            _, exact = pvgis.fetch_pvgis_data_with_cache(45.0, 5.0, rayon_km=0)
+            _, relu = pvgis.fetch_pvgis_data_with_cache(45.0, 5.0, rayon_km=2.0)
+
+        assert (voisinage['cache_niveau'], voisinage['distance_km']) == ('base', 1.8)
+        assert exact['source'] == 'api' and len(appels_api) == 1
+        assert relu['cache_niveau'] == 'base'
+        assert cache_meteo_memoire.statistiques()['entrees'] == 0
+
+    def test_entree_hors_rayon_ignoree(self, monkeypatch):
+        """Une entrée mémoire plus éloignée que le rayon demandé compte comme absente."""
+        entree = {**_entree(9), 'distance_km': 1.8}
+        cache_meteo_memoire.ecrire((45.0, 5.0), entree, duree_vie=60, max_entrees=4)
+        monkeypatch.setattr(pvgis, '_lire_cache_base', lambda *args, **kwargs: None)
+        monkeypatch.setattr(pvgis, '_appeler_api_et_stocker', lambda *args: (None, {'source': 'api'}))
+
+        _, metadata = pvgis.fetch_pvgis_data_with_cache(45.0, 5.0, rayon_km=0)
+
+        assert metadata['source'] == 'api'
+
+    def test_memoriser_borne_par_expiration(self):
+        """Une ligne qui expire bientôt n'est pas gardée au-delà de son expiration."""
+        cached = SimpleNamespace(
+            location_id=3, location=SimpleNamespace(coordinates_str=lambda: '3.0000,3.0000'),
+            created_at=None, irradiation_annuelle_kwh_m2=1400.0,
+            expires_at=timezone.now() - timedelta(seconds=1),
+        )
+        entree = _entree(3)
+
+        with override_settings(PVGIS_CACHE_MEMOIRE_TTL=3600, PVGIS_CACHE_MEMOIRE_ENTREES=4):
+            pvgis._memoriser((3.0, 3.0), cached, entree['horodatages'], entree['colonnes'])
+
+        assert cache_meteo_memoire.statistiques()['entrees'] == 0
+
+    def test_signal_invalide_la_localisation(self):
+        """Enregistrer ou supprimer une ligne PVGISData invalide son lieu."""
+        cache_meteo_memoire.ecrire((5.0, 5.0), _entree(5), duree_vie=60, max_entrees=4)
+        cache_meteo_memoire.ecrire((6.0, 6.0), _entree(6), duree_vie=60, max_entrees=4)
+
+        invalider_cache_memoire_pvgis(PVGISData, SimpleNamespace(location_id=5))
+
+        assert cache_meteo_memoire.lire((5.0, 5.0)) is None
+        assert cache_meteo_memoire.lire((6.0, 6.0)) is not None
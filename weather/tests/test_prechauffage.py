@@ -0,0 +1,223 @@
+"""
+Tests unitaires pour le préchauffage en masse du cache PVGIS.
+
+L'API est remplacée par un serveur HTTP local servant /tmy : réponse
+synthétique, 503 transitoires pour exercer les reprises et 400 pour un
+point en mer (échec définitif).
+"""
+
+import json
+import os
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from urllib.parse import parse_qs, urlparse
+
+import django
+import numpy as np
+import pandas as pd
+import pytest
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from weather.services.prechauffage import (
+    lire_journal,
+    points_csv,
+    points_grille,
+    prechauffer,
+)
+from weather.services.proximite import distance_km
+from weather.services.pvgis import cache_meteo_memoire
+
+
+# Point en mer : PVGIS répond 400
+POINT_EN_MER = (43.0, 6.5)
+
+
+def _reponse_tmy():
+    """Réponse /tmy synthétique de 8760 h (une seule année suffit ici)."""
+    rng = np.random.default_rng(0)
+    horodatages = pd.date_range('2019-01-01', periods=8760, freq='h')
+    ghi = np.clip(np.sin((horodatages.hour - 6) / 12 * np.pi), 0, None) * rng.uniform(200, 900, 8760)
+    lignes = [
+        {'time(UTC)': t, 'T2m': 12.5, 'G(h)': round(float(g), 2), 'Gb(n)': round(float(g) * 0.7, 2),
+         'Gd(h)': round(float(g) * 0.3, 2), 'WS10m': 3.0}
+        for t, g in zip(horodatages.strftime('%Y%m%d:%H%M'), ghi)
+    ]
+    return {'inputs': {'location': {'latitude': 45.75, 'longitude': 4.85}}, 'outputs': {'tmy_hourly': lignes}}
+
+
+class StubPVGIS(BaseHTTPRequestHandler):
+    """Endpoint /tmy local ; `echecs` = nombre de 503 à renvoyer par lieu."""
+
+    corps = json.dumps(_reponse_tmy()).encode()
+    echecs = 0
+    appels = Counter()
+    verrou = threading.Lock()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        point = (float(params['lat'][0]), float(params['lon'][0]))
+        with self.verrou:
+            self.appels[point] += 1
+            numero = self.appels[point]
+
+        if url.path != '/tmy':
+            self.send_error(404)
+        elif point == POINT_EN_MER:
+            self.send_error(400, 'Location over the sea')
+        elif numero <= self.echecs:
+            self.send_error(503)
+        else:
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(self.corps)))
+            self.end_headers()
+            self.wfile.write(self.corps)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope='module')
+def stub_url():
+    serveur = ThreadingHTTPServer(('127.0.0.1', 0), StubPVGIS)
+    thread = threading.Thread(target=serveur.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{serveur.server_address[1]}"
+    serveur.shutdown()
+    serveur.server_close()
+
+
+@pytest.fixture
+def stub(stub_url):
+    StubPVGIS.appels.clear()
+    StubPVGIS.echecs = 0
+    return stub_url
+
+
+@pytest.fixture
+def base(transactional_db):
+    """Base de test transactionnelle : les threads du pool écrivent par leurs propres connexions."""
+    cache_meteo_memoire.vider()
+    yield
+    cache_meteo_memoire.vider()
+
+
+class TestLieuxDemandes:
+    """Tests de la génération et de la lecture des lieux."""
+
+    def test_grille_espacement(self):
+        """Les points voisins d'une grille sont espacés du pas demandé."""
+        points = points_grille(45.6, 4.7, 45.9, 5.0, pas_km=5)
+        latitudes, longitudes = np.array(points).T
+
+        assert len(points) == len(set(points))
+        assert latitudes.min() == pytest.approx(45.6) and longitudes.min() == pytest.approx(4.7)
+        assert distance_km(*points[0], *points[1]) == pytest.approx(5.0, abs=0.02)
+        assert distance_km(*points[0], *points[-1]) > 40
+
+    def test_grille_invalide(self):
+        with pytest.raises(ValueError):
+            points_grille(45.0, 4.0, 46.0, 5.0, pas_km=0)
+        with pytest.raises(ValueError):
+            points_grille(46.0, 4.0, 45.0, 5.0, pas_km=5)
+
+    def test_csv_point_virgule(self, tmp_path):
+        """Export Excel français : séparateur ';', virgule décimale, lignes vides ignorées."""
+        chemin = tmp_path / 'codes_postaux.csv'
+        chemin.write_text(
+            "code_postal;Latitude;Longitude\n69001;45,7675;4,8345\n13001;;\n75001;48.8625;2.3364\n",
+            encoding='utf-8',
+        )
+
+        assert points_csv(str(chemin)) == [(45.7675, 4.8345), (48.8625, 2.3364)]
+
+    def test_csv_sans_coordonnees(self, tmp_path):
+        chemin = tmp_path / 'villes.csv'
+        chemin.write_text("ville,x,y\nLyon,1,2\n", encoding='utf-8')
+
+        with pytest.raises(ValueError):
+            points_csv(str(chemin))
+
+
+class TestPrechauffage:
+    """Tests de bout en bout contre le stub local."""
+
+    def test_reprises_et_echec_definitif(self, base, stub, tmp_path):
+        """Les 503 sont réessayés, le 400 est journalisé et sauté à la relance."""
+        from weather.models import PVGISData
+
+        StubPVGIS.echecs = 2
+        journal = str(tmp_path / 'echecs.jsonl')
+        points = [(45.75, 4.85), (43.3, 5.37), POINT_EN_MER]
+
+        rapport = prechauffer(
+            points, concurrence=3, tentatives=3, backoff_s=0.01, base_url=stub, journal=journal
+        )
+
+        assert (rapport.telecharges, len(rapport.echecs), rapport.tentatives) == (2, 1, 7)
+        assert rapport.echecs[0][:2] == POINT_EN_MER
+        assert StubPVGIS.appels[POINT_EN_MER] == 1
+        assert lire_journal(journal) == [POINT_EN_MER]
+        assert PVGISData.objects.count() == 2
+        cached = PVGISData.objects.get(location__latitude=45.75)
+        assert len(cached.get_dataframe()) == 8760
+
+        relance = prechauffer(points, backoff_s=0.01, base_url=stub, journal=journal)
+
+        assert (relance.deja_en_cache, relance.journalises, relance.telecharges) == (2, 1, 0)
+        assert sum(StubPVGIS.appels.values()) == 7
+
+    def test_tentatives_epuisees(self, base, stub):
+        """Un lieu toujours en 503 échoue sans être journalisé comme définitif."""
+        StubPVGIS.echecs = 10
+
+        rapport = prechauffer([(45.75, 4.85)], tentatives=2, backoff_s=0.01, base_url=stub)
+
+        assert rapport.telecharges == 0
+        assert 'HTTPError' in rapport.echecs[0][2]
+        assert StubPVGIS.appels[(45.75, 4.85)] == 2
+
+    def test_voisins_dans_le_lot(self, base, stub):
+        """Deux lieux à moins du rayon ne coûtent qu'un appel."""
+        rapport = prechauffer(
+            [(45.75, 4.85), (45.755, 4.855), (45.75, 4.85)], rayon_km=2.0, base_url=stub
+        )
+
+        assert (rapport.telecharges, rapport.voisins_dans_le_lot) == (1, 2)
+        assert sum(StubPVGIS.appels.values()) == 1
+
+    def test_commande(self, base, stub):
+        """La commande écrit par lots, affiche le rapport et reprend à la relance."""
+        from weather.models import PVGISData
+
+        sortie = StringIO()
+        arguments = [
+            'prechauffer_pvgis', '--bbox', '45.70', '4.80', '45.75', '4.85', '--pas-km', '2',
+            '--lot', '3', '--concurrence', '4', '--rayon-km', '0', '--url-base', stub,
+        ]
+        call_command(*arguments, stdout=sortie)
+
+        nb_points = len(points_grille(45.70, 4.80, 45.75, 4.85, pas_km=2))
+        assert PVGISData.objects.count() == nb_points
+        assert f"{nb_points} lieu(x) téléchargé(s)" in sortie.getvalue()
+        assert sortie.getvalue().count('💾') == -(-nb_points // 3)
+
+        sortie = StringIO()
+        call_command(*arguments, stdout=sortie)
+
+        assert "Déjà en cache : %d" % nb_points in sortie.getvalue()
+        assert sum(StubPVGIS.appels.values()) == nb_points
+
+    def test_commande_sans_lieux(self):
+        with pytest.raises(CommandError):
+            call_command('prechauffer_pvgis')
+        with pytest.raises(CommandError):
+            call_command('prechauffer_pvgis', '--points', '45.75;4.85')
@@ -0,0 +1,50 @@
+"""
+Tests unitaires pour la recherche du cache PVGIS voisin.
+"""
+
+import numpy as np
+import pytest
+
+from weather.services.proximite import boite_englobante, distance_km
+
+
+class TestDistance:
+    """Tests de la distance haversine et de la boîte de préfiltrage."""
+
+    def test_distances_connues(self):
+        """Paris-Lyon ≈ 392 km ; un millième de degré de latitude ≈ 111 m."""
+        assert distance_km(48.8566, 2.3522, 45.7640, 4.8357) == pytest.approx(392, abs=2)
+        assert distance_km(45.75, 4.85, 45.751, 4.85) == pytest.approx(0.1112, abs=1e-3)
+        assert distance_km(45.75, 4.85, 45.75, 4.85) == 0.0
+
+    def test_vectorisee(self):
+        """Plusieurs points comparés en un appel."""
+        distances = distance_km(45.75, 4.85, [45.75, 45.76, 46.75], [4.85, 4.85, 4.85])
+
+        assert distances.shape == (3,)
+        assert distances[0] == 0.0
+        assert distances[1] < distances[2]
+
+    @pytest.mark.parametrize('latitude', [0.0, 45.75, -60.0, 89.99])
+    def test_boite_contient_le_cercle(self, latitude):
+        """Tout point du cercle de rayon r est dans la boîte englobante."""
+        rayon = 5.0
+        lat_min, lat_max, lon_min, lon_max = boite_englobante(latitude, 4.85, rayon)
+
+        # Points du cercle par pas de 5°, à 99,9 % du rayon
+        caps = np.radians(np.arange(0, 360, 5))
+        delta = 0.999 * rayon / 6371.0
+        phi1 = np.radians(latitude)
+        phi2 = np.arcsin(np.sin(phi1) * np.cos(delta) + np.cos(phi1) * np.sin(delta) * np.cos(caps))
+        lambda2 = np.radians(4.85) + np.arctan2(
+            np.sin(caps) * np.sin(delta) * np.cos(phi1), np.cos(delta) - np.sin(phi1) * np.sin(phi2)
+        )
+        latitudes, longitudes = np.degrees(phi2), (np.degrees(lambda2) + 180) % 360 - 180
+
+        np.testing.assert_allclose(distance_km(latitude, 4.85, latitudes, longitudes), rayon * 0.999, rtol=1e-6)
+        assert ((latitudes >= lat_min) & (latitudes <= lat_max)).all()
+        assert ((longitudes >= lon_min) & (longitudes <= lon_max)).all()
+
+    def test_boite_rayon_nul(self):
+        """Rayon nul : la boîte se réduit au point (lieu exact uniquement)."""
+        assert boite_englobante(45.75, 4.85, 0.0) == (45.75, 45.75, 4.85, 4.85)
@@ -0,0 +1,147 @@
+"""
+Tests unitaires pour la coalescence des appels PVGIS concurrents.
+
+Le verrou est porté par un LocMemCache, stand-in local de Redis
+partagé entre les threads du processus de test.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+import pytest
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import override_settings
+
+from weather.services.single_flight import _liberer, executer_une_seule_fois
+
+
+CACHES_TEST = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'verrous': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'verrous-test',
+    },
+}
+
+CLE = 'pvgis:verrou:45.7500:4.8500'
+
+
+class ResultatPartage:
+    """Simule l'API lente et la ligne PVGISData écrite par le meneur."""
+
+    def __init__(self, duree=0.3, echecs=0):
+        self.duree = duree
+        self.echecs = echecs
+        self.appels = 0
+        self.valeur = None
+        self._verrou = threading.Lock()
+
+    def produire(self):
+        with self._verrou:
+            self.appels += 1
+            echec = self.appels <= self.echecs
+        time.sleep(self.duree)
+        if echec:
+            raise ConnectionError("PVGIS indisponible")
+        self.valeur = 'tmy'
+        return self.valeur
+
+    def relire(self):
+        return self.valeur
+
+
+@pytest.fixture(autouse=True)
+def cache_local():
+    with override_settings(CACHES=CACHES_TEST):
+        caches['verrous'].clear()
+        yield
+        caches['verrous'].clear()
+
+
+def _appeler(partage, **kwargs):
+    options = dict(timeout=5, attente_max=5, intervalle=0.02, alias='verrous')
+    options.update(kwargs)
+    return executer_une_seule_fois(CLE, partage.produire, partage.relire, **options)
+
+
+class TestSingleFlight:
+    """Tests du verrou par lieu et de l'attente des suiveurs."""
+
+    def test_un_seul_appel_pour_des_taches_concurrentes(self):
+        """Huit tâches simultanées : un meneur appelle l'API, sept relisent son résultat."""
+        partage = ResultatPartage()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            resultats = list(pool.map(lambda _: _appeler(partage), range(8)))
+
+        assert partage.appels == 1
+        assert [valeur for valeur, _ in resultats] == ['tmy'] * 8
+        assert sorted(role for _, role in resultats).count('meneur') == 1
+        assert caches['verrous'].get(CLE) is None
+
+    def test_echec_du_meneur_repris_par_un_suiveur(self):
+        """Si le meneur échoue, le verrou est libéré et un suiveur appelle à son tour."""
+        partage = ResultatPartage(echecs=1)
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            futurs = [pool.submit(_appeler, partage) for _ in range(4)]
+        erreurs = [f for f in futurs if f.exception() is not None]
+
+        assert len(erreurs) == 1
+        assert partage.appels == 2
+        assert all(f.result()[0] == 'tmy' for f in futurs if f.exception() is None)
+
+    def test_verrou_orphelin_expire(self):
+        """Le verrou d'une tâche tuée expire après son timeout."""
+        caches['verrous'].add(CLE, 'tache-morte', timeout=0.3)
+        partage = ResultatPartage(duree=0.0)
+
+        debut = time.perf_counter()
+        valeur, role = _appeler(partage)
+
+        assert (valeur, role) == ('tmy', 'meneur')
+        assert 0.25 <= time.perf_counter() - debut < 2
+
+    def test_attente_max_depassee(self):
+        """Au-delà de attente_max, la tâche appelle l'API sans attendre le verrou."""
+        caches['verrous'].add(CLE, 'tache-lente', timeout=60)
+        partage = ResultatPartage(duree=0.0)
+
+        valeur, role = _appeler(partage, attente_max=0.1)
+
+        assert (valeur, role) == ('tmy', 'meneur')
+        assert caches['verrous'].get(CLE) == 'tache-lente'
+
+    def test_resultat_deja_present(self):
+        """Le meneur relit avant d'appeler : un résultat fraîchement écrit évite l'API."""
+        partage = ResultatPartage()
+        partage.valeur = 'tmy'
+
+        assert _appeler(partage) == ('tmy', 'suiveur')
+        assert partage.appels == 0
+
+    def test_cache_indisponible(self):
+        """Sans cache de verrou, l'appel se fait directement."""
+        partage = ResultatPartage(duree=0.0)
+
+        assert _appeler(partage, alias='inexistant') == ('tmy', 'meneur')
+
+    def test_verrou_repris_non_libere(self):
+        """Un meneur dont le verrou a expiré ne retire pas celui qu'un autre worker a repris."""
+        caches['verrous'].add(CLE, 'autre-worker', timeout=60)
+
+        _liberer(caches['verrous'], 'verrous', CLE, 'jeton-expire')
+
+        assert caches['verrous'].get(CLE) == 'autre-worker'
+
+    def test_verrous_hors_du_cache_evincable(self):
+        """Les verrous ne partagent pas l'alias allkeys-lru des résultats d'optimisation."""
+        assert settings.PVGIS_VERROU_CACHE_ALIAS != settings.OPTIMISATION_CACHE_ALIAS
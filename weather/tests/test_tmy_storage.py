@@ -0,0 +1,129 @@
+"""
+Tests unitaires pour le stockage colonnaire des données TMY PVGIS.
+"""
+
+import json
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from weather.services.pvgis import PVGISClient
+from weather.services.tmy_storage import (
+    TMY_DTYPE,
+    compresser_json,
+    decode_tmy,
+    encode_tmy,
+    tmy_vers_dataframe,
+)
+
+
+# Années d'origine de chaque mois, comme dans une vraie réponse TMY
+ANNEES_TMY = [2012, 2007, 2016, 2010, 2019, 2008, 2015, 2011, 2018, 2006, 2013, 2020]
+
+
+def _meilleure_duree(fonction, repetitions=3):
+    """Meilleure durée sur quelques exécutions (moins sensible au bruit qu'une mesure unique)."""
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction()
+        durees.append(time.perf_counter() - debut)
+    return min(durees)
+
+
+@pytest.fixture(scope='module')
+def reponse_tmy():
+    """Réponse PVGIS /tmy synthétique : 8760 h, mois tirés d'années différentes."""
+    rng = np.random.default_rng(0)
+    horodatages = pd.DatetimeIndex(np.concatenate([
+        pd.date_range(f'{annee}-{mois:02d}-01', periods=pd.Timestamp(2019, mois, 1).days_in_month * 24, freq='h')
+        for mois, annee in enumerate(ANNEES_TMY, start=1)
+    ]))
+    ghi = np.clip(np.sin((horodatages.hour - 6) / 12 * np.pi), 0, None) * rng.uniform(200, 900, 8760)
+    colonnes = {
+        'T2m': rng.uniform(-5, 30, 8760), 'RH': rng.uniform(30, 100, 8760),
+        'G(h)': ghi, 'Gb(n)': ghi * 0.7, 'Gd(h)': ghi * 0.3, 'IR(h)': rng.uniform(250, 400, 8760),
+        'WS10m': rng.uniform(0, 12, 8760), 'WD10m': rng.uniform(0, 360, 8760).round(),
+        'SP': rng.uniform(98000, 103000, 8760).round(),
+    }
+    lignes = [
+        {'time(UTC)': t, **{nom: round(float(v[i]), 2) for nom, v in colonnes.items()}}
+        for i, t in enumerate(horodatages.strftime('%Y%m%d:%H%M'))
+    ]
+    return {'inputs': {'location': {'latitude': 45.75, 'longitude': 4.85}}, 'outputs': {'tmy_hourly': lignes}}
+
+
+@pytest.fixture(scope='module')
+def df_tmy(reponse_tmy):
+    return PVGISClient().parse_tmy_to_dataframe(reponse_tmy)
+
+
+class TestTMYBlob:
+    """Tests de l'encodage colonnaire et de la lecture sans parsing."""
+
+    def test_aller_retour(self, df_tmy):
+        """Le décodage restitue horodatages exacts et colonnes à la précision float32."""
+        horodatages, colonnes = decode_tmy(encode_tmy(df_tmy))
+
+        assert list(colonnes) == [col for col in df_tmy.columns if col != 'timestamp']
+        np.testing.assert_array_equal(horodatages, df_tmy['timestamp'].to_numpy(dtype='datetime64[s]'))
+        for nom, serie in colonnes.items():
+            assert serie.dtype == TMY_DTYPE
+            np.testing.assert_allclose(serie, df_tmy[nom], rtol=1e-6, atol=1e-4)
+
+    def test_changements_d_annee_conserves(self, df_tmy):
+        """Les sauts entre mois d'années différentes sont restitués tels quels."""
+        horodatages, _ = decode_tmy(encode_tmy(df_tmy))
+
+        assert horodatages[743] == np.datetime64('2012-01-31T23:00:00')
+        assert horodatages[744] == np.datetime64('2007-02-01T00:00:00')
+
+    def test_tableaux_lecture_seule(self, df_tmy):
+        """Les tableaux décodés sont en lecture seule, le DataFrame est une copie modifiable."""
+        horodatages, colonnes = decode_tmy(encode_tmy(df_tmy))
+
+        assert not horodatages.flags.writeable
+        with pytest.raises(ValueError):
+            colonnes['ghi'][0] = 1.0
+
+        df = tmy_vers_dataframe(horodatages, colonnes)
+        df.loc[0, 'ghi'] = 1.0
+        assert colonnes['ghi'][0] != 1.0
+
+    def test_dataframe_au_format_parse(self, df_tmy):
+        """Même colonnes et dtypes que parse_tmy_to_dataframe."""
+        df = tmy_vers_dataframe(*decode_tmy(encode_tmy(df_tmy)))
+
+        assert list(df.columns) == list(df_tmy.columns)
+        assert len(df) == 8760
+        assert (df['timestamp'] == df_tmy['timestamp']).all()
+        assert all(df[col].dtype == np.float64 for col in df.columns if col != 'timestamp')
+        assert df['ghi'].sum() == pytest.approx(df_tmy['ghi'].sum(), rel=1e-6)
+
+    def test_tailles(self, reponse_tmy, df_tmy):
+        """Le blob est bien plus petit que le JSON brut, même compressé."""
+        blob = encode_tmy(df_tmy)
+        brut = json.dumps(reponse_tmy).encode()
+
+        assert len(blob) < len(compresser_json(reponse_tmy)) < len(brut)
+        assert len(blob) < 8760 * 9 * 4
+
+    def test_blob_invalide(self):
+        """Un blob absent ou d'un autre format lève ValueError."""
+        for blob in (None, b'', b'{"outputs": {}}'):
+            with pytest.raises(ValueError):
+                decode_tmy(blob)
+
+    def test_benchmark_lecture(self, reponse_tmy, df_tmy):
+        """Relire le blob est bien plus rapide que reparser le JSON PVGIS."""
+        client = PVGISClient()
+        brut = json.dumps(reponse_tmy)
+        blob = encode_tmy(df_tmy)
+
+        duree_json = _meilleure_duree(lambda: client.parse_tmy_to_dataframe(json.loads(brut)))
+        duree_blob = _meilleure_duree(lambda: tmy_vers_dataframe(*decode_tmy(blob)))
+
+        # Mesuré ×37 environ ; ×3 tolère une machine chargée
+        assert duree_blob * 3 < duree_json